@@ -0,0 +1,152 @@
+import bisect
+import hashlib
+import time
+from typing import Dict, Iterable, List, Optional
+from redis.exceptions import RedisError
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+NODES_KEY = "chatbot:ws:nodes"          # hash: node_id → 외부 접속 URL
+NODES_ALIVE_KEY = "chatbot:ws:nodes:alive"  # zset: node_id → 마지막 heartbeat(epoch)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """가상 노드 기반 consistent hash ring. 노드 증감 시 약 1/N 키만 이동"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self._nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> set[str]:
+        return set(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                idx = bisect.bisect_left(self._points, point)
+                if idx < len(self._points) and self._points[idx] == point:
+                    self._points.pop(idx)
+
+    def get(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        idx = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[idx]]
+
+
+class CoupleAffinityRouter:
+    """
+    couple_id consistent hash로 커플의 담당 노드(파드)를 정하는 라우터
+
+    - 각 노드는 heartbeat마다 Redis 노드 레지스트리에 자신을 등록하고 살아있는 노드로 ring을 재구성
+    - 연결 시 담당 노드가 아니면 redirect 프레임으로 담당 노드 URL을 알려줌
+    - ring이 바뀌면 더 이상 담당이 아닌 커플에 redirect(rebalance) 전송 → 재연결 전까지만 pub/sub 경유
+    - 노드 URL은 노드(파드)마다 개별 주소여야 함 (같은 포트를 공유하는 멀티 워커에는 적용 불가)
+    """
+
+    def __init__(self, node_id: str, node_url: str, enabled: bool, node_ttl: int, vnodes: int = 160):
+        self.node_id = node_id
+        self.node_url = node_url.rstrip("/")
+        self.enabled = enabled and bool(node_url)
+        self.node_ttl = node_ttl
+        self.ring = HashRing(vnodes=vnodes)
+        self.node_urls: Dict[str, str] = {}
+
+    def owner(self, couple_id: str) -> Optional[str]:
+        return self.ring.get(couple_id)
+
+    def owns(self, couple_id: Optional[str]) -> bool:
+        """이 노드가 담당 노드인지. 비활성이거나 ring이 비어 있으면 항상 True"""
+        if not self.enabled or not couple_id:
+            return True
+        owner = self.owner(couple_id)
+        return owner is None or owner == self.node_id
+
+    def is_authoritative(self, couple_id: Optional[str]) -> bool:
+        """라우팅이 활성이고 이 노드가 담당 → 커플의 모든 소켓이 이 노드에 있다고 보고 pub/sub 생략"""
+        return self.enabled and bool(couple_id) and self.owner(couple_id) == self.node_id
+
+    def redirect_url(self, couple_id: Optional[str], user_id: str) -> Optional[str]:
+        if self.owns(couple_id):
+            return None
+        base = self.node_urls.get(self.owner(couple_id))
+        if not base:
+            return None
+        return f"{base}/ws/{user_id}?redirected=1"
+
+    async def register(self, redis_client):
+        if not self.enabled:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(NODES_KEY, self.node_id, self.node_url)
+        pipe.zadd(NODES_ALIVE_KEY, {self.node_id: time.time()})
+        await pipe.execute()
+
+    async def deregister(self, redis_client):
+        if not self.enabled:
+            return
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hdel(NODES_KEY, self.node_id)
+            pipe.zrem(NODES_ALIVE_KEY, self.node_id)
+            await pipe.execute()
+        except RedisError as e:
+            logger.error(f"[CoupleAffinityRouter] 노드 등록 해제 실패: {e}")
+
+    async def refresh(self, redis_client) -> bool:
+        """자신을 등록하고 살아있는 노드로 ring 재구성. ring이 바뀌었으면 True"""
+        if not self.enabled:
+            return False
+        try:
+            await self.register(redis_client)
+            cutoff = time.time() - self.node_ttl
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.zremrangebyscore(NODES_ALIVE_KEY, "-inf", cutoff)
+            pipe.zrange(NODES_ALIVE_KEY, 0, -1)
+            pipe.hgetall(NODES_KEY)
+            _, alive, urls = await pipe.execute()
+        except RedisError as e:
+            logger.error(f"[CoupleAffinityRouter] 노드 목록 갱신 실패: {e}")
+            return False
+
+        alive = set(alive)
+        self.node_urls = {node: url for node, url in urls.items() if node in alive}
+        stale = set(urls) - alive
+        if stale:
+            try:
+                await redis_client.hdel(NODES_KEY, *stale)
+            except RedisError as e:
+                logger.warning(f"[CoupleAffinityRouter] 만료 노드 URL 정리 실패: {e}")
+        current = self.ring.nodes
+        if alive == current:
+            return False
+        for node in current - alive:
+            self.ring.remove(node)
+        for node in alive - current:
+            self.ring.add(node)
+        logger.info(f"[CoupleAffinityRouter] ring 변경: nodes={len(alive)} (+{len(alive - current)}, -{len(current - alive)})")
+        return True
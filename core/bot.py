@@ -1,21 +1,34 @@
+import asyncio
+import time
+from collections import OrderedDict
+from core.metrics import metrics
+from core.redis_v2.l1_cache import invalidation_bus
 from core.redis_v2.persona_config_service import PersonaConfigService
 from core.redis_v2.persona_config_service import PersonaPromptProvider
 from core.redis_v2.ai_summary_provider import AISummaryProvider
 from core.redis_v2.ai_chat_manager import AIChatHistoryManager
-from core.redis_v2.redis import load_couple_mapping, redis_client
-from core.redis_v2.utils import acquire_lock, release_lock
+from core.dependencies import get_connection_manager
+from core.redis_v2.utils import RedisLock
+from core.redis_v2.summary_queue import summary_scheduler, PRIORITY_HIGH, PRIORITY_NORMAL
 from db.db_tables import AIMessage, AIChatSummary
 from services.ai.summarizer import summarize_ai_chat
 from db.db import SessionLocal
 from datetime import datetime
 from models.schema import Role
-from utils.token_truncate import count_tokens
+from utils.token_truncate import count_tokens, message_tokens
 from core.settings import settings
 
 class PersonaChatBot:
-    def __init__(self, user_id: str, lang: str = None):
+    """
+    Redis 조회가 필요하므로 `await PersonaChatBot.create(user_id, lang)`로 생성
+    요청 처리 경로에서는 bot_pool.get(user_id, lang)으로 재사용 (요청별 상태는 ChatContext에만 둠)
+    """
+    __slots__ = ("user_id", "couple_id", "lang", "config_service", "prompt_provider",
+                 "summary_provider", "history_manager")
+
+    def __init__(self, user_id: str, couple_id: str, lang: str = None):
         self.user_id = user_id
-        self.couple_id = self.get_couple_id()
+        self.couple_id = couple_id
         self.lang = lang or "ko"
 
         self.config_service = PersonaConfigService(self.user_id, self.couple_id)
@@ -29,8 +42,17 @@ class PersonaChatBot:
             summary_provider=self.summary_provider.get
         )
 
-    def get_history(self):
-        return self.history_manager.load()
+    @classmethod
+    async def create(cls, user_id: str, lang: str = None) -> "PersonaChatBot":
+        couple_id = await cls.get_couple_id(user_id)
+        return cls(user_id, couple_id, lang)
+
+    async def get_history(self):
+        return await self.history_manager.load()
+
+    async def open_context(self):
+        """채팅 요청 1회용 ChatContext (system prompt / 요약 조회는 여기서 한 번)"""
+        return await self.history_manager.open_context()
 
     def get_full_history(self):
         """DB에서 전체 대화 기록을 가져와서 임베딩용 형태로 반환"""
@@ -55,29 +77,32 @@ class PersonaChatBot:
                 })
             
             return result
-    def save_history(self, history):
-        self.history_manager.save(history)
+    async def save_history(self, history):
+        await self.history_manager.save(history)
 
-    def reset(self):
-        self.history_manager.clear()
+    async def reset(self):
+        await self.history_manager.clear()
 
-    def get_system_prompt(self):
-        return self.prompt_provider.get()
+    async def get_system_prompt(self):
+        return await self.prompt_provider.get()
 
-    def get_summary(self):
-        return self.summary_provider.get()
+    async def get_summary(self):
+        return await self.summary_provider.get()
 
-    def set_persona_name(self, name: str):
-        self.config_service.set_persona_name(name)
+    async def set_persona_name(self, name: str):
+        await self.config_service.set_persona_name(name)
     
-    def get_couple_id(self):
+    @staticmethod
+    async def get_couple_id(user_id: str):
         # Redis나 DB에서 사용자 기반 couple_id 조회 (예: Redis에 user_id → couple_id 맵핑 저장되어 있다면)
-        couple_id, _ = load_couple_mapping(self.user_id)
+        # 워커의 커플 매핑 L1 캐시 경유 (미스 시 Redis → DB)
+        couple_id = await get_connection_manager().get_couple_id(user_id)
         if not couple_id:
-            raise ValueError(f"[PersonaChatBot] user_id={self.user_id}로 couple_id를 찾을 수 없습니다. 커플 매핑이 필요합니다.")
+            raise ValueError(f"[PersonaChatBot] user_id={user_id}로 couple_id를 찾을 수 없습니다. 커플 매핑이 필요합니다.")
         return couple_id
 
-    def save_to_db(self, user_id, role, content, name=None):
+    def save_to_db(self, user_id, role, content, name=None, token_count=None):
+        """token_count: 호출 측에서 이미 센 값이 있으면 전달 (없으면 여기서 계산)"""
         with SessionLocal() as db:
             ai_msg = AIMessage(
                 user_id=user_id,
@@ -85,14 +110,24 @@ class PersonaChatBot:
                 role=role,
                 content=content,
                 created_at=datetime.utcnow(),
-                name=name
+                name=name,
+                token_count=count_tokens(content) if token_count is None else token_count
             )
             db.add(ai_msg)
             db.commit()
             db.refresh(ai_msg)
         return ai_msg.id
     
-    def save_summary_and_history_atomic(self, summary: str, new_history: list, last_msg_id: int):
+    async def save_summary_and_history_atomic(self, summary: str, snapshot: list, remaining: list, last_msg_id: int):
+        """snapshot: 요약 시작 시 읽은 메시지, remaining: 그중 요약하지 않고 남길 메시지"""
+        await asyncio.to_thread(self._save_summary_to_db, summary, last_msg_id)
+        # 요약 중 추가된 턴은 유지한 채 요약된 앞부분만 교체
+        if not await self.history_manager.replace_summarized(snapshot, remaining):
+            # 교체하지 못하면 캐시를 비워 DB(요약의 last_msg_id 이후)에서 다시 구성
+            await self.history_manager.clear()
+        await self.summary_provider.set(summary)
+
+    def _save_summary_to_db(self, summary: str, last_msg_id: int):
         with SessionLocal() as db:
             db.add(AIChatSummary(
                 user_id=self.user_id,
@@ -102,14 +137,30 @@ class PersonaChatBot:
                 last_msg_id=last_msg_id,
             ))
             db.commit()
-        self.history_manager.save(new_history)
-        self.summary_provider.set(summary)
     
+    async def schedule_summary(self):
+        """
+        채팅 턴 종료 후 호출. 요약은 summary_scheduler 워커가 실행
+        ledger상 조건을 넘었으면 바로(high), ledger가 없으면 debounce 뒤(normal), 미달이면 예약하지 않음
+        """
+        ledger = await self.history_manager.ledger()
+        if ledger is None:
+            await summary_scheduler.enqueue(self.user_id, PRIORITY_NORMAL)
+        elif not _below_summary_threshold(ledger):
+            await summary_scheduler.enqueue(self.user_id, PRIORITY_HIGH)
+
     async def check_and_summarize_if_needed(self):
-        if not acquire_lock(f"lock:summarize:{self.user_id}"):
+        # token ledger로 요약 조건 미달이면 락 / 히스토리 로드 없이 종료 (ledger가 없으면 아래에서 직접 계산)
+        ledger = await self.history_manager.ledger()
+        if ledger is not None and _below_summary_threshold(ledger):
+            return
+
+        # 요약(LLM 호출)이 30초를 넘겨도 락이 만료되지 않도록 auto-extend
+        lock = RedisLock(f"lock:summarize:{self.user_id}")
+        if not await lock.acquire():
             return
         try:
-            history = self.get_history()
+            history = await self.get_history()
             # 'system', 'summary' 제외
             filtered = [h for h in history if h["role"] not in (Role.SYSTEM, Role.SUMMARY)]
 
@@ -140,7 +191,7 @@ class PersonaChatBot:
             assert turn_threshold > remaining_size, f"turn_threshold: {turn_threshold}, MIN_REMAINING_SIZE: {remaining_size}"
             
 
-            prev_summary = self.get_summary()
+            prev_summary = await self.get_summary()
 
             if should_trigger_summary(turns, token_threshold=summary_trigger_tokens, turn_threshold=turn_threshold):
                 # 요약 대상: 최근 WINDOW_SIZE - MIN_REMAINING_SIZE 턴
@@ -158,16 +209,77 @@ class PersonaChatBot:
                 remaining_turns = turns[turn_threshold - remaining_size:]
                 remaining_msgs = [msg for turn in remaining_turns for msg in turn]
 
-                new_history = [
-                    self.get_system_prompt(),
-                    {
-                        "role": Role.SUMMARY,
-                        "content": f"(누적 요약)\n{summary}"
-                    }
-                ] + remaining_msgs
-                self.save_summary_and_history_atomic(summary, new_history, last_msg_id)
+                await self.save_summary_and_history_atomic(summary, filtered, remaining_msgs, last_msg_id)
         finally:
-            release_lock(f"lock:summarize:{self.user_id}")
+            await lock.release()
+
+class _PooledBot:
+    __slots__ = ("bot", "expires_at")
+
+    def __init__(self, bot: PersonaChatBot, expires_at: float):
+        self.bot = bot
+        self.expires_at = expires_at
+
+
+class BotPool:
+    """
+    (user_id, lang) → PersonaChatBot LRU/TTL 풀 (워커당)
+    - 봇은 식별자와 무상태 provider만 가지므로 동시 요청이 같은 인스턴스를 공유해도 됨
+    - 커플 연결/해제(invalidation_bus "couple") 시 해당 유저의 모든 lang 엔트리 제거
+    - ttl이 지나면 다시 create → 무효화 메시지를 놓쳐도 couple_id 변경이 반영됨
+    """
+
+    def __init__(self, max_size: int = settings.bot_pool_size, ttl: float = settings.bot_pool_ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple[str, str], _PooledBot]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        metrics.register_gauge("bot_pool.size", lambda: len(self._entries))
+        metrics.register_gauge("bot_pool.hit_rate", self.hit_rate)
+
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    async def get(self, user_id: str, lang: str = None) -> PersonaChatBot:
+        key = (user_id, lang or "ko")
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            self._hits += 1
+            metrics.incr("bot_pool.hit")
+            return entry.bot
+        self._misses += 1
+        metrics.incr("bot_pool.miss")
+        # 커플 매핑이 없으면 ValueError → 캐시하지 않음
+        bot = await PersonaChatBot.create(user_id, key[1])
+        self._entries[key] = _PooledBot(bot, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            metrics.incr("bot_pool.evicted")
+        return bot
+
+    def invalidate_user(self, user_id: str):
+        # 커플 변경은 드물어서 전체 순회로 충분 (lang 수만큼만 일치)
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+            metrics.incr("bot_pool.invalidated")
+
+
+# 싱글톤 객체
+bot_pool = BotPool()
+invalidation_bus.register("couple", bot_pool.invalidate_user)
+
+
+async def summarize_user(user_id: str):
+    """summary_scheduler 작업 핸들러"""
+    bot = await bot_pool.get(user_id)
+    await bot.check_and_summarize_if_needed()
+
+def _below_summary_threshold(ledger: dict) -> bool:
+    return ledger["turns"] < settings.sum_turn_threshold and ledger["tokens"] < settings.sum_trigger_tokens
 
 def get_last_msg_id(msgs):
     for msg in reversed(msgs):
@@ -176,7 +288,8 @@ def get_last_msg_id(msgs):
     return None
 
 def should_trigger_summary(turns: list[list[dict]], token_threshold: int = 2500, turn_threshold: int = 8) -> bool:
+    # 메시지별 저장된 토큰 수 사용 (없는 기존 항목만 계산)
     total_tokens = sum(
-        count_tokens(msg["content"]) for turn in turns for msg in turn
+        message_tokens(msg) for turn in turns for msg in turn
     )
     return len(turns) >= turn_threshold or total_tokens >= token_threshold
\ No newline at end of file
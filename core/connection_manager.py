@@ -1,65 +1,267 @@
+import asyncio
+import time
 from fastapi import WebSocket
-from typing import Dict, Tuple, Optional
-from core.redis_v2.redis import save_couple_mapping, load_couple_mapping
+from typing import Callable, Dict, Iterable, Set, Tuple, Optional, Union
+from core.redis_v2.redis import async_save_couple_mapping, async_load_couple_mapping, async_redis_client
+from core.redis_v2.ws_pubsub import RedisWSBroker
+from core.redis_v2.presence import PresenceService
+from core.ws_connection import ClientConnection
+from core.ws_codec import JSON_CODEC, JSONCodec
+from core.affinity import CoupleAffinityRouter
+from core.couple_directory import CoupleDirectory
+from core.redis_v2.l1_cache import invalidation_bus
+from core.metrics import metrics
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.couple_map: Dict[str, Tuple[str, str]] = {}
+    def __init__(self, on_delivered: Optional[Callable[[str], None]] = None):
+        # 채팅 메시지 프레임이 소켓에 실제로 써졌을 때 호출 (msg_uid → DB is_delivered 반영)
+        self.on_delivered = on_delivered
+        # user_id → 살아있는 연결들 (멀티 디바이스)
+        self.active_connections: Dict[str, Set[ClientConnection]] = {}
+        # couple_id → (user_id, 연결) 집합. 상태 브로드캐스트를 커플 단위 O(1)로 처리
+        self.couple_connections: Dict[str, Set[Tuple[str, ClientConnection]]] = {}
+        # user_id → 커플 매핑 캐시 (크기/TTL 제한, 미스 시 async_load_couple_mapping)
+        self.directory = CoupleDirectory(
+            loader=async_load_couple_mapping,
+            max_size=settings.ws_couple_cache_size,
+            ttl=settings.ws_couple_cache_ttl
+        )
+        # 이 워커에 연결된 유저 → couple_connections에 색인된 couple_id (연결 해제 시 제거)
         self.user_to_couple: Dict[str, str] = {}
+        # 로컬에 없는 유저는 Redis pub/sub으로 소켓을 가진 노드에 전달
+        self.broker = RedisWSBroker(on_message=self._deliver_local)
+        # 클러스터 전체 접속 상태 (TTL + heartbeat)
+        self.presence = PresenceService(node_id=self.broker.node_id)
+        # couple_id consistent hash 라우팅 (커플 두 사람을 같은 노드로)
+        self.affinity = CoupleAffinityRouter(
+            node_id=self.broker.node_id,
+            node_url=settings.ws_node_url,
+            enabled=settings.ws_affinity_enabled,
+            node_ttl=settings.ws_presence_ttl
+        )
+        self._heartbeat: Optional[asyncio.Task] = None
+        metrics.register_gauge("ws.connections", lambda: sum(len(c) for c in self.active_connections.values()))
+        metrics.register_gauge("ws.send_queue.total_depth", self.total_queue_depth)
+        metrics.register_gauge("l1.couple.size", lambda: len(self.directory))
+        metrics.register_gauge("l1.couple.hit_rate", self.directory.hit_rate)
+        # 다른 워커에서 커플 연결/해제 시 캐시 제거
+        invalidation_bus.register("couple", self.invalidate_user)
+
+    async def start(self):
+        await self.broker.start()
+        await self.affinity.refresh(async_redis_client)
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        await self.affinity.deregister(async_redis_client)
+        await self.broker.stop()
+
+    async def _heartbeat_loop(self, interval: float = settings.ws_heartbeat_interval):
+        """서버 주도 ping 전송 + 로컬 유저 presence 일괄 갱신"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                ping = {"type": "ping", "ts": int(time.time())}
+                for conns in list(self.active_connections.values()):
+                    for conn in list(conns):
+                        conn.send(ping)
+                await self.presence.refresh(list(self.active_connections.keys()))
+                if await self.affinity.refresh(async_redis_client):
+                    self._rebalance()
+            except Exception as e:
+                logger.error(f"[ConnectionManager] heartbeat 실패: {e}")
+
+    def _rebalance(self):
+        """ring 변경으로 담당이 바뀐 커플의 연결에 새 담당 노드로 재연결 요청"""
+        moved = 0
+        for couple_id, members in list(self.couple_connections.items()):
+            for user_id, conn in list(members):
+                url = self.affinity.redirect_url(couple_id, user_id)
+                if url:
+                    conn.send({"type": "redirect", "url": url, "reason": "rebalance"})
+                    moved += 1
+        if moved:
+            metrics.incr("ws.affinity.rebalance_redirects", moved)
+            logger.info(f"[ConnectionManager] rebalance redirect: connections={moved}")
+
+    async def connect(self, user_id: str, websocket: WebSocket, codec: JSONCodec = JSON_CODEC) -> ClientConnection:
+        await websocket.accept(subprotocol=codec.subprotocol)
+        conn = ClientConnection(user_id, websocket, codec=codec, on_delivered=self.on_delivered)
+        conn.start()
+        is_first = user_id not in self.active_connections
+        self.active_connections.setdefault(user_id, set()).add(conn)
+        couple_id = await self.get_couple_id(user_id)
+        if couple_id:
+            self.user_to_couple[user_id] = couple_id
+            self.couple_connections.setdefault(couple_id, set()).add((user_id, conn))
+        if is_first:
+            await self.broker.subscribe_user(user_id)
+            await self.presence.mark_online(user_id)
+        return conn
 
-    async def connect(self, user_id: str, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
+    async def disconnect(self, user_id: str, conn: ClientConnection) -> bool:
+        """연결 하나를 제거. 유저의 마지막 연결이었으면 True"""
+        await conn.close()
+        conns = self.active_connections.get(user_id)
+        if conns is not None:
+            conns.discard(conn)
+        couple_id = self.user_to_couple.get(user_id)
+        if couple_id:
+            members = self.couple_connections.get(couple_id)
+            if members is not None:
+                members.discard((user_id, conn))
+                if not members:
+                    self.couple_connections.pop(couple_id, None)
+        if conns:
+            return False
 
-    def disconnect(self, user_id: str):
         self.active_connections.pop(user_id, None)
         self.user_to_couple.pop(user_id, None)
+        await self.broker.unsubscribe_user(user_id)
+        await self.presence.mark_offline(user_id)
+        return True
 
-    def get_partner(self, user_id: str) -> Optional[str]:
-        couple_id = self.user_to_couple.get(user_id)
-        if not couple_id:
+    async def get_partner(self, user_id: str) -> Optional[str]:
+        entry = await self.directory.lookup(user_id)
+        return entry.partner(user_id) if entry else None
+
+    async def _partner_in_couple(self, couple_id: str, user_id: str) -> Optional[str]:
+        entry = await self.directory.lookup(user_id)
+        if entry is None or entry.couple_id != couple_id:
             return None
-        u1, u2 = self.couple_map.get(couple_id, (None, None))
-        return u2 if u1 == user_id else u1
+        return entry.partner(user_id)
 
-    def get_couple_id(self, user_id: str) -> Optional[str]:
-        return self.user_to_couple.get(user_id)
+    async def get_couple_id(self, user_id: str) -> Optional[str]:
+        couple_id = self.user_to_couple.get(user_id)
+        if couple_id:
+            return couple_id
+        entry = await self.directory.lookup(user_id)
+        return entry.couple_id if entry else None
 
-    def is_couple_ready(self, user_id: str) -> bool:
-        partner_id = self.get_partner(user_id)
-        return partner_id in self.active_connections
+    async def is_couple_ready(self, user_id: str) -> bool:
+        partner_id = await self.get_partner(user_id)
+        return self.is_user_connected(partner_id)
 
     def is_user_connected(self, user_id: str) -> bool:
-        return user_id in self.active_connections
+        """이 워커에 연결된 소켓이 있는지"""
+        return bool(self.active_connections.get(user_id))
+
+    async def is_user_online(self, user_id: Optional[str]) -> bool:
+        """클러스터 내 어느 노드에든 연결되어 있는지"""
+        if not user_id:
+            return False
+        if self.is_user_connected(user_id):
+            return True
+        return await self.presence.is_online(user_id)
 
-    async def send_personal_message(self, message: str, to_user_id: str):
-        if to_user_id in self.active_connections:
-            await self.active_connections[to_user_id].send_text(message)
+    def total_queue_depth(self) -> int:
+        return sum(conn.depth for conns in self.active_connections.values() for conn in conns)
 
-    async def send_personal_json(self, data: dict, to_user_id: str):
-        if to_user_id in self.active_connections:
-            await self.active_connections[to_user_id].send_json(data)
+    async def _fan_out(self, conns: Iterable[ClientConnection], frame: Union[dict, str]) -> int:
+        """각 연결의 송신 큐에 넣고 받아들여진 개수 반환 (실제 전송은 연결별 writer 태스크)"""
+        return sum(conn.send(frame) for conn in list(conns))
 
-    async def broadcast_status(self, user_id, status):
-        couple_id = self.get_couple_id(user_id)
+    async def _deliver_local(self, to_user_id: str, frame: Union[dict, str]) -> bool:
+        return await self._fan_out(self.active_connections.get(to_user_id, ()), frame) > 0
+
+    async def _send(self, frame: Union[dict, str], to_user_id: str) -> bool:
+        local = await self._deliver_local(to_user_id, frame)
+        # 담당 노드라면 커플의 모든 디바이스가 여기에 붙으므로 pub/sub 생략
+        if local and self.affinity.is_authoritative(self.user_to_couple.get(to_user_id)):
+            metrics.incr("ws.affinity.local_delivery")
+            return True
+        # 같은 유저의 다른 디바이스가 다른 노드에 있을 수 있으므로 publish
+        metrics.incr("ws.affinity.pubsub_delivery")
+        remote = await self.broker.publish(to_user_id, frame)
+        return local or remote
+
+    async def send_personal_message(self, message: str, to_user_id: str) -> bool:
+        return await self._send(message, to_user_id)
+
+    async def send_personal_json(self, data: dict, to_user_id: str) -> bool:
+        return await self._send(data, to_user_id)
+
+    async def broadcast_status(self, user_id, status, couple_id: Optional[str] = None):
+        couple_id = couple_id or await self.get_couple_id(user_id)
         if not couple_id:
             return
 
-        for target_id, conn in self.active_connections.items():
-            if self.get_couple_id(target_id) == couple_id:
-                await conn.send_json({"type": "status", "user": user_id, "status": status})
+        frame = {"type": "status", "user": user_id, "status": status}
+        members = self.couple_connections.get(couple_id, ())
+        await self._fan_out([conn for _, conn in members], frame)
+
+        # 상대가 다른 노드에 붙어 있으면 pub/sub으로 전달 (offline이면 publish 생략)
+        partner_id = await self._partner_in_couple(couple_id, user_id)
+        if partner_id and not (self.affinity.is_authoritative(couple_id) and self.is_user_connected(partner_id)) \
+                and await self.presence.is_online(partner_id):
+            await self.broker.publish(partner_id, frame)
 
-    def register_couple(self, user_id: str, partner_id: str, couple_id: str):
-        self.couple_map[couple_id] = (user_id, partner_id)
-        self.user_to_couple[user_id] = couple_id
-        self.user_to_couple[partner_id] = couple_id
-        save_couple_mapping(user_id, partner_id, couple_id)
+    async def send_presence_snapshot(self, user_id: str, conn: ClientConnection):
+        """새로 연결된 디바이스에 상대의 현재 접속 상태 전달"""
+        partner_id = await self.get_partner(user_id)
+        if not partner_id:
+            return
+        online = self.is_user_connected(partner_id) or \
+            (await self.presence.online_many([partner_id])).get(partner_id, False)
+        conn.send({"type": "status", "user": partner_id, "status": "online" if online else "offline"})
 
-    def auto_register_from_redis(self, user_id: str):
-        couple_id, partner_id = load_couple_mapping(user_id)
-        if not couple_id or not partner_id:
+    def _unindex_user(self, user_id: str):
+        """연결된 소켓들을 기존 couple 인덱스에서 제거"""
+        couple_id = self.user_to_couple.pop(user_id, None)
+        conns = self.active_connections.get(user_id)
+        if not couple_id or not conns:
             return
-        self.user_to_couple[user_id] = couple_id
-        if couple_id not in self.couple_map:
-            self.couple_map[couple_id] = (user_id, partner_id)
+        members = self.couple_connections.get(couple_id)
+        if members is not None:
+            members.difference_update((user_id, conn) for conn in conns)
+            if not members:
+                self.couple_connections.pop(couple_id, None)
+
+    def _index_user(self, user_id: str, couple_id: str):
+        """이미 연결된 소켓들을 couple 인덱스에 등록 (이 워커에 연결이 없으면 캐시만 사용)"""
+        if self.user_to_couple.get(user_id) == couple_id:
+            return
+        self._unindex_user(user_id)
+        conns = self.active_connections.get(user_id)
+        if conns:
+            self.user_to_couple[user_id] = couple_id
+            members = self.couple_connections.setdefault(couple_id, set())
+            members.update((user_id, conn) for conn in conns)
+
+    async def register_couple(self, user_id: str, partner_id: str, couple_id: str):
+        # Redis에 새 매핑을 먼저 쓴 뒤 무효화 → 다른 워커가 무효화 직후 다시 읽어도 이전 매핑을 캐시하지 않음
+        await async_save_couple_mapping(user_id, partner_id, couple_id)
+        await invalidation_bus.invalidate("couple", user_id)
+        await invalidation_bus.invalidate("couple", partner_id)
+        # 로컬 무효화 후 새 매핑 반영
+        self.directory.put(couple_id, user_id, partner_id)
+        self._index_user(user_id, couple_id)
+        self._index_user(partner_id, couple_id)
+
+    async def auto_register_from_redis(self, user_id: str):
+        # 연결 시점에는 캐시를 믿지 않고 다시 조회해 갱신
+        entry = await self.directory.load(user_id)
+        if entry.couple_id:
+            self._index_user(user_id, entry.couple_id)
+
+    def invalidate_user(self, user_id: str):
+        """유저의 커플 매핑 캐시 제거 (커플 연결/해제, 유저 삭제 시). 커플이었으면 상대 키도 함께 제거"""
+        entry = self.directory.invalidate(user_id)
+        self._unindex_user(user_id)
+        if entry is not None and entry.couple_id:
+            partner_id = entry.partner(user_id)
+            if partner_id:
+                self.directory.invalidate(partner_id)
+                self._unindex_user(partner_id)
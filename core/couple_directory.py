@@ -0,0 +1,97 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+from core.metrics import metrics
+
+# 커플이 아닌 유저도 캐시 (매 조회마다 Redis/DB fallback 방지). 커플 연결 시 바로 무효화되도록 짧게 유지
+NEGATIVE_TTL = 30
+
+
+class CoupleEntry:
+    """커플 매핑 한 건. 두 유저 키가 같은 엔트리를 공유 (couple_id가 None이면 커플 아님)"""
+    __slots__ = ("couple_id", "user_1", "user_2", "expires_at")
+
+    def __init__(self, couple_id: Optional[str], user_1: str, user_2: Optional[str], expires_at: float):
+        self.couple_id = couple_id
+        self.user_1 = user_1
+        self.user_2 = user_2
+        self.expires_at = expires_at
+
+    def partner(self, user_id: str) -> Optional[str]:
+        return self.user_2 if self.user_1 == user_id else self.user_1
+
+
+class CoupleDirectory:
+    """
+    user_id → 커플 매핑 LRU/TTL 캐시
+
+    - 최대 max_size 유저 키만 유지하고 가장 오래 안 쓰인 키부터 제거
+    - ttl이 지난 엔트리는 다시 loader(async_load_couple_mapping)로 조회 → 다른 워커에서 바뀐 매핑도 결국 반영
+    - 커플 해제/유저 삭제 시 invalidate로 즉시 제거
+    """
+
+    def __init__(self, loader: Callable[[str], Awaitable[Tuple[Optional[str], Optional[str]]]],
+                 max_size: int = 10000, ttl: int = 600):
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CoupleEntry]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str) -> Optional[CoupleEntry]:
+        """캐시에만 조회 (만료됐으면 None)"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._entries.pop(user_id, None)
+            metrics.incr("l1.couple.expired")
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    async def lookup(self, user_id: str) -> Optional[CoupleEntry]:
+        """캐시 조회, 없으면 loader로 채움. 커플이 아니면 None"""
+        entry = self.get(user_id)
+        if entry is not None:
+            self._hits += 1
+            metrics.incr("l1.couple.hit")
+        else:
+            self._misses += 1
+            metrics.incr("l1.couple.miss")
+            entry = await self.load(user_id)
+        return entry if entry.couple_id else None
+
+    async def load(self, user_id: str) -> CoupleEntry:
+        """loader로 다시 조회해 캐시 갱신"""
+        couple_id, partner_id = await self.loader(user_id)
+        if not couple_id or not partner_id:
+            entry = CoupleEntry(None, user_id, None, time.monotonic() + min(self.ttl, NEGATIVE_TTL))
+            self._store(user_id, entry)
+            return entry
+        return self.put(couple_id, user_id, partner_id)
+
+    def put(self, couple_id: str, user_1: str, user_2: str) -> CoupleEntry:
+        entry = CoupleEntry(couple_id, user_1, user_2, time.monotonic() + self.ttl)
+        self._store(user_1, entry)
+        self._store(user_2, entry)
+        return entry
+
+    def invalidate(self, user_id: str) -> Optional[CoupleEntry]:
+        """유저 키 제거. 제거된 엔트리 반환"""
+        return self._entries.pop(user_id, None)
+
+    def _store(self, user_id: str, entry: CoupleEntry):
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            metrics.incr("l1.couple.evicted")
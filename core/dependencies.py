@@ -1,4 +1,5 @@
 from core.connection_manager import ConnectionManager
+from core.message_writer import MessageWriteBehind
 from openai import AsyncOpenAI
 from langchain_openai import ChatOpenAI
 from langchain_core.language_models.chat_models import BaseChatModel
@@ -8,6 +9,9 @@ from core.settings import settings
 from openai import AsyncOpenAI
 from core.settings import settings
 from db.db import get_session
+from fastapi import HTTPException
+from models.schema import ChatRequest
+from core.redis_v2.rate_limiter import chat_rate_limiter, USER_CHAT_LIMIT, COUPLE_CHAT_LIMIT, retry_after_header
 
 # DB session
 def get_db_session():
@@ -15,11 +19,31 @@ def get_db_session():
 
 
 # 싱글 인스턴스 유지
-_connection_manager = ConnectionManager()
+_message_writer = MessageWriteBehind()
+def get_message_writer() -> MessageWriteBehind:
+    return _message_writer
+
+
+# 소켓 쓰기가 확인된 메시지만 전달 완료로 저장
+_connection_manager = ConnectionManager(on_delivered=_message_writer.mark_delivered)
 def get_connection_manager() -> ConnectionManager:
     return _connection_manager
 
 
+async def chat_rate_limit(req: ChatRequest):
+    """AI 채팅 요청 제한 (user_id, couple_id 버킷). 초과 시 429 + Retry-After"""
+    buckets = [(USER_CHAT_LIMIT, req.user_id)]
+    if req.couple_id:
+        buckets.append((COUPLE_CHAT_LIMIT, req.couple_id))
+    retry_after = await chat_rate_limiter.check(buckets)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="요청이 너무 많습니다. 잠시 후 다시 시도해 주세요.",
+            headers=retry_after_header(retry_after),
+        )
+
+
 async def get_openai_client() -> AsyncOpenAI:
     # api_key = get_user_api_key(user_id)
     return AsyncOpenAI(api_key=await settings.get_next_api_key())
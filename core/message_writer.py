@@ -0,0 +1,176 @@
+import asyncio
+import uuid
+from collections import deque
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from db.db import SessionLocal
+from db.db_tables import Message
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageWriteBehind:
+    """
+    커플 채팅 메시지 write-behind 파이프라인
+
+    - WebSocket 핸들러는 enqueue만 하고 바로 반환 (이벤트 루프에서 DB commit 하지 않음)
+    - 백그라운드 태스크가 batch_size 또는 flush_interval 마다 한 트랜잭션으로 일괄 insert
+    - is_delivered 전환(재전송 ack)도 같은 트랜잭션에서 (couple, 보낸 사람)별 UPDATE 한 번으로 반영
+    - 실시간 전송은 소켓 쓰기가 확인된 msg_uid만 전달 완료로 반영. 아직 행이 없으면(다른 노드 큐에 있음)
+      몇 주기 재시도 후 포기 → 미전달로 남아 재연결 시 재전송 (중복은 클라이언트가 msg_uid로 제거)
+    - 실패한 배치는 큐 앞에 되돌려 재시도 (at-least-once), 종료 시 남은 큐를 모두 flush
+    - 행마다 msg_uid(unique)를 붙여 INSERT IGNORE → COMMIT 후 연결이 끊겨 재시도해도 중복 저장되지 않음
+    """
+
+    def __init__(self,
+                 batch_size: int = settings.ws_write_batch_size,
+                 flush_interval: float = settings.ws_write_flush_interval,
+                 max_pending: int = settings.ws_write_max_pending,
+                 max_retry_delay: float = 5.0,
+                 delivered_attempts: int = 5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retry_delay = max_retry_delay
+        self.delivered_attempts = delivered_attempts
+        self._pending: deque[dict] = deque()
+        # (couple_id, 보낸 user_id) → ack 된 최대 chat_id
+        self._delivered_upto: dict[tuple[str, str], int] = {}
+        # 소켓 쓰기가 확인된 msg_uid → 반영 시도 횟수
+        self._delivered_uids: dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._failures = 0
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"[MessageWriteBehind] 시작: batch_size={self.batch_size}, flush_interval={self.flush_interval}s")
+
+    async def stop(self, drain_attempts: int = 5):
+        """남은 메시지를 모두 flush 하고 종료"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        for _ in range(drain_attempts):
+            if await self.flush():
+                break
+            await asyncio.sleep(self._retry_delay())
+        if self._pending or self._delivered_upto:
+            logger.error(f"[MessageWriteBehind] 종료 시 미저장 메시지 {len(self._pending)}건, "
+                         f"미반영 전달상태 {len(self._delivered_upto)}건")
+        logger.info("[MessageWriteBehind] 종료")
+
+    async def enqueue(self, row: dict):
+        """Message 컬럼 dict를 큐에 추가. DB 장애로 큐가 가득 차면 공간이 날 때까지 대기"""
+        while len(self._pending) >= self.max_pending and not self._closing:
+            await asyncio.sleep(self.flush_interval)
+        row.setdefault("msg_uid", uuid.uuid4().hex)
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def mark_delivered_upto(self, couple_id: str, sender_id: str, chat_id: int):
+        """sender_id가 보낸 chat_id 이하 미전달 메시지를 전달 완료로 표시"""
+        key = (couple_id, sender_id)
+        if chat_id > self._delivered_upto.get(key, 0):
+            self._delivered_upto[key] = chat_id
+        if len(self._delivered_upto) >= self.batch_size:
+            self._wakeup.set()
+
+    def mark_delivered(self, msg_uid: str):
+        """실시간 전송 프레임이 소켓에 써진 메시지를 전달 완료로 표시"""
+        self._delivered_uids.setdefault(msg_uid, 0)
+        if len(self._delivered_uids) >= self.batch_size:
+            self._wakeup.set()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> bool:
+        """큐를 비울 때까지 배치 단위로 저장. 실패 시 False"""
+        async with self._flush_lock:
+            # 행을 아직 찾지 못한 msg_uid는 이번 flush가 끝난 뒤 다음 주기로 넘김
+            unmatched: dict[str, int] = {}
+            try:
+                while self._pending or self._delivered_upto or self._delivered_uids:
+                    count = min(self.batch_size, len(self._pending))
+                    rows = [self._pending.popleft() for _ in range(count)]
+                    delivered_upto, self._delivered_upto = self._delivered_upto, {}
+                    delivered_uids, self._delivered_uids = self._delivered_uids, {}
+                    try:
+                        matched = await asyncio.to_thread(self._write_batch, rows, delivered_upto, list(delivered_uids))
+                    except Exception as e:
+                        # 순서를 유지한 채 되돌려 넣고 다음 주기에 재시도
+                        self._pending.extendleft(reversed(rows))
+                        for (couple_id, sender_id), chat_id in delivered_upto.items():
+                            self.mark_delivered_upto(couple_id, sender_id, chat_id)
+                        unmatched.update(delivered_uids)
+                        self._failures += 1
+                        logger.error(f"[MessageWriteBehind] 배치 저장 실패 ({self._failures}회 연속): "
+                                     f"rows={len(rows)}, error={e}")
+                        return False
+                    self._failures = 0
+                    for msg_uid, attempts in delivered_uids.items():
+                        if msg_uid not in matched and attempts + 1 < self.delivered_attempts:
+                            unmatched[msg_uid] = attempts + 1
+                return True
+            finally:
+                for msg_uid, attempts in unmatched.items():
+                    self._delivered_uids.setdefault(msg_uid, attempts)
+
+    def _write_batch(self, rows: list[dict], delivered_upto: dict[tuple[str, str], int],
+                     delivered_uids: list[str]) -> set[str]:
+        """반환: 전달 완료로 반영된(행이 존재하는) msg_uid"""
+        with SessionLocal() as db:
+            try:
+                if rows:
+                    # 이미 저장된 msg_uid는 건너뜀 (재시도 시 멱등)
+                    db.execute(insert(Message)
+                               .prefix_with("IGNORE", dialect="mysql")
+                               .prefix_with("OR IGNORE", dialect="sqlite"), rows)
+                for (couple_id, sender_id), chat_id in delivered_upto.items():
+                    db.query(Message).filter(
+                        Message.couple_id == couple_id,
+                        Message.user_id == sender_id,
+                        Message.is_delivered == False,  # noqa: E712
+                        Message.chat_id <= chat_id
+                    ).update({Message.is_delivered: True}, synchronize_session=False)
+                matched = set()
+                if delivered_uids:
+                    matched = {uid for (uid,) in db.query(Message.msg_uid)
+                               .filter(Message.msg_uid.in_(delivered_uids)).all()}
+                    db.query(Message).filter(Message.msg_uid.in_(delivered_uids))\
+                        .update({Message.is_delivered: True}, synchronize_session=False)
+                db.commit()
+                return matched
+            except SQLAlchemyError:
+                db.rollback()
+                raise
+
+    def _retry_delay(self) -> float:
+        return min(self.max_retry_delay, self.flush_interval * (2 ** self._failures))
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._retry_delay())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closing:
+                break
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception(f"[MessageWriteBehind] flush 루프 오류: {e}")
@@ -0,0 +1,81 @@
+import threading
+from typing import Callable, Dict
+
+
+class _Stat:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """
+    프로세스 내 경량 메트릭 (카운터 / 게이지 / 관측값)
+    GET /metrics 에서 snapshot()을 그대로 반환
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._gauge_fns: Dict[str, Callable[[], float]] = {}
+        self._stats: Dict[str, _Stat] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def register_gauge(self, name: str, fn: Callable[[], float]):
+        """snapshot 시점에 계산되는 게이지 등록"""
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = _Stat()
+            stat.add(value)
+
+    def get_counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            gauges = dict(self._gauges)
+            gauge_fns = dict(self._gauge_fns)
+            result = {
+                "counters": dict(self._counters),
+                "stats": {name: stat.to_dict() for name, stat in self._stats.items()},
+            }
+        for name, fn in gauge_fns.items():
+            try:
+                gauges[name] = fn()
+            except Exception:
+                gauges[name] = None
+        result["gauges"] = gauges
+        return result
+
+
+# 싱글톤 객체
+metrics = Metrics()
@@ -1,9 +1,18 @@
+import asyncio
+import hashlib
 from core.redis_v2.redis import RedisAIHistory
+from core.redis_v2.single_flight import SingleFlight
 from db.db_tables import AIMessage, AIChatSummary
 from db.db import SessionLocal
 from sqlalchemy.exc import SQLAlchemyError
+from utils.token_truncate import count_tokens
+
+# 히스토리 캐시 미스 시 DB fallback은 유저당 한 번만
+_history_flight = SingleFlight("chatbot_history")
 
 class AIChatHistoryManager:
+    __slots__ = ("user_id", "couple_id", "prompt_provider", "summary_provider", "redis")
+
     def __init__(self, user_id: str, couple_id: str,
                  prompt_provider: callable,
                  summary_provider: callable):
@@ -29,42 +38,144 @@ class AIChatHistoryManager:
 
                 chat_msgs = [{"role": m.role, "content": m.content, "id": m.id} if m.role != "function" 
                                else {"role": m.role, "content": m.content, "id": m.id, "name": m.name} for m in messages]
+                # 토큰 수 컬럼 도입 전 행만 여기서 계산
+                for msg, m in zip(chat_msgs, messages):
+                    msg["tokens"] = m.token_count if m.token_count is not None else count_tokens(m.content)
                                
                 return summary, chat_msgs
         except SQLAlchemyError as e:
             print(f"[DB fallback error] {e}")
             return None, []
 
-    def load(self) -> list[dict]:
-        history = self.redis.get(self.user_id)
+    @staticmethod
+    def _strip(history: list[dict]) -> list[dict]:
+        """system(프롬프트 또는 버전 ref) / summary 항목 제거 → 대화 메시지만"""
+        return [h for h in history if h["role"] not in ("system", "summary")]
+
+    async def _messages(self) -> list[dict]:
+        history = await self.redis.get(self.user_id)
         if not history:
-            summary, chat_msgs = self._fallback_from_db()
-            history = [self.prompt_provider()]
-            if summary:
-                history.append({"role": "summary", "content": summary})
-            history.extend(chat_msgs)
-            self.save(history)
-        else:
-            history = self.ensure_prompt_summary(history)
-        return history
+            # 같은 결과 리스트를 여러 호출이 받으므로 복사해서 반환 (호출 측이 리스트를 수정)
+            return list(await _history_flight.do(self.user_id, self._rebuild, check=self._get_cached))
+        messages = self._strip(history)
+        if any("content" in h for h in history if h["role"] in ("system", "summary")):
+            # 이전 형식(프롬프트/요약 본문 포함) → 한 번 ref 형식으로 다시 저장
+            await self.save(messages)
+        return messages
+
+    async def _get_cached(self) -> list[dict] | None:
+        history = await self.redis.get(self.user_id)
+        return self._strip(history) if history else None
+
+    async def _rebuild(self) -> list[dict]:
+        # 요약은 summary_provider가 DB에서 따로 읽으므로 메시지만 저장
+        _, chat_msgs = await asyncio.to_thread(self._fallback_from_db)
+        await self.save(chat_msgs)
+        return chat_msgs
+
+    async def load(self) -> list[dict]:
+        """system prompt + 요약 + 메시지 (요약 작업 등 전체 히스토리가 필요한 곳용)"""
+        return await self.ensure_prompt_summary(await self._messages())
+
+    async def open_context(self) -> "ChatContext":
+        """채팅 요청 1회용 컨텍스트 (prompt / 요약은 여기서 한 번만 조회)"""
+        messages = await self._messages()
+        system_prompt = await self.prompt_provider()
+        summary = await self.summary_provider()
+        return ChatContext(self, system_prompt, summary, messages)
+
+    async def save(self, history: list[dict], version: str = None):
+        """
+        Redis에는 system prompt 대신 버전 ref만 저장: [{"role": "system", "ref": 버전}] + 메시지
+        (프롬프트는 config로부터 매 요청 다시 만들 수 있으므로 히스토리에 중복 저장하지 않음)
+        """
+        if version is None:
+            version = prompt_version(await self.prompt_provider())
+        await self.redis.set(self.user_id, [{"role": "system", "ref": version}] + self._strip(history))
+
+    async def replace_summarized(self, snapshot: list[dict], remaining: list[dict]) -> bool:
+        """
+        요약 후 히스토리 교체: [system ref] + remaining + snapshot 이후 새로 추가된 메시지
+        요약(LLM 호출) 중에 append된 턴을 지우지 않도록 현재 list를 다시 읽어 합침
+        snapshot 마지막 메시지를 찾지 못하면(그 사이 재구성 등) 교체하지 않음
+        """
+        version = prompt_version(await self.prompt_provider())
+        anchor = snapshot[-1] if snapshot else None
+
+        def _merge(current: list[dict]) -> list[dict] | None:
+            messages = self._strip(current)
+            for i in range(len(messages) - 1, -1, -1):
+                if messages[i] == anchor:
+                    return [{"role": "system", "ref": version}] + remaining + messages[i + 1:]
+            return None
+
+        return await self.redis.update(self.user_id, _merge)
 
-    def save(self, history: list[dict]):
-        history = self.ensure_prompt_summary(history)
-        self.redis.set(self.user_id, history)
+    async def append_message(self, message: dict, messages: list[dict], version: str):
+        """메시지 한 건 RPUSH. 키가 없으면(만료 등) messages 전체로 다시 저장"""
+        if not await self.redis.append(self.user_id, message):
+            await self.save(messages, version)
 
-    def append(self, message: dict):
-        history = self.load()
-        history.append(message)
-        self.save(history)
+    async def append(self, message: dict):
+        context = await self.open_context()
+        await context.append(message)
 
-    def clear(self):
-        self.redis.clear(self.user_id)
+    async def clear(self):
+        await self.redis.clear(self.user_id)
 
-    def ensure_prompt_summary(self, history: list[dict]) -> list[dict]:
-        others = [h for h in history if h["role"] not in ("system", "summary")]
-        result = [self.prompt_provider()]
-        summary = self.summary_provider()
+    async def ledger(self) -> dict | None:
+        """히스토리 메시지 토큰 합 / 턴 수 ({"tokens", "turns"}), 없으면 None"""
+        return await self.redis.ledger(self.user_id)
+
+    async def ensure_prompt_summary(self, history: list[dict]) -> list[dict]:
+        result = [await self.prompt_provider()]
+        summary = await self.summary_provider()
         if summary:
             result.append({"role": "summary", "content": summary})
-        result.extend(others)
-        return result
\ No newline at end of file
+        result.extend(self._strip(history))
+        return result
+
+
+def prompt_version(system_prompt: dict) -> str:
+    return hashlib.sha1(system_prompt["content"].encode("utf-8")).hexdigest()[:12]
+
+
+class ChatContext:
+    """
+    채팅 요청 1회 동안 유지하는 히스토리
+    - system prompt / 요약은 생성 시 한 번만 조회하고, OpenAI 호출 직전에 assemble()로 합침
+    - messages에는 user / assistant / function 메시지만 보관
+    - append()는 Redis list에 한 건만 추가 (function call마다 전체 히스토리를 다시 쓰지 않음)
+    - 메시지마다 "tokens"(content 토큰 수)를 한 번만 계산해 함께 저장
+    """
+
+    def __init__(self, manager: AIChatHistoryManager, system_prompt: dict, summary: str | None, messages: list[dict]):
+        self.manager = manager
+        self.system_prompt = system_prompt
+        self.summary = summary
+        self.messages = messages
+        self.prompt_version = prompt_version(system_prompt)
+        self._fixed_tokens = None
+
+    @property
+    def fixed_tokens(self) -> int:
+        """system prompt + 요약 토큰 수 (요청당 한 번만 계산)"""
+        if self._fixed_tokens is None:
+            self._fixed_tokens = count_tokens(self.system_prompt["content"]) + count_tokens(self.summary)
+        return self._fixed_tokens
+
+    def head(self) -> list[dict]:
+        """메시지 앞에 항상 붙는 system prompt (+ 요약)"""
+        history = [self.system_prompt]
+        if self.summary:
+            history.append({"role": "summary", "content": self.summary})
+        return history
+
+    def assemble(self) -> list[dict]:
+        return self.head() + self.messages
+
+    async def append(self, message: dict):
+        if "tokens" not in message:
+            message["tokens"] = count_tokens(message["content"])
+        self.messages.append(message)
+        await self.manager.append_message(message, self.messages, self.prompt_version)
@@ -1,27 +1,66 @@
+import asyncio
 from core.settings import settings
 from db.db_tables import AIChatSummary
 from db.db import SessionLocal
-from core.redis_v2.redis import redis_client
+from core.redis_v2.redis import async_redis_client
+from core.redis_v2.l1_cache import summary_cache, invalidation_bus, MISS
+from core.redis_v2.circuit_breaker import FAILURE_ERRORS, report_degraded, write_buffer
+from core.redis_v2.instrumentation import track, nbytes
 
 class AISummaryProvider:
+    __slots__ = ("user_id", "redis_key")
+
     def __init__(self, user_id: str):
         self.user_id = user_id
         self.redis_key = f"chat_summary:{user_id}"
 
-    def get(self) -> str:
-        raw = redis_client.get(self.redis_key)
+    async def get(self) -> str:
+        cached = summary_cache.get(self.user_id)
+        if cached is not MISS:
+            return cached
+
+        try:
+            with track("chat_summary", "get", self.redis_key) as t:
+                raw = await async_redis_client.get(self.redis_key)
+                t.read = nbytes(raw)
+        except FAILURE_ERRORS as e:
+            # Redis 장애 시 DB에서 읽고 Redis 채우기는 생략
+            report_degraded("AISummaryProvider", self.redis_key, e)
+            summary = await asyncio.to_thread(self._load_from_db)
+            summary_cache.set(self.user_id, summary or "")
+            return summary or ""
         if raw:
+            summary_cache.set(self.user_id, raw)
             return raw
 
+        summary = await asyncio.to_thread(self._load_from_db)
+        if summary:
+            try:
+                await async_redis_client.set(self.redis_key, summary, ex=3600 * 6)
+            except FAILURE_ERRORS as e:
+                report_degraded("AISummaryProvider", self.redis_key, e)
+        # 요약이 없는 경우("")도 캐시해 매 호출 DB 조회 방지 (set 시 무효화)
+        summary_cache.set(self.user_id, summary or "")
+        return summary or ""
+
+    def _load_from_db(self) -> str | None:
         with SessionLocal() as db:
             latest = db.query(AIChatSummary)\
                 .filter_by(user_id=self.user_id)\
                 .order_by(AIChatSummary.created_at.desc())\
                 .first()
-            if latest:
-                redis_client.set(self.redis_key, latest.summary, ex=3600 * 6)
-                return latest.summary
-        return ""
+            return latest.summary if latest else None
+
+    async def set(self, summary: str):
+        async def _set():
+            with track("chat_summary", "set", self.redis_key) as t:
+                t.written = nbytes(summary)
+                await async_redis_client.set(self.redis_key, summary, ex=3600 * 6)
 
-    def set(self, summary: str):
-        redis_client.set(self.redis_key, summary, ex=3600 * 6)
+        try:
+            await _set()
+        except FAILURE_ERRORS as e:
+            report_degraded("AISummaryProvider", self.redis_key, e)
+            write_buffer.defer(self.redis_key, _set)
+        await invalidation_bus.invalidate("chat_summary", self.user_id)
+        summary_cache.set(self.user_id, summary)
@@ -0,0 +1,61 @@
+"""
+여러 키를 한 번의 round trip으로 처리하는 pipeline 헬퍼
+
+- atomic=True : MULTI/EXEC (읽기는 일관된 스냅샷, 쓰기는 중간 상태 노출 없음)
+                Redis Cluster에서는 모든 키가 같은 slot이어야 하므로 hash_tag로 엔티티 id를 묶을 것
+- atomic=False: 단순 pipeline (서로 다른 slot의 키도 가능, 클러스터 클라이언트는 노드별로 나눠 전송)
+- 절약한 round trip 수는 metrics의 redis.batch.* 카운터로 확인
+    saved = redis.batch.commands - redis.batch.roundtrips
+- 키 패밀리별 op/bytes/지연 시간은 instrumentation.record_keys로 기록
+"""
+import time
+from typing import Iterable, Optional
+from core.metrics import metrics
+from core.redis_v2.instrumentation import record_keys
+
+
+def hash_tag(entity_id) -> str:
+    """{entity_id} 형태로 감싸 같은 엔티티의 키들이 같은 cluster slot에 놓이도록"""
+    return f"{{{entity_id}}}"
+
+
+def record_batch(commands: int):
+    metrics.incr("redis.batch.roundtrips")
+    metrics.incr("redis.batch.commands", commands)
+    metrics.incr("redis.batch.roundtrips_saved", max(commands - 1, 0))
+
+
+async def get_many(client, keys: Iterable[str], atomic: bool = True) -> list:
+    keys = list(keys)
+    started = time.perf_counter()
+    pipe = client.pipeline(transaction=atomic)
+    for key in keys:
+        pipe.get(key)
+    values = await pipe.execute()
+    record_batch(len(keys))
+    record_keys("get", keys, started, read=values)
+    return values
+
+
+async def set_many(client, values: dict, ex: Optional[int] = None, atomic: bool = True):
+    """values 순서대로 SET (atomic=False일 때 먼저 쓴 키가 먼저 보이도록 순서를 의미 있게 둘 것)"""
+    started = time.perf_counter()
+    pipe = client.pipeline(transaction=atomic)
+    for key, value in values.items():
+        pipe.set(key, value, ex=ex)
+    await pipe.execute()
+    record_batch(len(values))
+    record_keys("set", list(values), started, written=list(values.values()))
+
+
+async def delete_many(client, keys: Iterable[str], atomic: bool = True) -> int:
+    """키별 DEL (한 번의 다중 키 DEL은 클러스터에서 cross-slot 에러)"""
+    keys = list(keys)
+    started = time.perf_counter()
+    pipe = client.pipeline(transaction=atomic)
+    for key in keys:
+        pipe.delete(key)
+    deleted = await pipe.execute()
+    record_batch(len(keys))
+    record_keys("delete", keys, started)
+    return sum(deleted)
@@ -0,0 +1,266 @@
+"""
+Redis circuit breaker + degraded mode 쓰기 버퍼
+
+- 모든 Redis 커넥션(동기/비동기, 문자열/바이너리)이 프로세스당 하나의 breaker를 공유
+  (같은 Redis 서버이므로 한 경로의 장애 = 전체 장애)
+- CLOSED: 연결/타임아웃 에러가 연속 failure_threshold번이면 OPEN
+- OPEN: 풀에서 커넥션을 꺼내는 시점에 CircuitOpenError로 즉시 실패 (Redis 타임아웃을 기다리지 않음)
+  CircuitOpenError는 redis ConnectionError 하위 클래스라 기존 except RedisError 처리로 그대로 fallback
+- reset_timeout 뒤 HALF_OPEN: 요청 하나만 probe로 통과, 성공하면 CLOSED / 실패하면 다시 OPEN
+- WRONGTYPE 같은 응답 에러는 장애가 아니므로 세지 않음
+- 메트릭: redis.breaker.state(0 closed / 1 half-open / 2 open), opened, rejected, open_seconds
+
+WriteBuffer: OPEN 동안 히스토리/요약 쓰기를 키별로 모아 두었다가 CLOSED가 되면 순서대로 재실행
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from core.metrics import metrics
+from core.redis_v2.instrumentation import record_op
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# 장애로 보는 에러 (응답 에러는 제외)
+FAILURE_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+
+class CircuitOpenError(RedisConnectionError):
+    """breaker가 열려 있어 Redis 호출 없이 즉시 실패"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = settings.redis_breaker_failure_threshold,
+                 reset_timeout: float = settings.redis_breaker_reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0      # 장애 시작 시각 (open_seconds 기록용)
+        self._retry_at = 0.0       # 다음 probe 허용 시각
+        self._probe_started = 0.0
+        # 동기 클라이언트는 스레드풀에서도 호출되므로 스레드 락
+        self._lock = threading.Lock()
+        self._on_close: List[Callable[[], None]] = []
+        metrics.register_gauge("redis.breaker.state", lambda: _STATE_GAUGE[self.state])
+        metrics.register_gauge("redis.breaker.open_for", self.open_for)
+
+    def on_close(self, callback: Callable[[], None]):
+        """OPEN/HALF_OPEN → CLOSED 전환 시 호출 (호출 스레드에서 실행되므로 가볍게)"""
+        self._on_close.append(callback)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != CLOSED
+
+    def open_for(self) -> float:
+        """현재 열린 상태로 지난 시간(초), 닫혀 있으면 0"""
+        return time.monotonic() - self._opened_at if self.state != CLOSED else 0.0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now >= self._retry_at:
+                self._set_state(HALF_OPEN)
+                self._probe_started = now
+                return True
+            # probe가 응답 없이 끝난 경우(커맨드 미실행 등) 다음 요청을 다시 probe로
+            if self.state == HALF_OPEN and now - self._probe_started >= self.reset_timeout:
+                self._probe_started = now
+                return True
+            return False
+
+    def check(self):
+        if not self.allow():
+            metrics.incr("redis.breaker.rejected")
+            raise CircuitOpenError("Redis circuit breaker open")
+
+    def record_success(self):
+        if self.state == CLOSED and self._failures == 0:
+            return
+        with self._lock:
+            self._failures = 0
+            if self.state == CLOSED:
+                return
+            open_seconds = time.monotonic() - self._opened_at
+            self._set_state(CLOSED)
+        metrics.observe("redis.breaker.open_seconds", open_seconds)
+        logger.info(f"[CircuitBreaker] Redis 복구, CLOSED 전환: open_seconds={open_seconds:.1f}")
+        for callback in self._on_close:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"[CircuitBreaker] on_close 콜백 실패: {e}")
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # probe 실패 → 다시 OPEN (장애 시작 시각은 유지해 전체 장애 시간을 기록)
+                self._set_state(OPEN)
+                self._retry_at = time.monotonic() + self.reset_timeout
+                return
+            self._failures += 1
+            if self.state != CLOSED or self._failures < self.failure_threshold:
+                return
+            self._opened_at = time.monotonic()
+            self._retry_at = self._opened_at + self.reset_timeout
+            self._set_state(OPEN)
+        metrics.incr("redis.breaker.opened")
+        logger.error(f"[CircuitBreaker] Redis 연속 실패 {self._failures}회, OPEN 전환: {error}")
+
+    def _set_state(self, state: str):
+        self.state = state
+
+
+# 싱글톤 객체
+redis_breaker = CircuitBreaker()
+
+
+def report_degraded(component: str, key: str, error: BaseException):
+    """degraded 경로 진입 기록. OPEN 상태의 즉시 실패는 로그 없이 카운트만 (장애 중 로그 폭주 방지)"""
+    metrics.incr(f"redis.degraded.{component}")
+    if not isinstance(error, CircuitOpenError):
+        logger.error(f"[{component}] Redis 장애, degraded 처리: key={key}, error={error}")
+
+
+class WriteBuffer:
+    """
+    OPEN 동안 실패한 쓰기를 키별로 보관 (히스토리 / 요약처럼 나중에 반영해야 하는 값)
+    - defer(key, op, replace=True): 같은 키의 이전 op를 버리고 교체 (전체 SET)
+      replace=False: 이전 op 뒤에 이어 붙임 (append)
+    - 최대 max_keys 키, 넘치면 가장 오래된 키부터 버림 (값은 DB에 있으므로 다음 읽기에서 재구성)
+    - start()한 이벤트 루프에서만 재실행 (Celery 등 루프가 없으면 버리고 카운트)
+    """
+
+    def __init__(self, max_keys: int = settings.redis_write_buffer_size):
+        self.max_keys = max_keys
+        self._ops: "OrderedDict[str, List[Callable[[], Awaitable]]]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._replaying = False
+        metrics.register_gauge("redis.write_buffer.size", lambda: len(self._ops))
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        redis_breaker.on_close(self._schedule_replay)
+
+    def defer(self, key: str, op: Callable[[], Awaitable], replace: bool = True):
+        if self._loop is None:
+            metrics.incr("redis.write_buffer.dropped")
+            logger.warning(f"[WriteBuffer] 버퍼 미사용 프로세스, 쓰기 버림: key={key}")
+            return
+        if replace or key not in self._ops:
+            self._ops.pop(key, None)
+            self._ops[key] = [op]
+        else:
+            self._ops[key].append(op)
+        metrics.incr("redis.write_buffer.buffered")
+        while len(self._ops) > self.max_keys:
+            dropped, _ = self._ops.popitem(last=False)
+            metrics.incr("redis.write_buffer.dropped")
+            logger.warning(f"[WriteBuffer] 버퍼 가득 참, 가장 오래된 쓰기 버림: key={dropped}")
+
+    def _schedule_replay(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.replay()))
+
+    async def replay(self):
+        if self._replaying or not self._ops:
+            return
+        self._replaying = True
+        replayed = 0
+        try:
+            while self._ops:
+                key, ops = self._ops.popitem(last=False)
+                for i, op in enumerate(ops):
+                    try:
+                        await op()
+                        replayed += 1
+                    except FAILURE_ERRORS as e:
+                        # 다시 장애 → 남은 op를 앞쪽에 되돌리고 다음 CLOSED 전환 때 재시도
+                        self._ops[key] = ops[i:]
+                        self._ops.move_to_end(key, last=False)
+                        logger.error(f"[WriteBuffer] 재실행 중단: key={key}, error={e}")
+                        return
+                    except Exception as e:
+                        metrics.incr("redis.write_buffer.failed")
+                        logger.error(f"[WriteBuffer] 재실행 실패, 건너뜀: key={key}, error={e}")
+        finally:
+            self._replaying = False
+            metrics.incr("redis.write_buffer.replayed", replayed)
+            logger.info(f"[WriteBuffer] 재실행 완료: ops={replayed}, 남은 키={len(self._ops)}")
+
+
+# 싱글톤 객체
+write_buffer = WriteBuffer()
+
+
+# --- 커넥션 / 풀 연결부 (redis.py에서 커넥션 클래스로 사용) ---
+
+class BreakerConnectionMixin:
+    """동기 커넥션: 연결/응답 결과를 breaker에 기록 (응답 수는 요청별 Redis 명령 수 집계에도 사용)"""
+
+    def connect(self, *args, **kwargs):
+        try:
+            result = super().connect(*args, **kwargs)
+        except FAILURE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        return result
+
+    def read_response(self, *args, **kwargs):
+        try:
+            response = super().read_response(*args, **kwargs)
+        except FAILURE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        redis_breaker.record_success()
+        record_op()
+        return response
+
+
+class AsyncBreakerConnectionMixin:
+    """비동기 커넥션: 연결/응답 결과를 breaker에 기록"""
+
+    async def connect(self, *args, **kwargs):
+        try:
+            result = await super().connect(*args, **kwargs)
+        except FAILURE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        return result
+
+    async def read_response(self, *args, **kwargs):
+        try:
+            response = await super().read_response(*args, **kwargs)
+        except FAILURE_ERRORS as e:
+            redis_breaker.record_failure(e)
+            raise
+        redis_breaker.record_success()
+        record_op()
+        return response
+
+
+class BreakerPoolMixin:
+    """풀에서 커넥션을 꺼낼 때 OPEN이면 즉시 CircuitOpenError"""
+
+    def get_connection(self, *args, **kwargs):
+        redis_breaker.check()
+        return super().get_connection(*args, **kwargs)
+
+
+class AsyncBreakerPoolMixin:
+    async def get_connection(self, *args, **kwargs):
+        redis_breaker.check()
+        return await super().get_connection(*args, **kwargs)
@@ -0,0 +1,91 @@
+"""
+Redis 값 압축 codec
+
+- threshold 이상인 값만 압축하고 앞에 형식 헤더(MAGIC + 알고리즘 1바이트)를 붙임
+- 헤더가 없는 값은 그대로 반환 → 압축 도입 전 값, 작은 값 모두 그대로 읽힘
+- 알고리즘: zstd > lz4 > zlib 중 설치된 것 (settings.redis_compress_algo로 고정 가능)
+- prefix(키 패밀리)별 redis.codec.{prefix}.* 로 압축률/인코딩·디코딩 시간 기록
+"""
+import time
+import zlib
+from core.metrics import metrics
+from core.settings import settings
+
+try:
+    import zstandard
+except ImportError:  # zstandard 미설치 시 lz4 / zlib 사용
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC = b"\x1fRZC\x01"
+ALGO_ZSTD = b"z"
+ALGO_LZ4 = b"l"
+ALGO_ZLIB = b"d"
+
+
+def _available() -> dict:
+    algos = {ALGO_ZLIB: (lambda data: zlib.compress(data, 6), zlib.decompress)}
+    if lz4_frame is not None:
+        algos[ALGO_LZ4] = (lz4_frame.compress, lz4_frame.decompress)
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3)
+        decompressor = zstandard.ZstdDecompressor()
+        algos[ALGO_ZSTD] = (compressor.compress, decompressor.decompress)
+    return algos
+
+
+_ALGOS = _available()
+_NAMES = {"zstd": ALGO_ZSTD, "lz4": ALGO_LZ4, "zlib": ALGO_ZLIB}
+
+
+def _default_algo() -> bytes:
+    preferred = _NAMES.get(settings.redis_compress_algo)
+    if preferred in _ALGOS:
+        return preferred
+    for algo in (ALGO_ZSTD, ALGO_LZ4, ALGO_ZLIB):
+        if algo in _ALGOS:
+            return algo
+
+
+DEFAULT_ALGO = _default_algo()
+
+
+def available_algos() -> dict:
+    """설치된 알고리즘 이름 → 헤더 바이트 (벤치마크용)"""
+    return {name: algo for name, algo in _NAMES.items() if algo in _ALGOS}
+
+
+def encode(prefix: str, data: bytes, threshold: int = None, algo: bytes = None) -> bytes:
+    """threshold 이상이면 압축 + 헤더. 압축해도 줄지 않으면 원본 저장"""
+    threshold = settings.redis_compress_threshold if threshold is None else threshold
+    algo = algo or DEFAULT_ALGO
+    if threshold < 0 or len(data) < threshold:
+        return data
+    start = time.perf_counter()
+    compressed = _ALGOS[algo][0](data)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    metrics.observe(f"redis.codec.{prefix}.encode_us", elapsed_us)
+    metrics.incr(f"redis.codec.{prefix}.bytes_in", len(data))
+    if len(compressed) + len(MAGIC) + 1 >= len(data):
+        metrics.incr(f"redis.codec.{prefix}.bytes_out", len(data))
+        metrics.incr(f"redis.codec.{prefix}.skipped")
+        return data
+    metrics.incr(f"redis.codec.{prefix}.bytes_out", len(compressed) + len(MAGIC) + 1)
+    metrics.observe(f"redis.codec.{prefix}.ratio", len(data) / len(compressed))
+    return MAGIC + algo + compressed
+
+
+def decode(prefix: str, data: bytes) -> bytes:
+    if data is None or not data.startswith(MAGIC):
+        return data
+    algo = data[len(MAGIC):len(MAGIC) + 1]
+    if algo not in _ALGOS:
+        raise ValueError(f"지원하지 않는 압축 형식: prefix={prefix}, algo={algo!r} (zstandard/lz4 설치 필요)")
+    start = time.perf_counter()
+    raw = _ALGOS[algo][1](data[len(MAGIC) + 1:])
+    metrics.observe(f"redis.codec.{prefix}.decode_us", (time.perf_counter() - start) * 1e6)
+    return raw
@@ -0,0 +1,212 @@
+"""
+Redis 키 패밀리별 계측
+
+- 저장소 클래스가 track(family, op, key)로 감싸 호출 → 패밀리별 op 수 / 읽은·쓴 bytes / 지연 시간 기록
+    redis.keyspace.{family}.ops.{op}, .errors.{op}, .bytes_read, .bytes_written, .latency_ms.{op}
+- 키 단위 접근은 hot_keys가 샘플링(redis_hotkey_sample_rate)해 상위 키만 유지 → GET /metrics/redis-hot-keys
+- 오프라인 메모리 리포트는 jobs/redis_keyspace_report.py (SCAN + MEMORY USAGE)
+- count_redis_ops(name): 요청 1회(예: 채팅 한 턴) 동안 실제 Redis로 나간 명령 수 → redis.ops_per_turn.{name}
+"""
+import contextvars
+import random
+import re
+import threading
+import time
+from collections import Counter
+from core.metrics import metrics
+from core.settings import settings
+
+# 알려진 키 패밀리 (긴 prefix부터 매칭)
+KNOWN_FAMILIES = sorted((
+    "chatbot:history",
+    "chatbot:history_ledger",
+    "chatroom:history",
+    "chatbot:faiss:index",
+    "chatbot:faiss:chunk_text",
+    "chatbot:faiss:meta",
+    "chatbot:faiss:chunks",
+    "chatbot:faiss:emb",
+    "chatbot:faiss:shape",
+    "chatbot:couple:user",
+    "chatbot:couple:pair",
+    "chatbot:presence",
+    "chatbot:ws:nodes",
+    "chatbot:ns:gen",
+    "chatbot:summary",
+    "chat_config",
+    "chat_summary",
+    "lock:sf",
+    "lock:summarize",
+    "celery-task-meta",
+), key=len, reverse=True)
+
+# id로 보이는 세그먼트 (숫자, hash tag, generation, 긴 hex)
+_ID_SEGMENT = re.compile(r"^(\{.*\}|g?\d+|[0-9a-f]{16,}|[0-9a-f-]{36})$")
+
+
+def key_family(key) -> str:
+    """키 → 패밀리 prefix (알려진 패밀리 우선, 그 외에는 id 세그먼트 앞까지)"""
+    if isinstance(key, bytes):
+        key = key.decode("utf-8", "replace")
+    for family in KNOWN_FAMILIES:
+        if key.startswith(family) and key[len(family):len(family) + 1] in ("", ":", "-"):
+            return family
+    segments = []
+    for segment in key.split(":"):
+        if _ID_SEGMENT.match(segment):
+            break
+        segments.append(segment)
+    return ":".join(segments) or "(unknown)"
+
+
+def nbytes(value) -> int:
+    """Redis 응답/값의 bytes 크기 (list는 항목 합, 그 외 타입은 0)"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(v) for v in value)
+    return 0
+
+
+class HotKeyTracker:
+    """
+    샘플링한 키 접근 횟수 (상위 max_keys개만 유지)
+    전체를 세지 않으므로 값은 샘플 수 기준 추정치 (count / sample_rate)
+    """
+
+    def __init__(self, sample_rate: float = settings.redis_hotkey_sample_rate, max_keys: int = 1000):
+        self.sample_rate = sample_rate
+        self.max_keys = max_keys
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > self.max_keys * 2:
+                self._counts = Counter(dict(self._counts.most_common(self.max_keys)))
+
+    def top(self, n: int = 20) -> list:
+        with self._lock:
+            items = self._counts.most_common(n)
+        return [
+            {"key": key, "family": key_family(key), "estimated_ops": round(count / self.sample_rate)}
+            for key, count in items
+        ]
+
+
+# 싱글톤 객체
+hot_keys = HotKeyTracker()
+
+
+class _KeyOp:
+    __slots__ = ("family", "op", "key", "read", "written", "_start")
+
+    def __init__(self, family: str, op: str, key: str = None):
+        self.family = family
+        self.op = op
+        self.key = key
+        self.read = 0
+        self.written = 0
+
+    def __enter__(self) -> "_KeyOp":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        prefix = f"redis.keyspace.{self.family}"
+        metrics.observe(f"{prefix}.latency_ms.{self.op}", (time.perf_counter() - self._start) * 1000)
+        metrics.incr(f"{prefix}.ops.{self.op}")
+        if exc_type is not None:
+            metrics.incr(f"{prefix}.errors.{self.op}")
+        if self.read:
+            metrics.incr(f"{prefix}.bytes_read", self.read)
+        if self.written:
+            metrics.incr(f"{prefix}.bytes_written", self.written)
+        if self.key is not None:
+            hot_keys.hit(self.key)
+        return False
+
+
+def track(family: str, op: str, key: str = None) -> _KeyOp:
+    """
+    with track(family, op, key) as t:
+        raw = await client.get(key)
+        t.read = len(raw)
+    """
+    return _KeyOp(family, op, key)
+
+
+def record_keys(op: str, keys: list, started: float, read: list = None, written: list = None):
+    """여러 키를 한 번에 처리한 batch op 기록 (키별 패밀리로 나눠 집계, 지연 시간은 batch 전체)"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    per_family: dict = {}
+    for i, key in enumerate(keys):
+        family = key_family(key)
+        stat = per_family.setdefault(family, [0, 0, 0])
+        stat[0] += 1
+        stat[1] += nbytes(read[i]) if read is not None else 0
+        stat[2] += nbytes(written[i]) if written is not None else 0
+        hot_keys.hit(key)
+    for family, (ops, bytes_read, bytes_written) in per_family.items():
+        prefix = f"redis.keyspace.{family}"
+        metrics.incr(f"{prefix}.ops.{op}", ops)
+        metrics.observe(f"{prefix}.latency_ms.{op}", elapsed_ms)
+        if bytes_read:
+            metrics.incr(f"{prefix}.bytes_read", bytes_read)
+        if bytes_written:
+            metrics.incr(f"{prefix}.bytes_written", bytes_written)
+
+
+class _OpCounter:
+    __slots__ = ("name", "ops", "closed", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ops = 0
+        self.closed = False
+
+    def __enter__(self) -> "_OpCounter":
+        self._token = _op_counter.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 턴 안에서 띄운 백그라운드 task도 같은 counter를 물려받으므로 닫아서 이후 명령은 세지 않음
+        self.closed = True
+        try:
+            _op_counter.reset(self._token)
+        except ValueError:
+            # 스트리밍 응답처럼 다른 context에서 종료된 경우 (closed 처리만으로 충분)
+            pass
+        metrics.observe(f"redis.ops_per_turn.{self.name}", self.ops)
+        return False
+
+    # async with semaphore, count_redis_ops(...) 형태로도 사용
+    async def __aenter__(self) -> "_OpCounter":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+_op_counter: contextvars.ContextVar = contextvars.ContextVar("redis_op_counter", default=None)
+
+
+def count_redis_ops(name: str) -> _OpCounter:
+    """
+    with count_redis_ops("ai_chat") as counter:
+        ...  # 이 안에서(하위 task / to_thread 포함) 실행된 Redis 명령 수가 counter.ops에 누적
+    L1 캐시 히트처럼 Redis까지 가지 않은 조회는 세지 않음
+    """
+    return _OpCounter(name)
+
+
+def record_op():
+    """커넥션이 응답 하나를 읽을 때마다 호출 (pipeline은 명령 수만큼)"""
+    counter = _op_counter.get()
+    if counter is not None and not counter.closed:
+        counter.ops += 1
@@ -0,0 +1,168 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from redis.exceptions import RedisError
+from core.redis_v2.redis import redis_client, async_redis_client
+from core.redis_v2.circuit_breaker import redis_breaker
+from core.metrics import metrics
+from core.settings import settings
+from utils import serialization
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+INVALIDATION_CHANNEL = "chatbot:l1:invalidate"
+
+MISS = object()
+
+
+class LocalCache:
+    """
+    프로세스 내 L1 캐시 (Redis 앞단, 작고 자주 읽히며 거의 안 바뀌는 값용)
+    - 최대 max_size 키 LRU + 키별 TTL
+    - 다른 워커의 쓰기는 invalidation_bus 메시지로 제거, 메시지를 놓쳐도 TTL로 수렴
+    - Redis circuit breaker가 열려 있는 동안은 TTL이 지난 값도 반환 (stale-if-error, l1.{family}.stale)
+    - 키 패밀리별 l1.{family}.hit/miss 카운터와 hit_rate 게이지
+    """
+
+    def __init__(self, family: str, max_size: int = settings.l1_cache_size, ttl: float = settings.l1_cache_ttl):
+        self.family = family
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        metrics.register_gauge(f"l1.{family}.hit_rate", self.hit_rate)
+        metrics.register_gauge(f"l1.{family}.size", lambda: len(self._entries))
+
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    def get(self, key: str) -> Any:
+        """값 또는 MISS"""
+        item = self._entries.get(key)
+        if item is not None and item[0] <= time.monotonic() and redis_breaker.is_open:
+            metrics.incr(f"l1.{self.family}.stale")
+            return item[1]
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                self._entries.pop(key, None)
+            self._misses += 1
+            metrics.incr(f"l1.{self.family}.miss")
+            return MISS
+        self._entries.move_to_end(key)
+        self._hits += 1
+        metrics.incr(f"l1.{self.family}.hit")
+        return item[1]
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            metrics.incr(f"l1.{self.family}.evicted")
+
+    def invalidate(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            metrics.incr(f"l1.{self.family}.invalidated")
+
+
+class L1InvalidationBus:
+    """
+    L1 캐시 무효화 pub/sub (chatbot:l1:invalidate)
+    - 쓰는 쪽은 invalidate(family, key): 로컬 즉시 제거 + publish → 다른 워커도 제거
+    - 동기 라우터(스레드풀)는 invalidate_sync: publish 후 로컬 제거는 이벤트 루프에 예약
+      (루프 밖 스레드에서 캐시를 직접 건드리지 않도록)
+    - 자기 노드가 보낸 메시지는 이미 로컬에 반영했으므로 수신 시 무시
+    """
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Callable[[str], Any]]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def register(self, family: str, handler: Callable[[str], Any]):
+        """family 무효화 시 호출할 핸들러 (LocalCache.invalidate 또는 async 함수)"""
+        self._handlers.setdefault(family, []).append(handler)
+
+    def register_cache(self, cache: LocalCache) -> LocalCache:
+        self.register(cache.family, cache.invalidate)
+        return cache
+
+    async def start(self):
+        if self._listener is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(INVALIDATION_CHANNEL)
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"[L1InvalidationBus] 시작: node_id={self.node_id}")
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    def _message(self, family: str, key: str) -> str:
+        return serialization.dumps({"origin": self.node_id, "family": family, "key": key})
+
+    async def invalidate(self, family: str, key: str):
+        await self._apply(family, key)
+        try:
+            await async_redis_client.publish(INVALIDATION_CHANNEL, self._message(family, key))
+            metrics.incr(f"l1.{family}.invalidation_published")
+        except RedisError as e:
+            logger.error(f"[L1InvalidationBus] publish 실패: family={family}, key={key}, error={e}")
+
+    def invalidate_sync(self, family: str, key: str):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._apply(family, key)))
+        try:
+            redis_client.publish(INVALIDATION_CHANNEL, self._message(family, key))
+            metrics.incr(f"l1.{family}.invalidation_published")
+        except RedisError as e:
+            logger.error(f"[L1InvalidationBus] publish 실패: family={family}, key={key}, error={e}")
+
+    async def _apply(self, family: str, key: str):
+        for handler in self._handlers.get(family, ()):
+            result = handler(key)
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def _listen(self):
+        while True:
+            try:
+                async for raw in self._pubsub.listen():
+                    if raw.get("type") != "message":
+                        continue
+                    try:
+                        message = serialization.loads(raw["data"])
+                        if message.get("origin") == self.node_id:
+                            continue
+                        await self._apply(message["family"], message["key"])
+                    except (serialization.JSONDecodeError, KeyError) as e:
+                        logger.warning(f"[L1InvalidationBus] 잘못된 메시지: {raw.get('data')!r:.100}, error={e}")
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                # 재연결 전까지 놓친 무효화는 TTL로 수렴
+                logger.error(f"[L1InvalidationBus] 수신 루프 오류, 재시도: {e}")
+                await asyncio.sleep(1)
+
+
+# 싱글톤 객체
+invalidation_bus = L1InvalidationBus()
+config_cache = invalidation_bus.register_cache(LocalCache("chat_config"))
+summary_cache = invalidation_bus.register_cache(LocalCache("chat_summary"))
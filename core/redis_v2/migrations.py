@@ -0,0 +1,26 @@
+"""
+Redis 키 마이그레이션 스크립트
+
+    python -m core.redis_v2.migrations
+"""
+from core.redis_v2.redis import redis_client, migrate_history_blob, RedisAIHistory, RedisCoupleHistory
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def migrate_history_blobs(scan_count: int = 500) -> dict:
+    """chatbot:history:*, chatroom:history:* 의 JSON blob 키를 list 타입으로 일괄 변환"""
+    result = {}
+    for storage in (RedisAIHistory(), RedisCoupleHistory()):
+        migrated = 0
+        for key in redis_client.scan_iter(match=f"{storage.prefix}:*", count=scan_count, _type="string"):
+            if migrate_history_blob(key, storage.expire):
+                migrated += 1
+        result[storage.prefix] = migrated
+        logger.info(f"✅ 히스토리 blob → list 변환 완료: prefix={storage.prefix}, keys={migrated}")
+    return result
+
+
+if __name__ == "__main__":
+    migrate_history_blobs()
@@ -0,0 +1,75 @@
+"""
+키 네임스페이스 generation
+
+- 키 형식: {prefix}:g{generation}:{suffix}
+- bump()로 generation을 올리면 이전 generation 키는 O(1)로 접근 불가 (KEYS/SCAN + DEL 불필요)
+- 남은 이전 generation 키는 core.redis_v2.reaper가 SCAN으로 조금씩 정리
+- 현재 generation은 L1 캐시에 두고 bump 시 invalidation_bus로 다른 워커에 전파
+  (메시지를 놓친 워커도 l1_cache_ttl 안에 새 generation으로 수렴, 그 사이 옛 키를 읽을 수 있음)
+"""
+from typing import Dict, Iterable, Optional
+from core.redis_v2.redis import async_redis_client
+from core.redis_v2.l1_cache import LocalCache, MISS, invalidation_bus
+from core.metrics import metrics
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+GENERATION_PREFIX = "chatbot:ns:gen"
+
+generation_cache = invalidation_bus.register_cache(LocalCache("namespace"))
+
+# name → KeyNamespace (reaper가 모든 네임스페이스를 순회할 때 사용)
+NAMESPACES: Dict[str, "KeyNamespace"] = {}
+
+
+class KeyNamespace:
+    def __init__(self, name: str, prefixes: Iterable[str]):
+        self.name = name
+        self.prefixes = tuple(prefixes)
+        NAMESPACES[name] = self
+
+    @property
+    def generation_key(self) -> str:
+        return f"{GENERATION_PREFIX}:{self.name}"
+
+    async def load_generation(self) -> int:
+        """L1을 거치지 않고 Redis의 현재 generation 조회 (reaper용)"""
+        raw = await async_redis_client.get(self.generation_key)
+        return int(raw) if raw else 0
+
+    async def generation(self) -> int:
+        cached = generation_cache.get(self.name)
+        if cached is not MISS:
+            return cached
+        generation = await self.load_generation()
+        generation_cache.set(self.name, generation)
+        return generation
+
+    async def key(self, prefix: str, suffix: str, generation: Optional[int] = None) -> str:
+        if generation is None:
+            generation = await self.generation()
+        return f"{prefix}:g{generation}:{suffix}"
+
+    async def bump(self) -> int:
+        """generation 증가 → 네임스페이스 전체 무효화"""
+        generation = await async_redis_client.incr(self.generation_key)
+        await invalidation_bus.invalidate("namespace", self.name)
+        metrics.incr(f"redis.namespace.{self.name}.bump")
+        logger.info(f"[KeyNamespace] generation 증가: name={self.name}, generation={generation}")
+        return generation
+
+    def owns(self, key: str) -> bool:
+        return any(key.startswith(f"{prefix}:") for prefix in self.prefixes)
+
+    def is_orphan(self, key: str, generation: int) -> bool:
+        """이 네임스페이스 키 중 현재 generation이 아닌 키 (generation 도입 전 키 포함)"""
+        return self.owns(key) and not any(key.startswith(f"{prefix}:g{generation}:") for prefix in self.prefixes)
+
+
+# 싱글톤 객체
+faiss_namespace = KeyNamespace("faiss", (
+    "chatbot:faiss:index",
+    "chatbot:faiss:chunk_text",
+    "chatbot:faiss:meta",
+))
@@ -1,32 +1,77 @@
-import json
+import asyncio
+from utils import serialization
 from core.settings import settings
 from db.db_tables import PersonaConfig, User, UserTraitSummary, Couple, EmotionLog
 from db.db import SessionLocal
 from services.ai.prompt_templates import PROMPT_REGISTRY
 
 from datetime import datetime, timedelta
-from core.redis_v2.redis import redis_client
+from core.redis_v2.redis import async_redis_client
+from core.redis_v2.l1_cache import config_cache, invalidation_bus, MISS
+from core.redis_v2.single_flight import SingleFlight
+from core.redis_v2.circuit_breaker import FAILURE_ERRORS, report_degraded, write_buffer
+from core.redis_v2.instrumentation import track, nbytes
 
 DEFAULT_NAME = "러비"
 USER_NAME = "사용자"
 DEFAULT_PERSONALITY = "Not given"
 
+# 같은 유저의 config 미스가 동시에 몰려도 DB 조회는 한 번
+_config_flight = SingleFlight("chat_config")
+
 
 class PersonaConfigService:
+    __slots__ = ("user_id", "couple_id", "redis_key")
+
     def __init__(self, user_id: str, couple_id: str):
         self.user_id = user_id
         self.couple_id = couple_id
         self.redis_key = f"chat_config:{user_id}"
 
-    def get_config(self) -> dict:
-        raw = redis_client.get(self.redis_key)
-        if raw is not None:
-            config = json.loads(raw) # type: ignore
-        else:
-            config = self._load_from_db()
-            redis_client.set(self.redis_key, json.dumps(config), ex=3600)
+    async def get_config(self) -> dict:
+        cached = config_cache.get(self.user_id)
+        if cached is not MISS:
+            return dict(cached)
+        config = await self._get_cached()
+        if config is None:
+            config = await _config_flight.do(self.user_id, self._rebuild, check=self._get_cached)
+        config_cache.set(self.user_id, config)
+        return dict(config)
+
+    async def _get_cached(self) -> dict | None:
+        try:
+            with track("chat_config", "get", self.redis_key) as t:
+                raw = await async_redis_client.get(self.redis_key)
+                t.read = nbytes(raw)
+        except FAILURE_ERRORS as e:
+            # Redis 장애 시 캐시 미스로 처리 → DB에서 재구성
+            report_degraded("PersonaConfigService", self.redis_key, e)
+            return None
+        return serialization.loads(raw) if raw is not None else None # type: ignore
+
+    async def _rebuild(self) -> dict:
+        config = await asyncio.to_thread(self._load_from_db)
+        raw = serialization.dumps(config)
+        try:
+            with track("chat_config", "set", self.redis_key) as t:
+                t.written = nbytes(raw)
+                await async_redis_client.set(self.redis_key, raw, ex=3600)
+        except FAILURE_ERRORS as e:
+            report_degraded("PersonaConfigService", self.redis_key, e)
         return config
 
+    async def _write(self, op):
+        try:
+            await op()
+        except FAILURE_ERRORS as e:
+            report_degraded("PersonaConfigService", self.redis_key, e)
+            write_buffer.defer(self.redis_key, op)
+
+    async def invalidate_cache(self):
+        """성향/감정 등 config 재료가 바뀌었을 때 Redis와 모든 워커의 L1 캐시 제거"""
+        await self._write(lambda: async_redis_client.delete(self.redis_key))
+        await invalidation_bus.invalidate("chat_config", self.user_id)
+
     def _load_from_db(self):
         with SessionLocal() as db:
             config = db.query(PersonaConfig).filter_by(couple_id=self.couple_id).first()
@@ -64,10 +109,15 @@ class PersonaConfigService:
                 "emotion": emotion_log.emotion if emotion_log else "Not Given"
             }
 
-    def set_persona_name(self, name: str):
-        config = self.get_config()
+    async def set_persona_name(self, name: str):
+        config = await self.get_config()
         config["persona_name"] = name
-        redis_client.set(self.redis_key, json.dumps(config), ex=3600)
+        raw = serialization.dumps(config)
+        await self._write(lambda: async_redis_client.set(self.redis_key, raw, ex=3600))
+        await invalidation_bus.invalidate("chat_config", self.user_id)
+        await asyncio.to_thread(self._save_persona_name, name)
+
+    def _save_persona_name(self, name: str):
         with SessionLocal() as db:
             obj = db.query(PersonaConfig).filter_by(couple_id=self.couple_id).first()
             if not obj:
@@ -77,12 +127,14 @@ class PersonaConfigService:
             db.commit()
 
 class PersonaPromptProvider:
+    __slots__ = ("config_service", "lang")
+
     def __init__(self, config_service: PersonaConfigService, lang: str = "ko"):
         self.config_service = config_service
         self.lang = lang
 
-    def get(self) -> dict:
-        config = self.config_service.get_config()
+    async def get(self) -> dict:
+        config = await self.config_service.get_config()
         prompt_template = PROMPT_REGISTRY.get(f"chatbot_prompt_{self.lang}", PROMPT_REGISTRY["chatbot_prompt_ko"])
 
         return {
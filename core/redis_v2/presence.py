@@ -0,0 +1,95 @@
+from typing import Iterable
+from redis.exceptions import RedisError
+from core.redis_v2.redis import async_redis_client
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+PRESENCE_PREFIX = "chatbot:presence"
+
+# ARGV: node_id, ttl(초)
+# 내 노드 필드의 만료 시각(서버 TIME 기준)을 갱신하고, 만료된 다른 노드 필드는 함께 정리
+_MARK_ONLINE = """
+local now = tonumber(redis.call('TIME')[1])
+if redis.call('TYPE', KEYS[1]).ok == 'string' then
+    -- 이전 형식(string = node_id) 키는 hash로 교체
+    redis.call('DEL', KEYS[1])
+end
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    if tonumber(entries[i + 1]) <= now then
+        redis.call('HDEL', KEYS[1], entries[i])
+    end
+end
+redis.call('HSET', KEYS[1], ARGV[1], now + tonumber(ARGV[2]))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class PresenceService:
+    """
+    Redis 기반 접속 상태
+    - chatbot:presence:{user_id} = hash {node_id: 만료 시각(epoch 초)}
+      여러 노드에 디바이스가 붙어 있어도 노드별 필드라 서로 덮어쓰지 않고, offline은 내 노드 필드만 삭제
+    - 만료 시각이 지나지 않은 필드가 하나라도 있으면 online (만료 판단은 서버 TIME 기준)
+    - 노드는 heartbeat 주기마다 로컬 유저들의 필드를 pipeline 한 번으로 갱신
+    - TTL이 지나면 자동으로 offline (close 프레임 없이 죽은 노드/소켓 정리)
+    """
+
+    def __init__(self, node_id: str, ttl: int = settings.ws_presence_ttl):
+        self.node_id = node_id
+        self.ttl = ttl
+        self._mark_online = async_redis_client.register_script(_MARK_ONLINE)
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"{PRESENCE_PREFIX}:{user_id}"
+
+    async def mark_online(self, user_id: str):
+        try:
+            await self._mark_online(keys=[self._key(user_id)], args=[self.node_id, self.ttl])
+        except RedisError as e:
+            logger.error(f"[PresenceService] online 설정 실패: user_id={user_id}, error={e}")
+
+    async def mark_offline(self, user_id: str):
+        # 내 노드 필드만 삭제 (다른 노드에 남은 디바이스의 presence는 유지, 마지막 필드면 키도 사라짐)
+        try:
+            await async_redis_client.hdel(self._key(user_id), self.node_id)
+        except RedisError as e:
+            logger.error(f"[PresenceService] offline 설정 실패: user_id={user_id}, error={e}")
+
+    async def refresh(self, user_ids: Iterable[str]):
+        """로컬 유저들의 presence를 한 번의 pipeline으로 갱신"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        try:
+            pipe = async_redis_client.pipeline(transaction=False)
+            for user_id in user_ids:
+                await self._mark_online(keys=[self._key(user_id)], args=[self.node_id, self.ttl], client=pipe)
+            await pipe.execute()
+        except RedisError as e:
+            logger.error(f"[PresenceService] heartbeat 갱신 실패: users={len(user_ids)}, error={e}")
+
+    async def is_online(self, user_id: str) -> bool:
+        return (await self.online_many([user_id])).get(user_id, False)
+
+    async def online_many(self, user_ids: Iterable[str]) -> dict[str, bool]:
+        """여러 유저의 접속 여부를 pipeline 한 번(TIME + HVALS)으로 조회"""
+        user_ids = [u for u in user_ids if u]
+        if not user_ids:
+            return {}
+        try:
+            pipe = async_redis_client.pipeline(transaction=False)
+            pipe.time()
+            for user_id in user_ids:
+                pipe.hvals(self._key(user_id))
+            # 이전 형식(string) 키의 WRONGTYPE은 offline으로 처리 (TTL 안에 사라짐)
+            (now, _), *expiries = await pipe.execute(raise_on_error=False)
+        except RedisError as e:
+            logger.error(f"[PresenceService] 조회 실패: users={len(user_ids)}, error={e}")
+            return {u: False for u in user_ids}
+        return {u: isinstance(values, list) and any(int(v) > now for v in values)
+                for u, values in zip(user_ids, expiries)}
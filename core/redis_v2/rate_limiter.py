@@ -0,0 +1,152 @@
+"""
+Redis token bucket rate limiter (클러스터 전체 공유)
+
+- 버킷: hash {tokens, ts}, Lua 한 번으로 리필 + 차감 (서버 TIME 기준이라 워커 시계 차이 무관)
+- 로컬 임대(lease): Redis에서 lease_size개를 한 번에 받아 워커 메모리에서 차감
+  → lease_size 요청마다 Redis round trip 한 번. 거절되면 retry_after까지 로컬에서 바로 429
+  (임대 후 쓰지 않은 토큰은 lease_ttl 뒤 버려지므로 실제 허용량은 설정값보다 약간 적을 수 있음)
+- Redis 장애 시에는 허용 (fail-open, redis.ratelimit.fail_open 카운트)
+"""
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import RedisError
+from core.redis_v2.redis import async_redis_client
+from core.redis_v2.circuit_breaker import report_degraded
+from core.metrics import metrics
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+RATE_LIMIT_PREFIX = "chatbot:ratelimit"
+
+# ARGV: rate(토큰/초), capacity, requested
+# 반환: {granted, retry_after_ms}
+_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+local retry_after = 0
+if granted == 0 then
+    retry_after = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {granted, retry_after}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    name: str
+    per_minute: float
+    burst: int
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60
+
+
+class _Lease:
+    __slots__ = ("tokens", "expires_at", "denied_until")
+
+    def __init__(self):
+        self.tokens = 0
+        self.expires_at = 0.0
+        self.denied_until = 0.0
+
+
+class TokenBucketLimiter:
+    def __init__(self, lease_size: int = settings.chat_rate_lease_size, lease_ttl: float = 2.0):
+        self.lease_size = max(1, lease_size)
+        self.lease_ttl = lease_ttl
+        self._leases: Dict[str, _Lease] = {}
+        self._script = async_redis_client.register_script(_TOKEN_BUCKET)
+
+    @staticmethod
+    def _key(limit: RateLimit, id_: str) -> str:
+        return f"{RATE_LIMIT_PREFIX}:{limit.name}:{id_}"
+
+    async def check(self, buckets: List[Tuple[RateLimit, str]]) -> Optional[float]:
+        """
+        모든 버킷에서 1토큰씩 차감. 허용이면 None, 거절이면 retry_after(초)
+        로컬 임대로 해결되지 않는 버킷만 pipeline 한 번으로 Redis에 요청
+        """
+        now = time.monotonic()
+        retry_after = 0.0
+        refill = []
+        for limit, id_ in buckets:
+            key = self._key(limit, id_)
+            lease = self._leases.get(key)
+            if lease is not None and lease.denied_until > now:
+                retry_after = max(retry_after, lease.denied_until - now)
+            elif lease is None or lease.tokens <= 0 or lease.expires_at <= now:
+                refill.append((limit, key))
+        if retry_after:
+            metrics.incr("redis.ratelimit.rejected_local")
+            return retry_after
+
+        if refill:
+            try:
+                pipe = async_redis_client.pipeline(transaction=False)
+                for limit, key in refill:
+                    await self._script(keys=[key], args=[limit.rate, limit.burst, min(self.lease_size, limit.burst)],
+                                       client=pipe)
+                results = await pipe.execute()
+            except RedisError as e:
+                report_degraded("TokenBucketLimiter", refill[0][1], e)
+                metrics.incr("redis.ratelimit.fail_open")
+                return None
+            metrics.incr("redis.ratelimit.redis_checks")
+            for (limit, key), (granted, retry_ms) in zip(refill, results):
+                lease = self._leases.setdefault(key, _Lease())
+                if granted > 0:
+                    lease.tokens = int(granted)
+                    lease.expires_at = now + self.lease_ttl
+                else:
+                    lease.tokens = 0
+                    lease.denied_until = now + int(retry_ms) / 1000
+                    retry_after = max(retry_after, int(retry_ms) / 1000)
+            self._evict(now)
+        if retry_after:
+            metrics.incr("redis.ratelimit.rejected")
+            return retry_after
+
+        for limit, id_ in buckets:
+            self._leases[self._key(limit, id_)].tokens -= 1
+        metrics.incr("redis.ratelimit.allowed")
+        return None
+
+    def _evict(self, now: float):
+        # 만료된 임대 정리 (활성 유저 수만큼만 유지)
+        if len(self._leases) > 10000:
+            for key in [k for k, v in self._leases.items() if v.expires_at <= now and v.denied_until <= now]:
+                del self._leases[key]
+
+
+USER_CHAT_LIMIT = RateLimit("chat:user", settings.chat_rate_user_per_minute, settings.chat_rate_user_burst)
+COUPLE_CHAT_LIMIT = RateLimit("chat:couple", settings.chat_rate_couple_per_minute, settings.chat_rate_couple_burst)
+
+# 싱글톤 객체
+chat_rate_limiter = TokenBucketLimiter()
+
+
+def retry_after_header(retry_after: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
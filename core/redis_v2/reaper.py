@@ -0,0 +1,116 @@
+"""
+FAISS 캐시(chatbot:faiss:*) 고아 키 정리 (SCAN 기반, KEYS 미사용)
+
+- 네임스페이스 키: 현재 generation이 아닌 키 (namespace.bump() 이후 남은 키)
+- hash tag 도입 전 키: {prefix}:{id} 형식이 아닌 FAISS chunk 캐시 키
+- 대상은 generation / hash tag로 관리하는 FAISS 패밀리뿐
+  히스토리·요약·persona config 등 나머지 chatbot:* 키는 generation이 없고 모두 TTL이 있어 만료로 정리됨
+- SCAN 한 페이지(batch)마다 UNLINK pipeline 한 번 + pause → Redis를 오래 붙잡지 않음
+- 앱에서는 KeyReaper가 주기적으로 실행 (여러 워커 중 한 곳만, 락 TTL = 실행 주기)
+
+    python -m core.redis_v2.reaper
+"""
+import asyncio
+from collections import Counter
+from typing import Optional
+from redis.exceptions import RedisError
+from core.redis_v2.redis import async_redis_client, run_sync, RedisFaissChunkCache
+from core.redis_v2.namespace import NAMESPACES
+from core.redis_v2.utils import RedisLock
+from core.metrics import metrics
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# 정리 대상 패밀리(NAMESPACES, HASH_TAGGED_PREFIXES)가 모두 이 패턴 안에 있어야 함
+REAP_PATTERN = "chatbot:faiss:*"
+REAPER_LOCK_KEY = "chatbot:reaper:lock"
+
+# 키가 반드시 {prefix}:{entity_id} 형태여야 하는 패밀리
+HASH_TAGGED_PREFIXES = (
+    RedisFaissChunkCache.CHUNK_PREFIX,
+    RedisFaissChunkCache.EMB_PREFIX,
+    RedisFaissChunkCache.SHAPE_PREFIX,
+)
+
+
+def _family(key: str) -> str:
+    return ":".join(key.split(":")[:3])
+
+
+async def _orphan_rules() -> list:
+    rules = []
+    for namespace in NAMESPACES.values():
+        generation = await namespace.load_generation()
+        rules.append(lambda key, ns=namespace, gen=generation: ns.is_orphan(key, gen))
+    for prefix in HASH_TAGGED_PREFIXES:
+        rules.append(lambda key, p=prefix: key.startswith(f"{p}:") and not key.startswith(f"{p}:{{"))
+    return rules
+
+
+async def reap_orphans(batch: int = settings.redis_reaper_batch, pause: float = 0.01,
+                       max_keys: Optional[int] = None) -> dict:
+    """REAP_PATTERN을 SCAN하며 고아 키 UNLINK. 패밀리별 삭제 수 반환"""
+    rules = await _orphan_rules()
+    deleted: Counter = Counter()
+    scanned = 0
+    cursor = 0
+    while True:
+        cursor, keys = await async_redis_client.scan(cursor=cursor, match=REAP_PATTERN, count=batch)
+        scanned += len(keys)
+        orphans = [key for key in keys if any(rule(key) for rule in rules)]
+        if orphans:
+            pipe = async_redis_client.pipeline(transaction=False)
+            for key in orphans:
+                pipe.unlink(key)
+            await pipe.execute()
+            for key in orphans:
+                deleted[_family(key)] += 1
+                metrics.incr(f"redis.reaper.deleted.{_family(key)}")
+        metrics.incr("redis.reaper.scanned", len(keys))
+        if cursor == 0 or (max_keys is not None and scanned >= max_keys):
+            break
+        await asyncio.sleep(pause)
+    logger.info(f"[KeyReaper] 정리 완료: scanned={scanned}, deleted={dict(deleted)}")
+    return dict(deleted)
+
+
+class KeyReaper:
+    """settings.redis_reaper_interval 초마다 reap_orphans 실행 (0이면 비활성)"""
+
+    def __init__(self, interval: float = settings.redis_reaper_interval):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # 락은 해제하지 않음 → interval 동안 다른 워커는 건너뜀
+                if await RedisLock(REAPER_LOCK_KEY, ttl=self.interval, auto_extend=False).acquire():
+                    await reap_orphans()
+            except RedisError as e:
+                logger.error(f"[KeyReaper] 정리 실패: {e}")
+
+
+# 싱글톤 객체
+key_reaper = KeyReaper()
+
+
+if __name__ == "__main__":
+    run_sync(reap_orphans)
@@ -1,23 +1,93 @@
+import asyncio
 import json
 import redis
+import redis.asyncio as aioredis
 import traceback
 from core.settings import settings
+from core.metrics import metrics
 from db.db_tables import Couple, AIMessage, Message, AIChatSummary
 from db.db import SessionLocal
 from sqlalchemy.exc import SQLAlchemyError
 import numpy as np
+from core.redis_v2.batch import hash_tag, get_many, set_many, delete_many, record_batch
+from core.redis_v2 import codec
+from core.redis_v2.instrumentation import track, nbytes
+from core.redis_v2.circuit_breaker import (
+    BreakerConnectionMixin, AsyncBreakerConnectionMixin, BreakerPoolMixin, AsyncBreakerPoolMixin,
+    FAILURE_ERRORS, report_degraded, write_buffer,
+)
 from utils.log_utils import get_logger
+from utils import serialization
+from utils.token_truncate import message_tokens
 
 logger = get_logger(__name__)
 
-# Redis 연결
-redis_client = redis.StrictRedis(host=settings.redis_host,
-                                 port=settings.redis_port,
-                                 db=0,
-                                 decode_responses=True,
-                                 ssl=True)
+
+def _pool_kwargs(decode_responses: bool) -> dict:
+    return dict(host=settings.redis_host,
+                port=settings.redis_port,
+                db=0,
+                decode_responses=decode_responses,
+                max_connections=settings.redis_max_connections)
+
+
+# 모든 커넥션/풀은 circuit breaker를 거침 (circuit_breaker.redis_breaker 공유)
+class _Connection(BreakerConnectionMixin, redis.Connection): pass
+class _SSLConnection(BreakerConnectionMixin, redis.SSLConnection): pass
+class _AsyncConnection(AsyncBreakerConnectionMixin, aioredis.Connection): pass
+class _AsyncSSLConnection(AsyncBreakerConnectionMixin, aioredis.SSLConnection): pass
+class _ConnectionPool(BreakerPoolMixin, redis.ConnectionPool): pass
+class _AsyncBlockingConnectionPool(AsyncBreakerPoolMixin, aioredis.BlockingConnectionPool): pass
+
+
+# 워커 전체가 공유하는 커넥션 풀 (문자열 / 바이너리)
+_sync_pool = _ConnectionPool(
+    connection_class=_SSLConnection if settings.redis_ssl else _Connection,
+    **_pool_kwargs(True))
+_sync_bin_pool = _ConnectionPool(
+    connection_class=_SSLConnection if settings.redis_ssl else _Connection,
+    **_pool_kwargs(False))
+
+# 비동기 풀은 가득 차면 에러 대신 redis_pool_timeout 동안 대기
+_async_pool = _AsyncBlockingConnectionPool(
+    connection_class=_AsyncSSLConnection if settings.redis_ssl else _AsyncConnection,
+    timeout=settings.redis_pool_timeout,
+    **_pool_kwargs(True))
+_async_bin_pool = _AsyncBlockingConnectionPool(
+    connection_class=_AsyncSSLConnection if settings.redis_ssl else _AsyncConnection,
+    timeout=settings.redis_pool_timeout,
+    **_pool_kwargs(False))
+
+# 동기 Redis 연결 (Celery, 마이그레이션 스크립트 등 이벤트 루프 밖에서 사용)
+redis_client = redis.StrictRedis(connection_pool=_sync_pool)
+redis_bin_client = redis.StrictRedis(connection_pool=_sync_bin_pool)
+
+# 비동기 Redis 연결 (요청 처리 경로는 모두 이쪽 사용)
+async_redis_client = aioredis.StrictRedis(connection_pool=_async_pool)
+async_redis_bin_client = aioredis.StrictRedis(connection_pool=_async_bin_pool)
+
+
+def run_sync(coro_fn, *args, **kwargs):
+    """
+    Celery 태스크 등 이벤트 루프 밖에서 async 저장소 코드를 실행하는 shim
+    asyncio.run은 호출마다 새 루프를 만들므로, 끝나면 비동기 풀 커넥션을 닫아 다음 루프에서 새로 열게 함
+    """
+    async def _runner():
+        try:
+            return await coro_fn(*args, **kwargs)
+        finally:
+            await _async_pool.disconnect()
+            await _async_bin_pool.disconnect()
+    return asyncio.run(_runner())
+
 
 class RedisStorageBase:
+    """
+    prefix:id 키에 JSON 값 저장
+    값은 바이너리 클라이언트로 읽고 쓰며, 큰 값은 codec으로 압축 (헤더 없는 기존 값도 그대로 읽힘)
+    Redis 장애(circuit breaker OPEN 포함) 시 읽기는 캐시 미스(None)로 처리해 호출 측이 DB로 fallback,
+    쓰기는 write_buffer에 보관했다가 복구 후 재실행
+    """
     def __init__(self, prefix: str, expire: int = 3600):
         self.prefix = prefix
         self.expire = expire
@@ -25,142 +95,493 @@ class RedisStorageBase:
     def _key(self, id_: str) -> str:
         return f"{self.prefix}:{id_}"
 
-    def get(self, id_: str) -> list | None:
-        raw = redis_client.get(self._key(id_))
-        return json.loads(raw) if raw else None
+    def _dumps(self, value) -> bytes:
+        return codec.encode(self.prefix, serialization.dumps_bytes(value))
+
+    def _loads(self, raw: bytes):
+        return serialization.loads(codec.decode(self.prefix, raw))
+
+    async def _read(self, id_: str, name: str, op, default=None):
+        """name: 계측용 op 이름 (instrumentation.track)"""
+        key = self._key(id_)
+        try:
+            with track(self.prefix, name, key) as t:
+                result = await op()
+                t.read = nbytes(result)
+            return result
+        except FAILURE_ERRORS as e:
+            report_degraded(type(self).__name__, key, e)
+            return default
+
+    async def _write(self, id_: str, name: str, op, written: int = 0, replace: bool = True):
+        """op: 재실행 가능한 쓰기 (실패 시 같은 op를 버퍼에 보관)"""
+        key = self._key(id_)
+        try:
+            with track(self.prefix, name, key) as t:
+                t.written = written
+                return await op()
+        except FAILURE_ERRORS as e:
+            report_degraded(type(self).__name__, key, e)
+            write_buffer.defer(key, op, replace=replace)
+
+    async def get(self, id_: str) -> list | None:
+        raw = await self._read(id_, "get", lambda: async_redis_bin_client.get(self._key(id_)))
+        return self._loads(raw) if raw else None
+
+    async def set(self, id_: str, value: list):
+        data = self._dumps(value)
+        await self._write(id_, "set", lambda: async_redis_bin_client.set(self._key(id_), data, ex=self.expire),
+                          written=len(data))
+
+    async def clear(self, id_: str):
+        await self._write(id_, "clear", lambda: async_redis_bin_client.delete(self._key(id_)))
+
+
+# KEYS: list, [ledger hash, ledger items list]  ARGV: item, max_len, expire, tokens, turns
+# 키가 있을 때만 RPUSHX → 넘친 항목 LPOP → EXPIRE
+# ledger items는 list와 같은 순서로 항목별 "tokens:turns"를 평문 보관 → 잘린 항목 차감까지 같은 호출에서 처리
+# 반환: list 길이 (0이면 키 없음)
+_APPEND = """
+local n = redis.call('RPUSHX', KEYS[1], ARGV[1])
+if n == 0 then
+    return 0
+end
+local over = n - tonumber(ARGV[2])
+for _ = 1, over do
+    redis.call('LPOP', KEYS[1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if KEYS[2] then
+    if redis.call('EXISTS', KEYS[2]) == 1 and redis.call('LLEN', KEYS[3]) == n - 1 then
+        redis.call('RPUSH', KEYS[3], ARGV[4] .. ':' .. ARGV[5])
+        local tokens = tonumber(ARGV[4])
+        local turns = tonumber(ARGV[5])
+        for _ = 1, over do
+            local entry = redis.call('LPOP', KEYS[3])
+            local sep = string.find(entry, ':', 1, true)
+            tokens = tokens - tonumber(string.sub(entry, 1, sep - 1))
+            turns = turns - tonumber(string.sub(entry, sep + 1))
+        end
+        redis.call('HINCRBY', KEYS[2], 'tokens', tokens)
+        redis.call('HINCRBY', KEYS[2], 'turns', turns)
+        redis.call('EXPIRE', KEYS[2], ARGV[3])
+        redis.call('EXPIRE', KEYS[3], ARGV[3])
+    else
+        -- 항목별 기록이 list와 어긋남(ledger 없음 등) → ledger 제거, 다음 set에서 다시 계산
+        redis.call('DEL', KEYS[2], KEYS[3])
+    end
+end
+return n
+"""
+
+_append_script = async_redis_bin_client.register_script(_APPEND)
+
 
-    def set(self, id_: str, value: list):
-        redis_client.set(self._key(id_), json.dumps(value), ex=self.expire)
+class RedisListStorageBase(RedisStorageBase):
+    """
+    히스토리용 Redis list 저장소 (항목별 JSON 인코딩)
+    - append: Lua 한 번으로 RPUSHX + 길이 제한 + EXPIRE (+ ledger 갱신) → O(1), 동시 append도 유실 없음
+      키가 없으면(RPUSHX 0) ledger도 건드리지 않음
+    - 기존 JSON blob(string) 키는 처음 접근할 때 list로 변환
+    """
+    def __init__(self, prefix: str, expire: int = 3600, max_len: int = 100):
+        super().__init__(prefix, expire)
+        self.max_len = max_len
 
-    def clear(self, id_: str):
-        redis_client.delete(self._key(id_))
+    def _on_set(self, pipe, id_: str, value: list):
+        """set 트랜잭션에 함께 넣을 명령 (하위 클래스에서 부가 키 갱신용)"""
 
+    def _ledger_keys(self, id_: str) -> list[str]:
+        """append와 함께 갱신할 [ledger hash, ledger items list] 키 (없으면 빈 리스트, list와 같은 slot이어야 함)"""
+        return []
+
+    def _ledger_delta(self, item: dict) -> tuple[int, int]:
+        """항목 하나의 ledger 증가분 (tokens, turns)"""
+        return 0, 0
+
+    async def _with_migration(self, key: str, op):
+        try:
+            return await op()
+        except redis.exceptions.ResponseError as e:
+            if "WRONGTYPE" not in str(e):
+                raise
+            # 변환은 키당 한 번뿐인 드문 경로라 동기 구현을 스레드에서 재사용
+            await asyncio.to_thread(migrate_history_blob, key, self.expire)
+            return await op()
+
+    async def range(self, id_: str, start: int = 0, stop: int = -1) -> list:
+        key = self._key(id_)
+        raw_items = await self._read(
+            id_, "range", lambda: self._with_migration(key, lambda: async_redis_bin_client.lrange(key, start, stop)),
+            default=[])
+        return [self._loads(item) for item in raw_items]
+
+    async def get(self, id_: str) -> list | None:
+        return await self.range(id_) or None
+
+    async def set(self, id_: str, value: list):
+        key = self._key(id_)
+        items = [self._dumps(item) for item in value]
+
+        async def _set():
+            pipe = async_redis_bin_client.pipeline(transaction=True)
+            pipe.delete(key)
+            if items:
+                pipe.rpush(key, *items)
+                pipe.expire(key, self.expire)
+            self._on_set(pipe, id_, value)
+            await pipe.execute()
+
+        await self._write(id_, "set", _set, written=nbytes(items))
+
+    async def update(self, id_: str, fn, retries: int = 5) -> bool:
+        """
+        현재 list를 읽어 fn(items)가 돌려준 값으로 교체 (fn이 None이면 그대로 둠)
+        WATCH로 읽은 뒤 다른 append가 끼어들면 다시 읽어 재시도 → 그 사이 추가된 항목을 덮어쓰지 않음
+        Redis 장애 / 재시도 초과 시 False
+        """
+        key = self._key(id_)
+        try:
+            async with async_redis_bin_client.pipeline(transaction=True) as pipe:
+                for _ in range(retries):
+                    try:
+                        await pipe.watch(key)
+                        value = fn([self._loads(raw) for raw in await pipe.lrange(key, 0, -1)])
+                        if value is None:
+                            await pipe.unwatch()
+                            return False
+                        pipe.multi()
+                        pipe.delete(key)
+                        if value:
+                            pipe.rpush(key, *(self._dumps(item) for item in value))
+                            pipe.expire(key, self.expire)
+                        self._on_set(pipe, id_, value)
+                        await pipe.execute()
+                        return True
+                    except redis.exceptions.WatchError:
+                        metrics.incr(f"redis.list_update.retry.{self.prefix}")
+                        continue
+        except FAILURE_ERRORS as e:
+            report_degraded(type(self).__name__, key, e)
+            return False
+        logger.warning(f"[{type(self).__name__}] update 재시도 초과: key={key}")
+        return False
+
+    async def append(self, id_: str, item: dict) -> bool:
+        """
+        키가 있을 때만 append. 키가 없으면 False (호출 측에서 set으로 초기화)
+        Redis 장애 시 버퍼에 보관하고 True (원본은 DB에 저장되므로 초기화 불필요)
+        """
+        key = self._key(id_)
+        data = self._dumps(item)
+
+        keys = [key] + self._ledger_keys(id_)
+        tokens, turns = self._ledger_delta(item)
+
+        async def _append():
+            return await _append_script(keys=keys, args=[data, self.max_len, self.expire, tokens, turns],
+                                        client=async_redis_bin_client)
+
+        appended = await self._write(id_, "append", lambda: self._with_migration(key, _append),
+                                     written=len(data), replace=False)
+        return appended is None or appended > 0
+
+
+class RedisAIHistory(RedisListStorageBase):
+    """
+    AI 채팅 히스토리 + 토큰 ledger
+    ledger(chatbot:history_ledger:{user_id} hash): 히스토리 메시지의 토큰 합(tokens) / user 메시지 수(turns)
+    ledger items(chatbot:history_ledger:{user_id}:items list): 히스토리 항목별 "tokens:turns" (같은 순서)
+    - 세 키 모두 hash_tag(user_id)로 같은 cluster slot → append Lua / set MULTI에서 함께 다룸
+    - append Lua에서 누적, max_len을 넘어 잘린 항목은 items에서 꺼내 같은 호출 안에서 차감
+    - set에서 저장 항목 기준으로 다시 계산 → 요약 조건 확인이 O(1)
+    - 키가 없어 append가 실패(False)하면 호출 측 set이 ledger도 덮어써 어긋난 값이 바로 복구됨
+    """
+    LEDGER_PREFIX = "chatbot:history_ledger"
 
-class RedisAIHistory(RedisStorageBase):
     def __init__(self):
-        super().__init__(prefix="chatbot:history")
+        # 요약 전까지 잘리지 않도록 여유 있게 (요약 주기 턴 수보다 충분히 크게)
+        super().__init__(prefix="chatbot:history", max_len=500)
+
+    def _key(self, id_: str) -> str:
+        return f"{self.prefix}:{hash_tag(id_)}"
+
+    def _ledger_key(self, id_: str) -> str:
+        return f"{self.LEDGER_PREFIX}:{hash_tag(id_)}"
+
+    def _ledger_keys(self, id_: str) -> list[str]:
+        ledger_key = self._ledger_key(id_)
+        return [ledger_key, f"{ledger_key}:items"]
+
+    def _on_set(self, pipe, id_: str, value: list):
+        ledger_key, items_key = self._ledger_keys(id_)
+        deltas = [self._ledger_delta(item) for item in value]
+        pipe.delete(ledger_key, items_key)
+        pipe.hset(ledger_key, mapping={
+            "tokens": sum(tokens for tokens, _ in deltas),
+            "turns": sum(turns for _, turns in deltas),
+        })
+        pipe.expire(ledger_key, self.expire)
+        if deltas:
+            pipe.rpush(items_key, *(f"{tokens}:{turns}" for tokens, turns in deltas))
+            pipe.expire(items_key, self.expire)
+
+    def _ledger_delta(self, item: dict) -> tuple[int, int]:
+        if item["role"] in ("system", "summary"):
+            return 0, 0
+        return message_tokens(item), int(item["role"] == "user")
+
+    async def ledger(self, id_: str) -> dict | None:
+        """{"tokens": int, "turns": int}. 없거나 Redis 장애면 None (호출 측이 히스토리로 직접 계산)"""
+        ledger_key = self._ledger_key(id_)
+        raw = await self._read(id_, "ledger", lambda: async_redis_bin_client.hgetall(ledger_key), default={})
+        if not raw:
+            return None
+        return {k.decode(): int(v) for k, v in raw.items()}
 
-    def append(self, user_id: str, message: dict):
-        history = self.get(user_id) or []
-        history.append(message)
-        self.set(user_id, history[-100:])
+    async def clear(self, id_: str):
+        await self._write(id_, "clear",
+                          lambda: async_redis_bin_client.delete(self._key(id_), *self._ledger_keys(id_)))
 
 
-class RedisCoupleHistory(RedisStorageBase):
+class RedisCoupleHistory(RedisListStorageBase):
     def __init__(self):
         super().__init__(prefix="chatroom:history")
 
-    def get(self, couple_id: str) -> list:
-        raw = redis_client.get(self._key(couple_id))
-        if raw:
-            return json.loads(raw)
-        return self._load_from_db(couple_id)
+    async def get(self, couple_id: str) -> list:
+        history = await self.range(couple_id)
+        if history:
+            return history
+        return await self._load_from_db(couple_id)
 
-    def _load_from_db(self, couple_id: str) -> list:
+    def _query_db(self, couple_id: str) -> list:
         with SessionLocal() as db:
             rows = db.query(Message).filter_by(couple_id=couple_id)\
                     .order_by(Message.created_at.desc())\
-                    .limit(100).all()
-            history = [{"user_id": r.user_id, "content": r.content} for r in reversed(rows)]
-            self.set(couple_id, history)
-            return history
+                    .limit(self.max_len).all()
+            return [{"user_id": r.user_id, "content": r.content} for r in reversed(rows)]
 
-    def append(self, couple_id: str, message: dict):
-        history = self.get(couple_id) or []
-        history.append(message)
-        self.set(couple_id, history[-100:])
+    async def _load_from_db(self, couple_id: str) -> list:
+        history = await asyncio.to_thread(self._query_db, couple_id)
+        await self.set(couple_id, history)
+        return history
 
+    async def append(self, couple_id: str, message: dict) -> bool:
+        if await super().append(couple_id, message):
+            return True
+        # 캐시가 비어 있으면 DB 최근 내역 + 새 메시지로 초기화
+        history = await asyncio.to_thread(self._query_db, couple_id) + [message]
+        await self.set(couple_id, history[-self.max_len:])
+        return True
+
+
+def migrate_history_blob(key: str, expire: int = 3600) -> bool:
+    """기존 JSON blob(string) 히스토리 키를 list 타입으로 변환. 변환했으면 True"""
+    with redis_client.pipeline(transaction=True) as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.type(key) != "string":
+                return False
+            raw = pipe.get(key)
+            ttl = pipe.ttl(key)
+            items = json.loads(raw) if raw else []
+            pipe.multi()
+            pipe.delete(key)
+            if items:
+                pipe.rpush(key, *[serialization.dumps(item) for item in items])
+                pipe.expire(key, ttl if ttl and ttl > 0 else expire)
+            pipe.execute()
+            return True
+        except redis.exceptions.WatchError:
+            # 다른 요청이 먼저 변환함
+            return False
+        except json.JSONDecodeError as e:
+            logger.error(f"⚠️ 히스토리 blob 파싱 실패, 삭제: key={key}, error={e}")
+            redis_client.delete(key)
+            return False
 
-redis_bin_client = redis.StrictRedis(
-    host=settings.redis_host,
-    port=settings.redis_port,
-    db=0,
-    decode_responses=False,
-    ssl=True
-)
 
 class RedisFaissChunkCache:
+    """
+    유저별 chunk/embedding/shape 3개 키를 한 번의 MULTI로 저장·조회
+    키에 hash tag({user_id})를 붙여 Redis Cluster에서도 같은 slot에 위치
+    """
     CHUNK_PREFIX = "chatbot:faiss:chunks"
     EMB_PREFIX = "chatbot:faiss:emb"
     SHAPE_PREFIX = "chatbot:faiss:shape"
 
     @classmethod
     def _chunk_key(cls, user_id):
-        return f"{cls.CHUNK_PREFIX}:{user_id}"
+        return f"{cls.CHUNK_PREFIX}:{hash_tag(user_id)}"
 
     @classmethod
     def _emb_key(cls, user_id):
-        return f"{cls.EMB_PREFIX}:{user_id}"
+        return f"{cls.EMB_PREFIX}:{hash_tag(user_id)}"
 
     @classmethod
     def _shape_key(cls, user_id):
-        return f"{cls.SHAPE_PREFIX}:{user_id}"
+        return f"{cls.SHAPE_PREFIX}:{hash_tag(user_id)}"
 
     @classmethod
-    def save(cls, user_id, chunks, embeddings_np):
-        # chunk info: json (utf-8) 저장은 redis_client(문자열)
-        redis_client.set(cls._chunk_key(user_id), json.dumps(chunks))
-        # np.array: 바이너리 저장은 redis_bin_client
-        redis_bin_client.set(cls._emb_key(user_id), embeddings_np.tobytes())
-        redis_bin_client.set(cls._shape_key(user_id), json.dumps(list(embeddings_np.shape)).encode("utf-8"))
+    def _keys(cls, user_id):
+        return [cls._chunk_key(user_id), cls._emb_key(user_id), cls._shape_key(user_id)]
 
     @classmethod
-    def load(cls, user_id):
-        chunks_raw = redis_client.get(cls._chunk_key(user_id))
-        emb_raw = redis_bin_client.get(cls._emb_key(user_id))
-        shape_raw = redis_bin_client.get(cls._shape_key(user_id))
+    async def save(cls, user_id, chunks, embeddings_np):
+        # 한 트랜잭션에 넣기 위해 모두 바이너리 클라이언트로 저장 (JSON은 utf-8 bytes)
+        chunk_key, emb_key, shape_key = cls._keys(user_id)
+        await set_many(async_redis_bin_client, {
+            chunk_key: codec.encode(cls.CHUNK_PREFIX, serialization.dumps_bytes(chunks)),
+            emb_key: embeddings_np.tobytes(),  # float32는 압축률이 낮아(~1.1x) 원본 저장
+            shape_key: serialization.dumps_bytes(list(embeddings_np.shape)),
+        })
+
+    @classmethod
+    async def load(cls, user_id):
+        chunks_raw, emb_raw, shape_raw = await get_many(async_redis_bin_client, cls._keys(user_id))
         if not chunks_raw or not emb_raw or not shape_raw:
             return None, None
-        chunks = json.loads(chunks_raw)
-        shape = tuple(json.loads(shape_raw.decode("utf-8")))
+        chunks = serialization.loads(codec.decode(cls.CHUNK_PREFIX, chunks_raw))
+        shape = tuple(serialization.loads(shape_raw))
         embeddings_np = np.frombuffer(emb_raw, dtype=np.float32).reshape(shape)
         return chunks, embeddings_np
 
     @classmethod
-    def clear(cls, user_id):
-        redis_client.delete(cls._chunk_key(user_id))
-        redis_bin_client.delete(cls._emb_key(user_id))
-        redis_bin_client.delete(cls._shape_key(user_id))
-        
+    async def clear(cls, user_id):
+        await delete_many(async_redis_bin_client, cls._keys(user_id))
+
+
+def _couple_user_key(user_id: str) -> str:
+    return f"chatbot:couple:user:{user_id}"
+
+
+def _couple_pair_key(couple_id: str) -> str:
+    return f"chatbot:couple:pair:{couple_id}"
+
+
+def _query_couple(user_id: str):
+    """DB에서 (couple_id, user_1, user_2) 조회. 없으면 None"""
+    with SessionLocal() as db:
+        couple = db.query(Couple).filter(
+            (Couple.user_1 == user_id) | (Couple.user_2 == user_id),
+            Couple.deleted_at.is_(None)
+        ).first()
+        if not couple:
+            return None
+        return couple.couple_id, couple.user_1, couple.user_2
+
+
+# --- 커플 매핑 (동기: Celery/동기 라우터용 shim) ---
+
+def _couple_mapping_values(user1: str, user2: str, couple_id: str) -> dict:
+    # 키들이 서로 다른 slot이라 MULTI 대신 단순 pipeline.
+    # pair를 먼저 써서 user 키가 보이는 시점에는 pair도 항상 존재하도록
+    return {
+        _couple_pair_key(couple_id): json.dumps([user1, user2]),
+        _couple_user_key(user1): couple_id,
+        _couple_user_key(user2): couple_id,
+    }
+
 def save_couple_mapping(user1: str, user2: str, couple_id: str):
-    redis_client.set(f"chatbot:couple:user:{user1}", couple_id)
-    redis_client.set(f"chatbot:couple:user:{user2}", couple_id)
-    redis_client.set(f"chatbot:couple:pair:{couple_id}", json.dumps([user1, user2]))
+    values = _couple_mapping_values(user1, user2, couple_id)
+    pipe = redis_client.pipeline(transaction=False)
+    for key, value in values.items():
+        pipe.set(key, value)
+    pipe.execute()
+    record_batch(len(values))
+
+def delete_couple_mapping(couple_id: str, user_ids):
+    # user 키를 먼저 지워 pair만 남는 구간은 있어도 pair 없는 user 키는 없도록
+    keys = [_couple_user_key(u) for u in user_ids if u] + [_couple_pair_key(couple_id)]
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.delete(key)
+        pipe.execute()
+        record_batch(len(keys))
+    except redis.exceptions.RedisError as e:
+        logger.error(f"❌ 커플 매핑 삭제 실패: couple_id={couple_id}, error={e}")
 
 def load_couple_mapping(user_id: str):
     try:
-        couple_id = redis_client.get(f"chatbot:couple:user:{user_id}")
+        couple_id = redis_client.get(_couple_user_key(user_id))
         if couple_id:
             try:
                 if isinstance(couple_id, bytes):
                       couple_id = couple_id.decode()
-                pair_json = redis_client.get(f"chatbot:couple:pair:{couple_id}")
+                pair_json = redis_client.get(_couple_pair_key(couple_id))
                 if pair_json:
                     user1, user2 = json.loads(pair_json)
                     partner = user2 if user_id == user1 else user1
                     return couple_id, partner
+            except FAILURE_ERRORS as e:
+                report_degraded("couple_mapping", user_id, e)
             except (redis.exceptions.RedisError, json.JSONDecodeError) as e:
                 traceback.print_exc()
                 logger.error(f"⚠️ pair_json 조회 실패: {e}")
+    except FAILURE_ERRORS as e:
+        report_degraded("couple_mapping", user_id, e)
     except redis.exceptions.RedisError as e:
         traceback.print_exc()
         logger.error(f"❌ Redis 접근 실패: {e}")
 
     # Redis가 비정상적이거나 데이터 없으면 → DB fallback
     try:
-        with SessionLocal() as db:
-            couple = db.query(Couple).filter(
-                (Couple.user_1 == user_id) | (Couple.user_2 == user_id)
-            ).first()
-            if not couple:
-                return None, None
-
-            couple_id = couple.couple_id
-            user1 = couple.user_1
-            user2 = couple.user_2
+        row = _query_couple(user_id)
+        if not row:
+            return None, None
+        couple_id, user1, user2 = row
+        try:
             save_couple_mapping(user1, user2, couple_id)  # Redis에 저장 시도
-            partner = user2 if user_id == user1 else user1
-            return couple_id, partner
+        except redis.exceptions.RedisError as e:
+            report_degraded("couple_mapping", user_id, e)
+        partner = user2 if user_id == user1 else user1
+        return couple_id, partner
     except Exception as e:
         print(f"❌ DB 접근 실패: {e}")
         return None, None
+
+
+# --- 커플 매핑 (비동기: 요청 처리 경로) ---
+
+async def async_save_couple_mapping(user1: str, user2: str, couple_id: str):
+    await set_many(async_redis_client, _couple_mapping_values(user1, user2, couple_id), atomic=False)
+
+async def async_load_couple_mapping(user_id: str):
+    try:
+        with track("chatbot:couple:user", "get", _couple_user_key(user_id)) as t:
+            couple_id = await async_redis_client.get(_couple_user_key(user_id))
+            t.read = nbytes(couple_id)
+        if couple_id:
+            try:
+                with track("chatbot:couple:pair", "get", _couple_pair_key(couple_id)) as t:
+                    pair_json = await async_redis_client.get(_couple_pair_key(couple_id))
+                    t.read = nbytes(pair_json)
+                if pair_json:
+                    user1, user2 = json.loads(pair_json)
+                    partner = user2 if user_id == user1 else user1
+                    return couple_id, partner
+            except FAILURE_ERRORS as e:
+                report_degraded("couple_mapping", user_id, e)
+            except (redis.exceptions.RedisError, json.JSONDecodeError) as e:
+                logger.error(f"⚠️ pair_json 조회 실패: {e}")
+    except FAILURE_ERRORS as e:
+        report_degraded("couple_mapping", user_id, e)
+    except redis.exceptions.RedisError as e:
+        logger.error(f"❌ Redis 접근 실패: {e}")
+
+    # Redis가 비정상적이거나 데이터 없으면 → DB fallback (스레드에서 실행)
+    try:
+        row = await asyncio.to_thread(_query_couple, user_id)
+        if not row:
+            return None, None
+        couple_id, user1, user2 = row
+        try:
+            await async_save_couple_mapping(user1, user2, couple_id)  # Redis에 저장 시도
+        except redis.exceptions.RedisError as e:
+            report_degraded("couple_mapping", user_id, e)
+        partner = user2 if user_id == user1 else user1
+        return couple_id, partner
+    except Exception as e:
+        logger.error(f"❌ DB 접근 실패: {e}")
+        return None, None
@@ -0,0 +1,143 @@
+"""
+Single-flight: 같은 key의 동시 캐시 재구성을 한 번으로 합침
+
+- 프로세스 내: key별 Future 하나, 나중에 온 호출은 첫 호출(leader)의 결과/예외를 그대로 받음
+- 프로세스 간: RedisLock(lock:sf:{name}:{key})을 잡은 쪽만 build 실행
+  나머지는 poll_interval부터 max_poll_interval까지 간격을 두 배씩 늘리며 check()로 leader가 채운 캐시를 확인
+  leader는 build가 성공하면 락 해제 전에 완료 표시(done:sf:{name}:{key})를 남김
+  → 락이 풀렸는데 캐시가 비어 있어도 완료 표시가 있으면 on_empty()로 끝냄 (채울 데이터가 없는 경우)
+  완료 표시도 없으면(leader 실패) 직접 락을 잡고 build, wait_timeout을 넘겨도 직접 build
+- check를 넘기지 않으면 프로세스 내 합치기만 수행
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from redis.exceptions import RedisError
+from core.redis_v2.redis import async_redis_client
+from core.redis_v2.utils import RedisLock
+from core.redis_v2.circuit_breaker import report_degraded
+from core.metrics import metrics
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    def __init__(self, name: str, lock_ttl: float = 30, wait_timeout: float = 10.0, poll_interval: float = 0.05,
+                 max_poll_interval: float = 1.0, on_empty: Optional[Callable[[], Any]] = None):
+        """
+        on_empty: leader가 build를 끝냈는데 캐시가 비어 있을 때 대기 측이 돌려줄 값
+                  None이면 대기 측도 직접 build (캐시 쓰기 실패 등 빈 캐시가 정상이 아닌 경우)
+        """
+        self.name = name
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.on_empty = on_empty
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, build: Callable[[], Awaitable[Any]],
+                 check: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """
+        build: 원본(DB 등)에서 값을 만들고 캐시에 채우는 함수
+        check: 캐시에서 값을 읽는 함수, 아직 없으면 None
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            metrics.incr(f"singleflight.{self.name}.shared_local")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await (self._distributed(key, build, check) if check else build())
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 기다리는 호출이 없을 때 "exception was never retrieved" 경고 방지
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _distributed(self, key: str, build, check) -> Any:
+        lock = RedisLock(f"lock:sf:{self.name}:{key}", ttl=self.lock_ttl)
+        done_key = f"done:sf:{self.name}:{key}"
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            try:
+                acquired = await lock.acquire()
+            except RedisError as e:
+                # Redis 장애 시 프로세스 내 합치기만 하고 바로 재구성
+                report_degraded("SingleFlight", lock.key, e)
+                metrics.incr(f"singleflight.{self.name}.leader")
+                return await build()
+
+            if acquired:
+                try:
+                    # 락을 기다리는 사이 다른 프로세스가 이미 채웠을 수 있음
+                    result = await check()
+                    if result is not None:
+                        metrics.incr(f"singleflight.{self.name}.shared_remote")
+                        return result
+                    metrics.incr(f"singleflight.{self.name}.leader")
+                    await self._clear_done(done_key)
+                    result = await build()
+                    await self._mark_done(done_key)
+                    return result
+                finally:
+                    await lock.release()
+
+            # 다른 프로세스가 재구성 중 → 캐시가 채워지거나 락이 풀릴 때까지 대기
+            try:
+                result = await self._wait_remote(lock.key, check, deadline)
+                done = result is None and self.on_empty is not None and await async_redis_client.exists(done_key)
+            except RedisError as e:
+                report_degraded("SingleFlight", lock.key, e)
+                metrics.incr(f"singleflight.{self.name}.leader")
+                return await build()
+            if result is not None:
+                metrics.incr(f"singleflight.{self.name}.shared_remote")
+                return result
+            if done:
+                # leader가 끝났지만 채울 데이터가 없었음 → 다시 build하지 않음
+                metrics.incr(f"singleflight.{self.name}.shared_empty")
+                return self.on_empty()
+            if time.monotonic() >= deadline:
+                metrics.incr(f"singleflight.{self.name}.timeout")
+                logger.warning(f"[SingleFlight] 대기 시간 초과, 직접 재구성: name={self.name}, key={key}")
+                return await build()
+            # leader가 실패하고 락을 놓음 → 다시 락 획득 시도
+
+    async def _mark_done(self, done_key: str):
+        # 대기 측이 락 해제를 알아챌 때까지만 남으면 됨
+        try:
+            await async_redis_client.set(done_key, 1, px=int(max(self.max_poll_interval * 2, 1.0) * 1000))
+        except RedisError as e:
+            report_degraded("SingleFlight", done_key, e)
+
+    async def _clear_done(self, done_key: str):
+        # 이전 leader의 완료 표시가 이번 build의 실패를 가리지 않도록
+        try:
+            await async_redis_client.delete(done_key)
+        except RedisError as e:
+            report_degraded("SingleFlight", done_key, e)
+
+    async def _wait_remote(self, lock_key: str, check, deadline: float) -> Any:
+        """락이 풀리거나 deadline까지 check() 폴링 (간격은 지수 증가). 캐시가 채워지면 그 값, 아니면 None"""
+        interval = self.poll_interval
+        while await async_redis_client.exists(lock_key):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.max_poll_interval)
+            result = await check()
+            if result is not None:
+                return result
+        return await check()
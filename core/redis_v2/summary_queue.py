@@ -0,0 +1,169 @@
+"""
+AI 채팅 요약 스케줄러 (Redis sorted set 기반 지연 큐)
+
+- pending zset: member=user_id, score=실행 예정 시각 (서버 TIME 기준)
+  enqueue는 ZADD LT → 이미 예약된 유저는 더 이른 시각으로만 당겨지고, 늦은 예약은 무시
+  · PRIORITY_NORMAL: debounce 뒤 실행 → 창 안의 여러 턴 트리거가 한 번으로 합쳐짐
+  · PRIORITY_HIGH: 바로 실행 (ledger상 요약 조건을 이미 넘은 경우)
+- 워커는 due 항목을 Lua 한 번으로 pending → processing(score=가시성 만료 시각)으로 옮겨 claim
+  처리 중 워커가 죽으면 가시성 만료 후 다음 claim에서 pending으로 되돌아가 다시 실행됨 (재시작에도 유실 없음)
+- live 채팅보다 낮은 우선순위: busy()가 True(채팅 동시 처리 한도 도달)면 그 주기는 claim하지 않음
+- 메트릭: summary_queue.depth / processing / lag_seconds(가장 오래 밀린 항목), .wait_seconds(예정 시각 → 시작),
+  .job_ms, .processed, .failed, .yielded
+
+    python -m jobs.summary_worker   # 웹 워커와 분리된 전용 프로세스로 실행 (SUMMARY_WORKER_ENABLED=false와 함께)
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from core.redis_v2.redis import async_redis_client
+from core.redis_v2.batch import hash_tag
+from core.redis_v2.circuit_breaker import report_degraded
+from core.metrics import metrics
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# 두 키가 같은 cluster slot에 있어야 Lua에서 함께 다룰 수 있음
+PENDING_KEY = f"chatbot:summary:{hash_tag('queue')}:pending"
+PROCESSING_KEY = f"chatbot:summary:{hash_tag('queue')}:processing"
+
+PRIORITY_NORMAL = "normal"
+PRIORITY_HIGH = "high"
+
+# ARGV: delay(초), member
+_ENQUEUE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+return redis.call('ZADD', KEYS[1], 'LT', now + tonumber(ARGV[1]), ARGV[2])
+"""
+
+# ARGV: limit, visibility_timeout(초)
+# 반환: {now, member1, due1, member2, due2, ...}
+_CLAIM = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, member in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], member)
+    redis.call('ZADD', KEYS[1], 'LT', now, member)
+end
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'WITHSCORES', 'LIMIT', 0, tonumber(ARGV[1]))
+local result = {tostring(now)}
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+    redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), due[i])
+    table.insert(result, due[i])
+    table.insert(result, due[i + 1])
+end
+return result
+"""
+
+
+class SummaryScheduler:
+    def __init__(self,
+                 debounce: float = settings.summary_debounce_seconds,
+                 concurrency: int = settings.summary_worker_concurrency,
+                 poll_interval: float = settings.summary_poll_interval,
+                 visibility_timeout: float = settings.summary_visibility_timeout):
+        self.debounce = debounce
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self._enqueue_script = async_redis_client.register_script(_ENQUEUE)
+        self._claim_script = async_redis_client.register_script(_CLAIM)
+        self._handler: Optional[Callable[[str], Awaitable]] = None
+        self._busy: Callable[[], bool] = lambda: False
+        self._jobs: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, user_id: str, priority: str = PRIORITY_NORMAL):
+        """요약 예약. Redis 장애 시 이번 트리거는 버림 (다음 턴에서 다시 예약됨)"""
+        delay = 0 if priority == PRIORITY_HIGH else self.debounce
+        try:
+            await self._enqueue_script(keys=[PENDING_KEY], args=[delay, user_id])
+            metrics.incr(f"summary_queue.enqueued.{priority}")
+        except RedisError as e:
+            report_degraded("SummaryScheduler", PENDING_KEY, e)
+
+    async def start(self, handler: Callable[[str], Awaitable], busy: Callable[[], bool] = None):
+        """handler(user_id): 실제 요약 작업, busy(): True면 이번 주기 claim 생략"""
+        if self._task is not None:
+            return
+        self._handler = handler
+        self._busy = busy or (lambda: False)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # 진행 중 작업은 processing에 남아 가시성 만료 후 다른 워커가 다시 실행
+        for job in list(self._jobs):
+            job.cancel()
+        await asyncio.gather(*self._jobs, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._poll()
+            except RedisError as e:
+                report_degraded("SummaryScheduler", PENDING_KEY, e)
+            except Exception as e:
+                logger.error(f"[SummaryScheduler] poll 실패: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self):
+        await self._report_stats()
+        if self._busy():
+            metrics.incr("summary_queue.yielded")
+            return
+        free = self.concurrency - len(self._jobs)
+        if free <= 0:
+            return
+        result = await self._claim_script(keys=[PENDING_KEY, PROCESSING_KEY], args=[free, self.visibility_timeout])
+        now = float(result[0])
+        for i in range(1, len(result), 2):
+            user_id = result[i]
+            metrics.observe("summary_queue.wait_seconds", max(0.0, now - float(result[i + 1])))
+            job = asyncio.create_task(self._process(user_id))
+            self._jobs.add(job)
+            job.add_done_callback(self._jobs.discard)
+
+    async def _process(self, user_id: str):
+        # 동시 실행 수는 _poll에서 concurrency - 진행 중 작업 수만큼만 claim해 제한
+        started = time.perf_counter()
+        try:
+            await self._handler(user_id)
+            metrics.incr("summary_queue.processed")
+        except Exception as e:
+            # 실패한 작업은 재시도하지 않음 (다음 채팅 턴에서 다시 예약됨)
+            metrics.incr("summary_queue.failed")
+            logger.error(f"[SummaryScheduler] 요약 실패: user_id={user_id}, error={e}")
+        metrics.observe("summary_queue.job_ms", (time.perf_counter() - started) * 1000)
+        try:
+            await async_redis_client.zrem(PROCESSING_KEY, user_id)
+        except RedisError as e:
+            # processing에 남으면 가시성 만료 후 한 번 더 실행될 뿐 (ledger 확인에서 바로 종료)
+            report_degraded("SummaryScheduler", PROCESSING_KEY, e)
+
+    async def _report_stats(self):
+        pipe = async_redis_client.pipeline(transaction=False)
+        pipe.zcard(PENDING_KEY)
+        pipe.zcard(PROCESSING_KEY)
+        pipe.zrange(PENDING_KEY, 0, 0, withscores=True)
+        depth, processing, oldest = await pipe.execute()
+        metrics.gauge("summary_queue.depth", depth)
+        metrics.gauge("summary_queue.processing", processing)
+        # 예정 시각이 지난 채 대기 중인 시간 (워커 시계 기준 근사값)
+        metrics.gauge("summary_queue.lag_seconds", max(0.0, time.time() - oldest[0][1]) if oldest else 0.0)
+
+
+# 싱글톤 객체
+summary_scheduler = SummaryScheduler()
@@ -1,7 +1,115 @@
-from core.redis_v2.redis import redis_client
+import asyncio
+import uuid
+from typing import Optional
+from redis.exceptions import RedisError
+from core.redis_v2.redis import async_redis_client
+from core.metrics import metrics
+from utils.log_utils import get_logger
 
-def acquire_lock(key: str, expire: int = 30) -> bool:
-    return redis_client.set(key, "1", nx=True, ex=expire)
+logger = get_logger(__name__)
 
-def release_lock(key: str):
-    redis_client.delete(key)
\ No newline at end of file
+# 내 token일 때만 삭제 / 연장 (TTL이 지나 다른 프로세스가 잡은 락을 건드리지 않도록)
+_COMPARE_AND_DELETE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_COMPARE_AND_EXTEND = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_compare_and_delete = async_redis_client.register_script(_COMPARE_AND_DELETE)
+_compare_and_extend = async_redis_client.register_script(_COMPARE_AND_EXTEND)
+
+
+class LockNotAcquired(Exception):
+    """async with RedisLock(...) 진입 시 이미 다른 소유자가 락을 잡고 있음"""
+
+    def __init__(self, key: str):
+        super().__init__(f"락 획득 실패: {key}")
+        self.key = key
+
+
+class RedisLock:
+    """
+    owner token 기반 분산 락
+    - SET key token NX PX ttl 로 획득, 해제/연장은 token 비교 Lua로만
+    - auto_extend=True면 잡고 있는 동안 ttl/3 마다 TTL 연장 → 작업이 ttl보다 길어도 락 유지,
+      프로세스가 죽으면 연장이 멈춰 ttl 뒤 자동 해제
+    """
+
+    def __init__(self, key: str, ttl: float = 30, auto_extend: bool = True):
+        self.key = key
+        self.ttl_ms = int(ttl * 1000)
+        self.auto_extend = auto_extend
+        self.token: Optional[str] = None
+        self._extender: Optional[asyncio.Task] = None
+
+    @property
+    def acquired(self) -> bool:
+        return self.token is not None
+
+    async def acquire(self) -> bool:
+        token = uuid.uuid4().hex
+        if not await async_redis_client.set(self.key, token, nx=True, px=self.ttl_ms):
+            return False
+        self.token = token
+        if self.auto_extend:
+            self._extender = asyncio.create_task(self._extend_loop())
+        return True
+
+    async def release(self) -> bool:
+        if self._extender is not None:
+            self._extender.cancel()
+            self._extender = None
+        if self.token is None:
+            return False
+        token, self.token = self.token, None
+        try:
+            released = bool(await _compare_and_delete(keys=[self.key], args=[token]))
+        except RedisError as e:
+            logger.error(f"[RedisLock] 해제 실패 (TTL 후 자동 해제): key={self.key}, error={e}")
+            return False
+        if not released:
+            # TTL이 지나 다른 프로세스가 가져간 락 → 지우지 않음
+            metrics.incr("redis.lock.lost")
+            logger.warning(f"[RedisLock] 해제 시점에 이미 소유권 없음: key={self.key}")
+        return released
+
+    async def _extend_loop(self):
+        interval = self.ttl_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await _compare_and_extend(keys=[self.key], args=[self.token, self.ttl_ms]):
+                    metrics.incr("redis.lock.lost")
+                    logger.warning(f"[RedisLock] 연장 실패, 소유권 상실: key={self.key}")
+                    return
+                metrics.incr("redis.lock.extended")
+            except RedisError as e:
+                logger.error(f"[RedisLock] 연장 오류: key={self.key}, error={e}")
+
+    async def __aenter__(self) -> "RedisLock":
+        # 획득 실패를 무시하고 본문을 실행하면 락 없이 임계 구역에 들어가므로 예외로 알림
+        if not await self.acquire():
+            metrics.incr("redis.lock.contended")
+            raise LockNotAcquired(self.key)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+
+async def acquire_lock(key: str, expire: int = 30) -> Optional[str]:
+    """auto-extend 없는 단순 락. 획득 시 release_lock에 넘길 token, 실패 시 None"""
+    lock = RedisLock(key, ttl=expire, auto_extend=False)
+    return lock.token if await lock.acquire() else None
+
+
+async def release_lock(key: str, token: str) -> bool:
+    return bool(await _compare_and_delete(keys=[key], args=[token]))
@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from typing import Awaitable, Callable, Optional, Union
+from redis.exceptions import RedisError
+from core.redis_v2.redis import async_redis_client
+from utils import serialization
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+USER_CHANNEL_PREFIX = "chatbot:ws:user"
+NODE_CHANNEL_PREFIX = "chatbot:ws:node"
+
+Frame = Union[dict, str]
+
+
+class RedisWSBroker:
+    """
+    워커/파드 간 WebSocket 프레임 전달용 Redis pub/sub 브로커
+
+    - 각 노드는 로컬에 소켓이 붙은 유저의 채널(chatbot:ws:user:{user_id})만 구독
+    - 로컬에 없는 유저에게 보내는 프레임은 해당 채널로 publish → 소켓을 가진 노드가 수신해 전달
+    """
+
+    def __init__(self, on_message: Callable[[str, Frame], Awaitable[None]]):
+        self.node_id = uuid.uuid4().hex
+        self.on_message = on_message
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _user_channel(user_id: str) -> str:
+        return f"{USER_CHANNEL_PREFIX}:{user_id}"
+
+    @property
+    def node_channel(self) -> str:
+        return f"{NODE_CHANNEL_PREFIX}:{self.node_id}"
+
+    async def start(self):
+        if self._listener is not None:
+            return
+        self._pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+        # 구독 채널이 하나도 없으면 listen()이 바로 종료되므로 노드 전용 채널을 항상 구독
+        await self._pubsub.subscribe(self.node_channel)
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"[RedisWSBroker] 시작: node_id={self.node_id}")
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        logger.info(f"[RedisWSBroker] 종료: node_id={self.node_id}")
+
+    async def subscribe_user(self, user_id: str):
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.subscribe(self._user_channel(user_id))
+        except RedisError as e:
+            logger.error(f"[RedisWSBroker] 구독 실패: user_id={user_id}, error={e}")
+
+    async def unsubscribe_user(self, user_id: str):
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.unsubscribe(self._user_channel(user_id))
+        except RedisError as e:
+            logger.error(f"[RedisWSBroker] 구독 해제 실패: user_id={user_id}, error={e}")
+
+    async def publish(self, to_user_id: str, frame: Frame) -> bool:
+        """다른 노드로 프레임 전달. 수신한 노드가 하나라도 있으면 True"""
+        envelope = serialization.dumps({"origin": self.node_id, "to": to_user_id, "data": frame})
+        try:
+            receivers = await async_redis_client.publish(self._user_channel(to_user_id), envelope)
+        except RedisError as e:
+            logger.error(f"[RedisWSBroker] publish 실패: to={to_user_id}, error={e}")
+            return False
+        return receivers > 0
+
+    async def _listen(self):
+        while True:
+            try:
+                async for raw in self._pubsub.listen():
+                    if raw.get("type") != "message":
+                        continue
+                    await self._dispatch(raw["data"])
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                # 연결이 끊긴 경우 재연결 시 기존 채널은 자동 재구독됨
+                logger.error(f"[RedisWSBroker] 수신 루프 오류, 재시도: {e}")
+                await asyncio.sleep(1)
+
+    async def _dispatch(self, raw: str):
+        try:
+            envelope = serialization.loads(raw)
+        except serialization.JSONDecodeError:
+            logger.warning(f"[RedisWSBroker] 잘못된 envelope: {raw[:100]}")
+            return
+        # 같은 노드에서 보낸 프레임은 이미 로컬 전달됨
+        if envelope.get("origin") == self.node_id:
+            return
+        to_user_id = envelope.get("to")
+        if not to_user_id:
+            return
+        try:
+            await self.on_message(to_user_id, envelope.get("data"))
+        except Exception as e:
+            logger.error(f"[RedisWSBroker] 로컬 전달 실패: to={to_user_id}, error={e}")
@@ -25,7 +25,50 @@ class Settings(BaseSettings):
     redis_host: str = Field(default="localhost", env="REDIS_HOST")
     redis_port: int = Field(default=6379, env="REDIS_PORT")
     redis_db: int = Field(default=0, env="REDIS_DB")
+    redis_ssl: bool = Field(default=True, env="REDIS_SSL")  # 로컬 Redis는 false
+    redis_max_connections: int = Field(default=64, env="REDIS_MAX_CONNECTIONS")  # 워커당 풀 크기 (str/bin 각각)
+    redis_pool_timeout: float = Field(default=5.0, env="REDIS_POOL_TIMEOUT")  # 초, 풀이 가득 찼을 때 커넥션 대기 시간
+    redis_compress_threshold: int = Field(default=1024, env="REDIS_COMPRESS_THRESHOLD")  # bytes, 이 크기 이상 값만 압축 (-1이면 끔)
+    redis_compress_algo: str = Field(default="auto", env="REDIS_COMPRESS_ALGO")  # auto, zstd, lz4, zlib
+    redis_reaper_interval: float = Field(default=600.0, env="REDIS_REAPER_INTERVAL")  # 초, 고아 키 SCAN 정리 주기 (0이면 끔)
+    redis_reaper_batch: int = Field(default=500, env="REDIS_REAPER_BATCH")  # SCAN COUNT, 한 번에 검사/삭제할 키 수
+    redis_breaker_failure_threshold: int = Field(default=5, env="REDIS_BREAKER_FAILURE_THRESHOLD")  # 연속 연결/타임아웃 실패 수
+    redis_breaker_reset_timeout: float = Field(default=5.0, env="REDIS_BREAKER_RESET_TIMEOUT")  # 초, OPEN 후 probe까지 대기
+    redis_write_buffer_size: int = Field(default=10000, env="REDIS_WRITE_BUFFER_SIZE")  # OPEN 동안 보관할 히스토리/요약 쓰기 키 수
+    redis_hotkey_sample_rate: float = Field(default=0.01, env="REDIS_HOTKEY_SAMPLE_RATE")  # 핫 키 집계용 키 접근 샘플링 비율 (0이면 끔)
+    l1_cache_size: int = Field(default=5000, env="L1_CACHE_SIZE")  # 패밀리별 프로세스 내 캐시 키 수
+    l1_cache_ttl: float = Field(default=60.0, env="L1_CACHE_TTL")  # 초, 무효화 메시지를 놓쳐도 이 시간 안에 수렴
+    bot_pool_size: int = Field(default=2000, env="BOT_POOL_SIZE")  # 워커당 재사용할 PersonaChatBot 수 ((user_id, lang) 단위)
+    bot_pool_ttl: float = Field(default=300.0, env="BOT_POOL_TTL")  # 초, 커플 무효화 메시지를 놓쳐도 이 시간 안에 새로 생성
     
+    # === WebSocket 채팅 ===
+    ws_write_batch_size: int = Field(default=200, env="WS_WRITE_BATCH_SIZE")
+    ws_write_flush_interval: float = Field(default=0.2, env="WS_WRITE_FLUSH_INTERVAL")  # 초
+    ws_write_max_pending: int = Field(default=20000, env="WS_WRITE_MAX_PENDING")
+    ws_replay_page_size: int = Field(default=100, env="WS_REPLAY_PAGE_SIZE")
+    ws_send_queue_size: int = Field(default=256, env="WS_SEND_QUEUE_SIZE")
+    ws_overflow_policy: str = Field(default="drop_status", env="WS_OVERFLOW_POLICY")  # drop_status, disconnect, spill
+    ws_send_timeout: float = Field(default=10.0, env="WS_SEND_TIMEOUT")  # 초
+    ws_max_batch_frames: int = Field(default=32, env="WS_MAX_BATCH_FRAMES")  # 바이너리 프로토콜 batch 프레임 최대 묶음 수
+    ws_heartbeat_interval: float = Field(default=20.0, env="WS_HEARTBEAT_INTERVAL")  # 초
+    ws_presence_ttl: int = Field(default=60, env="WS_PRESENCE_TTL")  # 초, heartbeat 주기보다 충분히 길게
+    ws_affinity_enabled: bool = Field(default=False, env="WS_AFFINITY_ENABLED")  # couple_id consistent hash 라우팅
+    ws_node_url: str = Field(default="", env="WS_NODE_URL")  # 이 노드(파드)에 직접 붙는 외부 URL, 예: wss://chat-1.example.com
+    ws_couple_cache_size: int = Field(default=10000, env="WS_COUPLE_CACHE_SIZE")  # 워커당 커플 매핑 캐시 유저 수
+    ws_couple_cache_ttl: int = Field(default=600, env="WS_COUPLE_CACHE_TTL")  # 초
+    ws_idle_timeout: float = Field(default=60.0, env="WS_IDLE_TIMEOUT")  # 초, 이 시간 동안 수신(pong 포함)이 없으면 종료
+
+    # === AI 채팅 rate limit (Redis token bucket) ===
+    chat_rate_user_per_minute: float = Field(default=20, env="CHAT_RATE_USER_PER_MINUTE")
+    chat_rate_user_burst: int = Field(default=10, env="CHAT_RATE_USER_BURST")
+    chat_rate_couple_per_minute: float = Field(default=30, env="CHAT_RATE_COUPLE_PER_MINUTE")
+    chat_rate_couple_burst: int = Field(default=15, env="CHAT_RATE_COUPLE_BURST")
+    chat_rate_lease_size: int = Field(default=2, env="CHAT_RATE_LEASE_SIZE")  # 워커가 Redis에서 한 번에 임대하는 토큰 수 (1이면 매 요청 Redis 확인)
+
+    # === AI 채팅 context (OpenAI 입력 토큰 예산) ===
+    chat_context_token_budget: int = Field(default=6000, env="CHAT_CONTEXT_TOKEN_BUDGET")  # system prompt + 요약 + 메시지 합계 상한
+    chat_function_result_max_tokens: int = Field(default=800, env="CHAT_FUNCTION_RESULT_MAX_TOKENS")  # function 결과 1건 상한 (현재 턴은 자르고 이전 턴은 생략)
+
     # === JWT ===
     secret_key: str = Field(..., env="SECRET_KEY")
     algorithm: str = Field(..., env="ALGORITHM")
@@ -48,6 +91,11 @@ class Settings(BaseSettings):
     sum_turn_threshold: int = Field(..., env="SUM_TURN_THRESHOLD")
     sum_remaining_size: int = Field(..., env="SUM_REMAINING_SIZE")
     sum_trigger_tokens: int = Field(..., env="SUM_TRIGGER_TOKENS")
+    summary_debounce_seconds: float = Field(default=30.0, env="SUMMARY_DEBOUNCE_SECONDS")  # 이 시간 안의 요약 트리거는 한 번으로 합침
+    summary_worker_enabled: bool = Field(default=True, env="SUMMARY_WORKER_ENABLED")  # 웹 워커 안에서 요약 워커 실행 (전용 프로세스를 쓰면 false)
+    summary_worker_concurrency: int = Field(default=2, env="SUMMARY_WORKER_CONCURRENCY")  # 워커당 동시 요약 수
+    summary_poll_interval: float = Field(default=1.0, env="SUMMARY_POLL_INTERVAL")  # 초
+    summary_visibility_timeout: float = Field(default=300.0, env="SUMMARY_VISIBILITY_TIMEOUT")  # 초, 처리 중 워커가 죽었을 때 재실행까지 대기
 
     # === FAISS ===
     faiss_turns_per_chunk: int = Field(..., env="FAISS_TURNS_PER_CHUNK")
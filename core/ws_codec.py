@@ -0,0 +1,65 @@
+from typing import Iterable, Optional, Union
+from utils import serialization
+
+try:
+    import msgpack
+except ImportError:  # msgpack 미설치 시 JSON 프로토콜만 지원
+    msgpack = None
+
+SUBPROTOCOL_MSGPACK = "luvtune.msgpack.v1"
+
+Frame = Union[dict, str]
+
+
+class JSONCodec:
+    """기본 텍스트 JSON 프레임 (서브프로토콜 없음)"""
+    subprotocol: Optional[str] = None
+    binary = False
+    supports_batch = False
+
+    def encode(self, frame: Frame) -> str:
+        if isinstance(frame, str):
+            return frame
+        return serialization.dumps(frame)
+
+    def decode(self, data: Union[str, bytes]) -> dict:
+        return serialization.loads(data)
+
+    def encode_batch(self, frames: list) -> str:
+        return self.encode({"type": "batch", "frames": [self._as_dict(f) for f in frames]})
+
+    @staticmethod
+    def _as_dict(frame: Frame) -> dict:
+        return serialization.loads(frame) if isinstance(frame, str) else frame
+
+
+class MsgpackCodec(JSONCodec):
+    """
+    바이너리 msgpack 프레임 (luvtune.msgpack.v1)
+    메시지 타입은 JSON과 동일하고, 여러 프레임을 {"type": "batch", "frames": [...]} 하나로 묶어 보낼 수 있음
+    """
+    subprotocol = SUBPROTOCOL_MSGPACK
+    binary = True
+    supports_batch = True
+
+    def encode(self, frame: Frame) -> bytes:
+        return msgpack.packb(self._as_dict(frame), use_bin_type=True)
+
+    def decode(self, data: Union[str, bytes]) -> dict:
+        if isinstance(data, str):
+            return serialization.loads(data)
+        return msgpack.unpackb(data, raw=False)
+
+    def encode_batch(self, frames: list) -> bytes:
+        return msgpack.packb({"type": "batch", "frames": [self._as_dict(f) for f in frames]}, use_bin_type=True)
+
+
+JSON_CODEC = JSONCodec()
+MSGPACK_CODEC = MsgpackCodec() if msgpack is not None else None
+
+
+def negotiate(requested: Iterable[str]) -> JSONCodec:
+    """클라이언트가 요청한 Sec-WebSocket-Protocol 중 지원하는 코덱 선택"""
+    if MSGPACK_CODEC is not None and SUBPROTOCOL_MSGPACK in (requested or ()):
+        return MSGPACK_CODEC
+    return JSON_CODEC
@@ -0,0 +1,190 @@
+import asyncio
+from collections import deque
+from typing import Callable, Optional, Union
+from fastapi import WebSocket, WebSocketDisconnect
+from core.metrics import metrics
+from core.ws_codec import JSON_CODEC, JSONCodec
+from core.settings import settings
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
+
+OVERFLOW_DROP_STATUS = "drop_status"
+OVERFLOW_DISCONNECT = "disconnect"
+OVERFLOW_SPILL = "spill"
+
+Frame = Union[dict, str]
+
+
+class ClientConnection:
+    """
+    WebSocket 하나에 대한 bounded 송신 큐 + writer 태스크
+
+    - send_json/send_text는 큐에 넣고 바로 반환 → 느린 클라이언트가 보내는 쪽 핸들러를 막지 않음
+    - status 프레임은 대상 유저별 최신 값만 유지 (coalescing)
+    - 큐가 가득 차면 overflow_policy에 따라 처리
+        drop_status: 대기 중인 status를 버려 공간 확보, 그래도 가득 차면 새 프레임 거절
+        disconnect : 소켓을 닫음 (재연결 시 미전달 재전송으로 복구)
+        spill      : 새 프레임 거절 → 호출 측에서 미전달(is_delivered=False)로 저장
+    - 협상된 codec(JSON 텍스트 / msgpack 바이너리)으로 인코딩, batch 지원 codec이면 대기 프레임을 한 프레임으로 묶어 전송
+    - send()의 True는 "큐에 들어감"일 뿐. 채팅 메시지는 소켓 쓰기가 끝난 뒤에만 on_delivered(msg_uid)로 전달 완료 처리
+      → 타임아웃/overflow/연결 종료로 버려진 프레임은 미전달로 남아 재연결 시 재전송됨
+    """
+    __slots__ = ("user_id", "websocket", "codec", "maxsize", "overflow_policy", "send_timeout", "on_delivered",
+                 "_frames", "_statuses", "_wakeup", "_writer", "closed")
+
+    def __init__(self, user_id: str, websocket: WebSocket,
+                 codec: JSONCodec = JSON_CODEC,
+                 maxsize: int = settings.ws_send_queue_size,
+                 overflow_policy: str = settings.ws_overflow_policy,
+                 send_timeout: float = settings.ws_send_timeout,
+                 on_delivered: Optional[Callable[[str], None]] = None):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.codec = codec
+        self.maxsize = maxsize
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.on_delivered = on_delivered
+        self._frames: deque[Frame] = deque()
+        self._statuses: dict[str, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+
+    @property
+    def state(self):
+        return self.websocket.state
+
+    @property
+    def depth(self) -> int:
+        return len(self._frames) + len(self._statuses)
+
+    def start(self):
+        self._writer = asyncio.create_task(self._run())
+
+    async def close(self):
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        self._discard_unsent()
+
+    def _discard_unsent(self):
+        # 보내지 못한 채팅 메시지는 DB에 미전달로 남아 있으므로 버려도 재연결 시 재전송됨
+        unsent = sum(1 for frame in self._frames if isinstance(frame, dict) and frame.get("type") == "message")
+        if unsent:
+            metrics.incr("ws.send_queue.unsent_messages", unsent)
+            logger.info(f"[ClientConnection] 미전송 메시지 {unsent}건은 재연결 시 재전송: user_id={self.user_id}")
+        self._frames.clear()
+        self._statuses.clear()
+
+    def send(self, frame: Frame) -> bool:
+        """프레임을 송신 큐에 넣음. 거절되면 False"""
+        if self.closed:
+            return False
+        is_status = isinstance(frame, dict) and frame.get("type") == "status"
+        if is_status and frame.get("user") in self._statuses:
+            self._statuses[frame["user"]] = frame
+            metrics.incr("ws.send_queue.status_coalesced")
+            return True
+        if self.depth >= self.maxsize and not self._make_room(is_status):
+            return False
+        if is_status:
+            self._statuses[frame["user"]] = frame
+        else:
+            self._frames.append(frame)
+        metrics.observe("ws.send_queue.depth", self.depth)
+        self._wakeup.set()
+        return True
+
+    async def send_json(self, data: dict) -> bool:
+        return self.send(data)
+
+    async def send_text(self, data: str) -> bool:
+        return self.send(data)
+
+    def _make_room(self, is_status: bool) -> bool:
+        metrics.incr(f"ws.send_queue.overflow.{self.overflow_policy}")
+        if self.overflow_policy == OVERFLOW_DISCONNECT:
+            logger.warning(f"[ClientConnection] 송신 큐 초과로 연결 종료: user_id={self.user_id}, depth={self.depth}")
+            self.closed = True
+            asyncio.create_task(self._close_socket(code=1013))
+            return False
+        if self.overflow_policy == OVERFLOW_DROP_STATUS and self._statuses and not is_status:
+            metrics.incr("ws.send_queue.status_dropped", len(self._statuses))
+            self._statuses.clear()
+            return True
+        # spill, 혹은 더 버릴 status가 없는 경우
+        return False
+
+    async def _close_socket(self, code: int = 1000):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def receive(self) -> Union[dict, str]:
+        """클라이언트 프레임 수신. JSON 연결은 원문 텍스트, 바이너리 codec은 디코딩된 dict 반환"""
+        if not self.codec.binary:
+            return await self.websocket.receive_text()
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        data = message.get("bytes")
+        return self.codec.decode(data if data is not None else message.get("text"))
+
+    async def _write(self, payload: Union[str, bytes]):
+        if isinstance(payload, bytes):
+            await asyncio.wait_for(self.websocket.send_bytes(payload), timeout=self.send_timeout)
+        else:
+            await asyncio.wait_for(self.websocket.send_text(payload), timeout=self.send_timeout)
+
+    def _confirm(self, frames: list):
+        """소켓 쓰기가 끝난 채팅 메시지 프레임을 전달 완료로 알림"""
+        if self.on_delivered is None:
+            return
+        for frame in frames:
+            if isinstance(frame, dict) and frame.get("type") == "message" and frame.get("msg_uid"):
+                self.on_delivered(frame["msg_uid"])
+
+    def _drain(self, limit: int) -> list:
+        frames = []
+        # 작은 status 프레임을 먼저 보내 메시지 폭주 시에도 상태가 늦지 않도록
+        while self._statuses and len(frames) < limit:
+            frames.append(self._statuses.popitem()[1])
+        while self._frames and len(frames) < limit:
+            frames.append(self._frames.popleft())
+        return frames
+
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._statuses or self._frames:
+                    if self.codec.supports_batch:
+                        frames = self._drain(settings.ws_max_batch_frames)
+                        if len(frames) > 1:
+                            metrics.observe("ws.send_queue.batch_size", len(frames))
+                            await self._write(self.codec.encode_batch(frames))
+                            self._confirm(frames)
+                            continue
+                    else:
+                        frames = self._drain(1)
+                    await self._write(self.codec.encode(frames[0]))
+                    self._confirm(frames)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            metrics.incr("ws.send_queue.send_timeout")
+            logger.warning(f"[ClientConnection] 송신 타임아웃으로 연결 종료: user_id={self.user_id}")
+            self.closed = True
+            await self._close_socket(code=1013)
+        except Exception as e:
+            logger.warning(f"[ClientConnection] 송신 실패: user_id={self.user_id}, error={e}")
+            self.closed = True
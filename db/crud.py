@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from db.db_tables import *  # 실제 모델 경로/명에 맞게 조정
 from sqlalchemy.orm import Session
-import json
+from utils import serialization
 
 
 def get_user_name(db: Session, user_id: str) -> str | None:
@@ -120,7 +120,7 @@ def save_daily_couple_analysis_result(db: Session, couple_id: str, date: datetim
         CoupleDailyAnalysisResult.date == date_start
     ).first()
 
-    result_str = json.dumps(result, ensure_ascii=False)
+    result_str = serialization.dumps(result)
     now = datetime.utcnow()
     if obj:
         obj.result = result_str
@@ -163,7 +163,7 @@ def save_daily_ai_analysis_result(db: Session, user_id: str, date: datetime.date
         AIDailyAnalysisResult.date == date_start
     ).first()
 
-    result_str = json.dumps(result, ensure_ascii=False)
+    result_str = serialization.dumps(result)
     now = datetime.utcnow()
     if obj:
         obj.result = result_str
@@ -203,7 +203,7 @@ def load_daily_couple_stats(db: Session, couple_id: str, week_dates: list[dateti
         CoupleDailyAnalysisResult.date >= week_dates[0],
         CoupleDailyAnalysisResult.date <= week_dates[-1]
     ).order_by(CoupleDailyAnalysisResult.created_at).all()
-    return [json.loads(row.result) for row in summaries]
+    return [serialization.loads(row.result) for row in summaries]
 
 def load_daily_ai_stats(db: Session, user_id: str, week_dates: list[datetime.date]) -> list[dict]:
     summaries = db.query(AIChatSummary).filter(
@@ -211,7 +211,7 @@ def load_daily_ai_stats(db: Session, user_id: str, week_dates: list[datetime.dat
         AIChatSummary.created_at >= week_dates[0],
         AIChatSummary.created_at <= week_dates[-1]
     ).order_by(AIChatSummary.created_at).all()
-    return [json.loads(row.summary) for row in summaries]
+    return [serialization.loads(row.summary) for row in summaries]
 
 def get_daily_emotion_logs_by_couple_id(db: Session, couple_id: str, date: datetime):
     """커플의 일간 감정 기록을 조회합니다."""
@@ -236,7 +236,7 @@ def get_daily_emotion_logs_by_couple_id(db: Session, couple_id: str, date: datet
         {
             "user_id": log.user_id,
             "emotion": log.emotion,
-            "detail_emotions": json.loads(log.detail_emotions) if log.detail_emotions else [],
+            "detail_emotions": serialization.loads(log.detail_emotions) if log.detail_emotions else [],
             "memo": log.memo,
             "recorded_at": log.recorded_at
         }
@@ -265,7 +265,7 @@ def get_daily_emotion_logs_by_user_id(db: Session, user_id: str, date: datetime)
     return {
         "user_id": log.user_id,
         "emotion": log.emotion,
-        "detail_emotions": json.loads(log.detail_emotions) if log.detail_emotions else [],
+        "detail_emotions": serialization.loads(log.detail_emotions) if log.detail_emotions else [],
         "memo": log.memo,
         "recorded_at": log.recorded_at
     }
@@ -279,7 +279,7 @@ def save_daily_comparison_analysis_result(db: Session, couple_id: str, date: dat
         DailyComparisonAnalysisResult.date == date_start
     ).first()
 
-    result_str = json.dumps(result, ensure_ascii=False)
+    result_str = serialization.dumps(result)
     now = datetime.utcnow()
     if obj:
         obj.result = result_str
@@ -17,6 +17,7 @@ class Message(Base):
     deleted_at = Column(DateTime, nullable=True)
     is_delivered = Column(Boolean, default=False)
     embed_index = Column(Integer, nullable=True)
+    msg_uid = Column(String(32), unique=True, nullable=True)  # write-behind 재시도 중복 insert 방지용 (앱에서 생성)
     
     # Relationships
     user = relationship("User", back_populates="messages")
@@ -45,6 +46,7 @@ class AIMessage(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     name = Column(String(255), nullable=True) # function_name
     embed_index = Column(Integer, nullable=True)
+    token_count = Column(Integer, nullable=True)  # content 토큰 수 (저장 시 1회 계산, 기존 행은 NULL)
     
     # Relationships
     user = relationship("User", back_populates="ai_messages")
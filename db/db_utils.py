@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from core.settings import settings
 
 BASE_URL = f"mysql+pymysql://{settings.db_user}:{settings.db_password}@{settings.db_endpoint}:{settings.db_port}/"
@@ -20,3 +20,30 @@ def drop_database():
         conn.execute(text(f"DROP DATABASE IF EXISTS {settings.db_name}"))
         conn.commit()
         print(f"🗑 데이터베이스 '{settings.db_name}' 삭제 완료")
+
+# create_all 이후 모델에 추가된 컬럼 (db/migrations/*.sql로 반영)
+# (테이블, 컬럼, UNIQUE 필요 여부)
+REQUIRED_COLUMNS = [
+    ("messages", "msg_uid", True),  # 001_messages_msg_uid.sql
+    ("ai_messages", "token_count", False),  # 002_ai_messages_token_count.sql
+]
+
+def verify_schema(engine):
+    """마이그레이션이 빠진 채로 뜨면 insert 시점에야 깨지므로 시작할 때 바로 실패시킴"""
+    inspector = inspect(engine)
+    missing = []
+    for table, column, unique in REQUIRED_COLUMNS:
+        if not inspector.has_table(table):
+            missing.append(table)
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if column not in columns:
+            missing.append(f"{table}.{column}")
+            continue
+        if unique:
+            unique_sets = [i["column_names"] for i in inspector.get_indexes(table) if i.get("unique")]
+            unique_sets += [c["column_names"] for c in inspector.get_unique_constraints(table)]
+            if [column] not in unique_sets:
+                missing.append(f"{table}.{column} (UNIQUE)")
+    if missing:
+        raise RuntimeError(f"DB 스키마 마이그레이션 누락: {', '.join(missing)} → db/migrations/*.sql 적용 필요")
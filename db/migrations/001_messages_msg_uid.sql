@@ -0,0 +1,6 @@
+-- messages.msg_uid: write-behind 재시도 시 같은 메시지가 중복 insert되지 않도록 앱에서 생성한 UID
+-- 기존 행은 NULL로 남김 (UNIQUE 인덱스는 NULL 중복을 허용)
+-- 적용 후 서버 시작 시 db.db_utils.verify_schema가 컬럼/UNIQUE 인덱스 존재를 확인
+ALTER TABLE messages
+    ADD COLUMN msg_uid VARCHAR(32) NULL,
+    ADD UNIQUE INDEX uq_messages_msg_uid (msg_uid);
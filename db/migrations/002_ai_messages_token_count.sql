@@ -0,0 +1,4 @@
+-- ai_messages.token_count: 저장 시 1회 계산한 content 토큰 수 (히스토리 ledger / 컨텍스트 예산 계산용)
+-- 기존 행은 NULL로 남기고 읽을 때 다시 계산
+ALTER TABLE ai_messages
+    ADD COLUMN token_count INT NULL;
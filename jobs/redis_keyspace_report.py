@@ -0,0 +1,105 @@
+"""
+Redis 키 패밀리별 메모리 사용량 리포트 (오프라인)
+
+SCAN으로 전체 키를 세고, 그중 --sample 비율만 MEMORY USAGE / TTL을 조회해 패밀리별 크기를 추정한다.
+MEMORY USAGE 호출은 --max-ops-per-sec로 제한 (운영 Redis에서 돌려도 부하가 일정하도록).
+
+    python -m jobs.redis_keyspace_report --sample 0.1 --max-ops-per-sec 500 --json report.json
+"""
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+
+from core.redis_v2.redis import redis_client
+from core.redis_v2.instrumentation import key_family
+
+
+def _percentile(values: list, pct: float) -> int:
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def sample_keyspace(match: str = "*", sample: float = 0.1, scan_count: int = 500,
+                    max_ops_per_sec: float = 500) -> dict:
+    keys_per_family = defaultdict(int)
+    sizes = defaultdict(list)
+    ttls = defaultdict(list)
+    cursor = 0
+    while True:
+        cursor, keys = redis_client.scan(cursor=cursor, match=match, count=scan_count)
+        sampled = [key for key in keys if random.random() < sample]
+        for key in keys:
+            keys_per_family[key_family(key)] += 1
+        if sampled:
+            started = time.monotonic()
+            pipe = redis_client.pipeline(transaction=False)
+            for key in sampled:
+                pipe.memory_usage(key)
+                pipe.ttl(key)
+            results = pipe.execute()
+            for key, usage, ttl in zip(sampled, results[::2], results[1::2]):
+                if usage is None:  # SCAN 이후 만료/삭제
+                    continue
+                family = key_family(key)
+                sizes[family].append(usage)
+                ttls[family].append(ttl)
+            # 초당 MEMORY USAGE 호출 수 제한
+            budget = len(sampled) / max_ops_per_sec
+            elapsed = time.monotonic() - started
+            if elapsed < budget:
+                time.sleep(budget - elapsed)
+        if cursor == 0:
+            break
+
+    report = {}
+    for family, count in keys_per_family.items():
+        family_sizes = sizes.get(family, [])
+        family_ttls = ttls.get(family, [])
+        avg = sum(family_sizes) / len(family_sizes) if family_sizes else 0
+        with_ttl = [t for t in family_ttls if t >= 0]
+        report[family] = {
+            "keys": count,
+            "sampled": len(family_sizes),
+            "avg_bytes": round(avg),
+            "p95_bytes": _percentile(family_sizes, 0.95),
+            "max_bytes": max(family_sizes, default=0),
+            "estimated_total_bytes": round(avg * count),
+            "no_ttl_ratio": round(1 - len(with_ttl) / len(family_ttls), 3) if family_ttls else None,
+            "avg_ttl_seconds": round(sum(with_ttl) / len(with_ttl)) if with_ttl else None,
+        }
+    return dict(sorted(report.items(), key=lambda item: item[1]["estimated_total_bytes"], reverse=True))
+
+
+def print_report(report: dict):
+    total = sum(r["estimated_total_bytes"] for r in report.values()) or 1
+    print(f"{'family':32}{'keys':>10}{'sampled':>9}{'avg_B':>10}{'p95_B':>10}{'est_MB':>10}{'share':>8}{'no_ttl':>8}{'avg_ttl':>9}")
+    for family, r in report.items():
+        no_ttl = "-" if r["no_ttl_ratio"] is None else f"{r['no_ttl_ratio']:.0%}"
+        avg_ttl = "-" if r["avg_ttl_seconds"] is None else r["avg_ttl_seconds"]
+        print(f"{family:32}{r['keys']:>10}{r['sampled']:>9}{r['avg_bytes']:>10}{r['p95_bytes']:>10}"
+              f"{r['estimated_total_bytes'] / 1024 / 1024:>10.1f}{r['estimated_total_bytes'] / total:>8.1%}"
+              f"{no_ttl:>8}{avg_ttl:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis 키 패밀리별 메모리 사용량 리포트")
+    parser.add_argument("--match", default="*")
+    parser.add_argument("--sample", type=float, default=0.1, help="MEMORY USAGE를 조회할 키 비율")
+    parser.add_argument("--scan-count", type=int, default=500)
+    parser.add_argument("--max-ops-per-sec", type=float, default=500)
+    parser.add_argument("--json", help="리포트를 JSON 파일로도 저장")
+    args = parser.parse_args()
+
+    report = sample_keyspace(args.match, args.sample, args.scan_count, args.max_ops_per_sec)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
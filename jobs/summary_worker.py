@@ -0,0 +1,38 @@
+"""
+AI 채팅 요약 전용 워커 (웹 워커와 분리 실행)
+
+웹 프로세스는 SUMMARY_WORKER_ENABLED=false로 예약(enqueue)만 하고, 이 프로세스가 큐를 처리한다.
+
+    python -m jobs.summary_worker --concurrency 4
+"""
+import argparse
+import asyncio
+import signal
+
+from core.bot import summarize_user
+from core.redis_v2.circuit_breaker import write_buffer
+from core.redis_v2.l1_cache import invalidation_bus
+from core.redis_v2.summary_queue import SummaryScheduler
+from core.settings import settings
+
+
+async def main(concurrency: int):
+    # main.py와 같이: Redis 장애 중 버퍼된 요약/히스토리 쓰기 재실행 + 웹 워커의 L1 무효화(config, 요약 등) 구독
+    write_buffer.start()
+    await invalidation_bus.start()
+    scheduler = SummaryScheduler(concurrency=concurrency)
+    await scheduler.start(summarize_user)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    await stopped.wait()
+    await scheduler.stop()
+    await invalidation_bus.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.summary_worker_concurrency)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
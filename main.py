@@ -4,7 +4,17 @@ from routers import router as api_router
 from db.db_tables import Base
 from db.db import engine
 from core.settings import settings
-from db.db_utils import create_database_if_not_exists, drop_database
+from core.dependencies import get_connection_manager, get_message_writer
+from core.metrics import metrics
+from core.redis_v2.l1_cache import invalidation_bus
+from core.redis_v2.reaper import key_reaper
+from core.redis_v2.circuit_breaker import write_buffer
+from core.redis_v2.instrumentation import hot_keys
+from core.redis_v2.summary_queue import summary_scheduler
+from core.bot import summarize_user
+from core.cocurrency import semaphore
+from utils.serialization import FastJSONResponse
+from db.db_utils import create_database_if_not_exists, drop_database, verify_schema
 from test_data.seed_data import insert_test_data_to_db
 from test_data.insert_scenario_data import insert_scenario_data
 from jobs.daily_analysis import test_weekly_couplechat_analysis_from_start_date
@@ -25,13 +35,46 @@ logging.basicConfig(
 
 app = FastAPI(
     title=settings.app_name,
-    debug=settings.debug
+    debug=settings.debug,
+    default_response_class=FastJSONResponse,  # orjson, 한글 이스케이프 없음
 )
 
+@app.on_event("startup")
+async def on_startup():
+    # 모델에 추가된 컬럼의 마이그레이션이 빠졌으면 여기서 바로 실패
+    verify_schema(engine)
+    # 워커 간 WebSocket fan-out 구독 + presence heartbeat 시작
+    # Redis 장애 중 버퍼된 히스토리/요약 쓰기를 복구 시 이 루프에서 재실행
+    write_buffer.start()
+    await invalidation_bus.start()
+    await get_connection_manager().start()
+    await get_message_writer().start()
+    await key_reaper.start()
+    if settings.summary_worker_enabled:
+        # 채팅 요청이 동시 처리 한도에 닿아 있으면 요약 claim을 미룸
+        await summary_scheduler.start(summarize_user, busy=semaphore.locked)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await summary_scheduler.stop()
+    await key_reaper.stop()
+    # 큐에 남은 채팅 메시지를 DB에 모두 반영한 뒤 종료
+    await get_message_writer().stop()
+    await get_connection_manager().stop()
+    await invalidation_bus.stop()
+
 @app.get("/")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
+@app.get("/metrics/redis-hot-keys")
+def get_redis_hot_keys(limit: int = 20):
+    return hot_keys.top(limit)
+
 
 # CORS
 app.add_middleware(
@@ -18,6 +18,7 @@ class WSMessage(BaseModel):
     partner_id: Optional[str] = None
     couple_id: Optional[str] = None
     image_url: Optional[str] = None
+    chat_id: Optional[int] = None  # ack: 수신 완료한 마지막 chat_id
     
 class GoogleAuthCode(BaseModel):
     code: str
@@ -12,12 +12,15 @@ from db.db import get_session
 from models.schema import ChatRequest, BotConfigRequest
 from core.cocurrency import semaphore
 
-from core.bot import PersonaChatBot
+from core.bot import bot_pool
+from core.redis_v2.persona_config_service import PersonaConfigService
 from services.rag_search import process_incremental_faiss_embedding
 from services.openai_client import openai_completion_with_function_call, openai_stream_with_function_call
-from core.dependencies import get_connection_manager
+from core.dependencies import get_connection_manager, chat_rate_limit
+from core.redis_v2.instrumentation import count_redis_ops
 from services.tasks_celery import run_check_and_summarize, run_embedding
 from utils.language import detect_language
+from utils.token_truncate import count_tokens
 from utils.aichat_helpers import build_function_map, build_functions
 # TODO: 배포시 제거
 from core.utils import ensure_couple_mapping
@@ -27,27 +30,27 @@ logger = get_logger(__name__)
 
 router = APIRouter()
 
-@router.post("/completion")
+@router.post("/completion", dependencies=[Depends(chat_rate_limit)])
 async def chat_with_persona(req: ChatRequest):
     ensure_couple_mapping(req.user_id, "테스트파트너", req.couple_id)  # 필요시 주석 처리
 
     logger.info(f"[chat_with_persona] 요청: user_id={req.user_id}, couple_id={req.couple_id}")
-    async with semaphore:
+    async with semaphore, count_redis_ops("ai_chat_completion"):
         lang = detect_language(req.message)
-        bot = PersonaChatBot(user_id=req.user_id, lang=lang)
+        bot = await bot_pool.get(req.user_id, lang)
         
         functions = build_functions()
         function_map = build_function_map()
 
-        user_msg_id = bot.save_to_db(req.user_id, "user", req.message)
-        history = bot.get_history()
-        history.append({"role": "user", "content": req.message, "id": user_msg_id})
-        bot.save_history(history)
+        user_tokens = count_tokens(req.message)
+        user_msg_id = bot.save_to_db(req.user_id, "user", req.message, token_count=user_tokens)
+        context = await bot.open_context()
+        await context.append({"role": "user", "content": req.message, "id": user_msg_id, "tokens": user_tokens})
         
         try:
-            logger.info(f"[chat_with_persona] OpenAI 호출 시작: user_id={req.user_id}, history_len={len(history)}")
+            logger.info(f"[chat_with_persona] OpenAI 호출 시작: user_id={req.user_id}, history_len={len(context.messages)}")
             response = await openai_completion_with_function_call(
-                history,
+                context,
                 functions=functions,
                 function_map=function_map,
                 bot=bot
@@ -61,48 +64,50 @@ async def chat_with_persona(req: ChatRequest):
             return JSONResponse(content={"error": "알 수 없는 에러"}, status_code=500)
 
         # assistant 응답 저장
-        assistant_msg_id = bot.save_to_db(req.user_id, "assistant", response)
-        history.append({"role": "assistant", "content": response, "id": assistant_msg_id})
-        bot.save_history(history)
+        assistant_tokens = count_tokens(response)
+        assistant_msg_id = bot.save_to_db(req.user_id, "assistant", response, token_count=assistant_tokens)
+        await context.append({"role": "assistant", "content": response, "id": assistant_msg_id, "tokens": assistant_tokens})
 
         # # celery 사용 : 메인 프로세스 부하 줄여주기 (비동기 분산 처리)
         # run_check_and_summarize.delay(req.user_id)
         # run_embedding.delay(req.user_id)
         
-        asyncio.create_task(bot.check_and_summarize_if_needed())
+        asyncio.create_task(bot.schedule_summary())
         asyncio.create_task(process_incremental_faiss_embedding(req.user_id))
         logger.info(f"[chat_with_persona] 응답 완료: user_id={req.user_id}, msg_id={assistant_msg_id}")
         return PlainTextResponse(response)
 
-@router.post("/stream", response_class=StreamingResponse)
+@router.post("/stream", response_class=StreamingResponse, dependencies=[Depends(chat_rate_limit)])
 async def chat_with_persona_streaming(req: ChatRequest):
     ensure_couple_mapping(req.user_id, "테스트파트너", req.couple_id)  # 필요시 제거 가능
 
     logger.info(f"[chat_with_persona] 요청: user_id={req.user_id}, couple_id={req.couple_id}")
-    async with semaphore:
+    # 스트리밍 턴의 Redis 명령 수 = ai_chat_stream.setup + ai_chat_stream.generate
+    async with semaphore, count_redis_ops("ai_chat_stream.setup"):
         lang = detect_language(req.message)
-        bot = PersonaChatBot(user_id=req.user_id, lang=lang)
+        bot = await bot_pool.get(req.user_id, lang)
 
         functions = build_functions()
         function_map = build_function_map(req.user_id, bot.couple_id)
 
-        user_msg_id = bot.save_to_db(req.user_id, "user", req.message)
-        history = bot.get_history()
-        history.append({"role": "user", "content": req.message, "id": user_msg_id})
-        bot.save_history(history)
+        user_tokens = count_tokens(req.message)
+        user_msg_id = bot.save_to_db(req.user_id, "user", req.message, token_count=user_tokens)
+        context = await bot.open_context()
+        await context.append({"role": "user", "content": req.message, "id": user_msg_id, "tokens": user_tokens})
 
         async def stream_response():
             collected = ""  # 🔥 조립용 변수
             try:
-                logger.info(f"[chat_with_persona] GPT 스트리밍 호출 시작: user_id={req.user_id}, history_len={len(history)}")
-                async for chunk in openai_stream_with_function_call(
-                    history=history,
-                    functions=functions,
-                    function_map=function_map,
-                    bot=bot
-                ):
-                    collected += chunk
-                    yield chunk
+                logger.info(f"[chat_with_persona] GPT 스트리밍 호출 시작: user_id={req.user_id}, history_len={len(context.messages)}")
+                with count_redis_ops("ai_chat_stream.generate"):
+                    async for chunk in openai_stream_with_function_call(
+                        context=context,
+                        functions=functions,
+                        function_map=function_map,
+                        bot=bot
+                    ):
+                        collected += chunk
+                        yield chunk
                 
                 logger.info(f"[chat_with_persona] GPT 스트리밍 완료: user_id={req.user_id}")
                 
@@ -111,7 +116,7 @@ async def chat_with_persona_streaming(req: ChatRequest):
                 # run_embedding.delay(req.user_id)
 
                 # 후작업 비동기
-                asyncio.create_task(bot.check_and_summarize_if_needed())
+                asyncio.create_task(bot.schedule_summary())
                 asyncio.create_task(process_incremental_faiss_embedding(req.user_id))
             except RetryError as e:
                 logger.error(f"[chat_with_persona] GPT 응답 실패! user_id={req.user_id} | error={e}")
@@ -176,19 +181,24 @@ async def get_recent_ai_chat_history(
 @router.post("/reset")
 async def reset_ai_chat_session(req: ChatRequest):
     logger.info(f"[reset_ai_chat_session] user_id={req.user_id}")
-    bot = PersonaChatBot(user_id=req.user_id)
-    bot.reset()
+    bot = await bot_pool.get(req.user_id)
+    await bot.reset()
     return {"message": f"{req.user_id} 님의 AI 세션이 초기화되었습니다."}
 
 @router.patch("/configure")
 async def set_ai_bot_config(req: BotConfigRequest):
     logger.info(f"[set_ai_bot_config] user_id={req.user_id}, persona_name={req.persona_name}")
-    partner_id = get_connection_manager().get_partner(req.user_id)
-    bot = PersonaChatBot(req.user_id)
-    bot.set_persona_name(req.persona_name)
-
-    bot = PersonaChatBot(partner_id)
-    bot.set_persona_name(req.persona_name)
+    manager = get_connection_manager()
+    couple_id = await manager.get_couple_id(req.user_id)
+    if not couple_id:
+        raise HTTPException(status_code=404, detail="커플 매핑이 없습니다.")
+    partner_id = await manager.get_partner(req.user_id)
+
+    # 챗봇 이름은 커플 단위 설정 → DB 저장은 한 번, 상대는 config 캐시만 무효화
+    # (풀의 봇은 config를 들고 있지 않아 봇 엔트리는 무효화할 필요 없음)
+    await PersonaConfigService(req.user_id, couple_id).set_persona_name(req.persona_name)
+    if partner_id:
+        await PersonaConfigService(partner_id, couple_id).invalidate_cache()
 
     logger.info(f"[set_ai_bot_config] 챗봇 이름 저장 완료: user_id={req.user_id}, partner_id={partner_id}, persona_name={req.persona_name}")
     return {"message": "챗봇 설정이 저장되었습니다."}
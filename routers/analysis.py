@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, date, timedelta
-import json
+from utils import serialization
 
 from db.db import get_session
 from db.db_tables.analysis import (
@@ -41,7 +41,7 @@ async def get_couple_weekly_analysis(
                 "data": None
             }
         
-        analysis_result = json.loads(str(result.result)) if result.result is not None else {}
+        analysis_result = serialization.loads(str(result.result)) if result.result is not None else {}
 
         if analysis_result:
             user1_id, user2_id = get_users_by_couple_id(db, couple_id)
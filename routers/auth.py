@@ -14,6 +14,8 @@ from utils.jwt_utils import create_access_token, create_refresh_token, verify_to
 from core.settings import settings
 from db.db import get_session  # DB 세션 의존성 주입
 from db.crud import get_couple_id_by_user_id
+from core.redis_v2.l1_cache import invalidation_bus
+from core.redis_v2.redis import delete_couple_mapping
 from db.db_tables import *
 from utils.log_utils import get_logger
 
@@ -175,12 +177,16 @@ def delete_user_completely(user=Depends(get_current_user), db: Session = Depends
                 db.commit()
                 
                 # 2. 커플 삭제 (이제 순환 참조 없음)
+                couple_id, couple_users = couple.couple_id, [couple.user_1, couple.user_2]
                 db.delete(couple)
                 db.commit()
+                delete_couple_mapping(couple_id, couple_users)
+                invalidation_bus.invalidate_sync("couple", other_user_id)
         
         # 3. 마지막으로 사용자 삭제
         db.delete(user)
         db.commit()
+        invalidation_bus.invalidate_sync("couple", user_id)
         
         logger.info(f"사용자 {user_id} 완전 삭제 완료")
         return True
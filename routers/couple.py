@@ -6,6 +6,8 @@ import random, string
 from datetime import datetime, timedelta
 from db.db_tables import Couple, User, CoupleInvite
 from core.dependencies import get_db_session  # DB 세션 의존성 주입
+from core.redis_v2.l1_cache import invalidation_bus
+from core.redis_v2.redis import delete_couple_mapping
 from models.schema import CoupleInviteCreate, CoupleInviteJoin, CoupleInviteResponse
 
 router = APIRouter()
@@ -77,6 +79,9 @@ def join_invite(data: CoupleInviteJoin, db: Session = Depends(get_db_session)):
         {User.couple_id: couple_id}, synchronize_session="fetch"
     )
     db.commit()
+    # 커플 아님으로 캐시된 매핑 제거 (모든 워커)
+    invalidation_bus.invalidate_sync("couple", invite.inviter_user_id)
+    invalidation_bus.invalidate_sync("couple", data.invited_user_id)
 
     # 초대 상태 업데이트
     invite.status = "accepted"
@@ -107,6 +112,12 @@ def breakup(user_id: str, db: Session = Depends(get_db_session)):
     if couple:
         couple.deleted_at = datetime.utcnow()
         db.commit()
+
+    # 4. Redis 커플 매핑과 모든 워커의 캐시 무효화
+    user_ids = [couple.user_1, couple.user_2] if couple else [user_id]
+    delete_couple_mapping(couple_id, user_ids)
+    for uid in user_ids:
+        invalidation_bus.invalidate_sync("couple", uid)
     return {"detail": "커플이 해제되었습니다."}
 
 @router.get("/invites/{user_id}", response_model=List[CoupleInviteResponse])
@@ -1,12 +1,17 @@
+import asyncio
 from fastapi import WebSocket, WebSocketDisconnect, Depends
 from fastapi import APIRouter
 from core.dependencies import get_connection_manager, get_db_session
+from core.settings import settings
+from utils.log_utils import get_logger
 from services.ws_chat_service import (
     process_ws_connect,
     process_ws_message,
     process_ws_disconnect
 )
 
+logger = get_logger(__name__)
+
 router = APIRouter()
 
 @router.websocket("/{user_id}")
@@ -16,12 +21,26 @@ async def websocket_endpoint(
     manager = Depends(get_connection_manager),
     db = Depends(get_db_session)
 ):
+    conn = None
     try:
-        await process_ws_connect(db, manager, user_id, websocket)
+        conn = await process_ws_connect(db, manager, user_id, websocket)
+        if conn is None:
+            # 커플 담당 노드로 redirect 후 종료됨
+            return
         while True:
-            data = await websocket.receive_text()
-            await process_ws_message(db, manager, user_id, websocket, data)
+            # heartbeat pong도 오지 않으면 close 프레임 없이 죽은 소켓으로 보고 정리
+            data = await asyncio.wait_for(conn.receive(), timeout=settings.ws_idle_timeout)
+            await process_ws_message(db, manager, user_id, conn, data)
     except WebSocketDisconnect:
-        await process_ws_disconnect(manager, user_id)
+        pass
+    except asyncio.TimeoutError:
+        logger.info(f"[websocket_endpoint] heartbeat 응답 없음, 연결 종료: user_id={user_id}")
+        try:
+            await websocket.close(code=1001)
+        except RuntimeError:
+            pass
     finally:
+        # 비정상 종료여도 송신 writer 태스크와 연결 인덱스를 정리
+        if conn is not None:
+            await process_ws_disconnect(manager, user_id, conn)
         db.close()
@@ -1,4 +1,4 @@
-from tenacity import retry, stop_after_attempt, wait_fixed
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_fixed
 from core.dependencies import (
     get_openai_client,
     get_langchain_chain,
@@ -7,6 +7,9 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from typing import List, Optional
 from openai import BadRequestError
 from utils.log_utils import get_logger
+from utils.token_truncate import count_tokens, message_tokens, truncate_by_token
+from core.metrics import metrics
+from core.settings import settings
 import json
 import asyncio
 
@@ -59,18 +62,25 @@ async def call_langchain_chat(prompt: str, system_prompt: str = None) -> str:
     response = await chain.ainvoke(messages)
     return response.content
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
+# function call 루프 안의 API 호출만 재시도 (루프 전체를 재시도하면 이미 저장한 메시지가 Redis/DB에 중복 추가됨)
+@retry(stop=stop_after_attempt(3), wait=wait_fixed(1), retry=retry_if_not_exception_type(BadRequestError))
+async def _create_chat_completion(client, **params):
+    return await client.chat.completions.create(**params)
+
 async def openai_completion_with_function_call(
-    history,
+    context,
     functions,
     function_map,
     bot=None,
     max_func_calls=5
 ):
+    """
+    context: ChatContext (system prompt / 요약은 context가 들고 있고, 메시지는 context.append로 한 건씩 저장)
+    """
     client = await get_openai_client()
     params = {
         "model": "gpt-4o", # 실시간 응답 속도를 위해 mini 사용
-        "messages": filter_for_openai(history),
+        "messages": build_openai_messages(context),
         "stream": False,
         "functions": functions,
         "function_call": "auto"
@@ -80,10 +90,11 @@ async def openai_completion_with_function_call(
     while call_count < max_func_calls:
         logger.info(f"[openai_completion_with_function_call] call_count={call_count} | params={params}")
         try:
-            response = await client.chat.completions.create(**params)
+            response = await _create_chat_completion(client, **params)
         except BadRequestError as e:
             logger.error(f"[openai_completion_with_function_call] BadRequestError: {e}")
-        
+            raise
+
         if not response.choices:
             raise ValueError("GPT 응답에 choices가 없습니다.")
         msg = getattr(response.choices[0], "message", None)
@@ -110,7 +121,7 @@ async def openai_completion_with_function_call(
 
             if "query" not in args:
                 logger.warning(f"[function_call] 'query' 인자가 없음 → 사용자 입력으로 대체")
-                args["query"] = history[-1]["content"]
+                args["query"] = context.messages[-1]["content"]
 
             # 실제 function 실행
             if func_name == "save_survey_response":
@@ -118,27 +129,28 @@ async def openai_completion_with_function_call(
                 asyncio.create_task(function_map[func_name](**args))
             else:
                 result = await function_map[func_name](**args)
-            # history에 function 결과 append
+            # history에 function 결과 append (스트림 경로와 같은 형식, 토큰 수는 한 번만 계산)
+            function_content = json.dumps(result, ensure_ascii=False) if not isinstance(result, str) else result
+            function_tokens = count_tokens(function_content)
             if bot is not None:
-                function_msg_id = bot.save_to_db(bot.user_id, "function", json.dumps({"name": func_name, "result": result}, ensure_ascii=False))
+                function_msg_id = bot.save_to_db(bot.user_id, "function", function_content, name=func_name, token_count=function_tokens)
             else:
-                function_msg_id = history[-1]["id"] + 1
+                function_msg_id = context.messages[-1]["id"] + 1
             
             if func_name == "save_survey_response":
                 logger.info(f"[function_call] save_survey_response: {result}")
                 params["function_call"] = "none"
             else:
-                history.append({
+                await context.append({
                     "role": "function",
                     "name": func_name,
-                    "content": json.dumps(result, ensure_ascii=False) if not isinstance(result, str) else result,
-                    "id":function_msg_id
+                    "content": function_content,
+                    "id": function_msg_id,
+                    "tokens": function_tokens
                 })
 
-            if bot is not None:
-                bot.save_history(history)
             # function-call 후 루프 재시작
-            params["messages"] = filter_for_openai(history)
+            params["messages"] = build_openai_messages(context)
             continue  # 다시 반복문 진입
 
         # 2. function_call이 아니라면 assistant 답변 반환
@@ -155,9 +167,8 @@ async def openai_completion_with_function_call(
 from typing import AsyncGenerator
 from openai.types.chat import ChatCompletionChunk
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
 async def openai_stream_with_function_call(
-    history: list,
+    context,
     functions: list,
     function_map: dict,
     bot=None,
@@ -165,14 +176,16 @@ async def openai_stream_with_function_call(
 ) -> AsyncGenerator[str, None]:
     """
     function_call + streaming 가능한 GPT 응답 생성기
+    context: ChatContext (메시지는 context.append로 한 건씩 저장)
     """
     client = await get_openai_client()
-    current_history = filter_for_openai(history)
+    current_history = build_openai_messages(context)
 
     call_count = 0
     while call_count < max_func_calls:
         logger.info(f"[GPT INPUT]: {current_history}")
-        response = await client.chat.completions.create(
+        response = await _create_chat_completion(
+            client,
             model="gpt-4o",
             messages=current_history,
             stream=True,
@@ -212,28 +225,29 @@ async def openai_stream_with_function_call(
 
             if function_name == "search_past_chats" and "query" not in args:
                 logger.warning(f"[function_call] 'query' 인자가 없음 → 사용자 입력으로 대체")
-                args["query"] = history[-1]["content"]
+                args["query"] = context.messages[-1]["content"]
             
             # 🔧 function 실행
             result = await function_map[function_name](**args)
-            function_msg_id = bot.save_to_db(bot.user_id, "function", json.dumps(result, ensure_ascii=False), name=function_name) if bot else len(history)
+            function_content = json.dumps(result, ensure_ascii=False)
+            function_tokens = count_tokens(function_content)
+            function_msg_id = bot.save_to_db(bot.user_id, "function", function_content, name=function_name, token_count=function_tokens) if bot else len(context.messages)
     
-            history.append({
+            await context.append({
                 "role": "function",
                 "name": function_name,
-                "content": json.dumps(result, ensure_ascii=False),
-                "id": function_msg_id
+                "content": function_content,
+                "id": function_msg_id,
+                "tokens": function_tokens
             })
-            current_history = filter_for_openai(history)
-            if bot:
-                bot.save_history(history)
+            current_history = build_openai_messages(context)
             continue  # GPT 재호출
 
         # function_call 없이 정상 종료 → 저장
         if bot:
-            assistant_msg_id = bot.save_to_db(bot.user_id, "assistant", collected)
-            history.append({"role": "assistant", "content": collected, "id": assistant_msg_id})
-            bot.save_history(history)
+            assistant_tokens = count_tokens(collected)
+            assistant_msg_id = bot.save_to_db(bot.user_id, "assistant", collected, token_count=assistant_tokens)
+            await context.append({"role": "assistant", "content": collected, "id": assistant_msg_id, "tokens": assistant_tokens})
 
         break  # 종료
 
@@ -271,4 +285,71 @@ def filter_for_openai(history: list) -> list:
             msg["name"] = "chat_summarizer"
         assert msg.get("role") in ("system", "user", "assistant", "function"), msg
         assert isinstance(msg.get("content", ""), str), msg
-    return openai_inputs
\ No newline at end of file
+    return openai_inputs
+
+# 메시지 1건당 role/구분자 토큰 (OpenAI chat 포맷 기준 근사값)
+MESSAGE_OVERHEAD_TOKENS = 4
+ELIDED_FUNCTION_RESULT = "(이전 턴의 function 결과 생략)"
+
+def _split_turns(messages: list) -> list:
+    """user 메시지마다 새 턴 시작 (앞쪽 user 없는 메시지는 한 턴으로 묶음)"""
+    turns = []
+    for msg in messages:
+        if msg["role"] == "user" or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return turns
+
+def build_openai_messages(context, budget: int = None, function_max_tokens: int = None) -> list:
+    """
+    ChatContext → OpenAI 입력 메시지 (토큰 예산 적용)
+    - system prompt / 요약은 항상 유지
+    - function_max_tokens를 넘는 function 결과: 현재 턴은 잘라서, 이전 턴은 생략 문구로 대체
+    - 그래도 budget을 넘으면 오래된 턴부터 제외 (현재 턴은 항상 유지)
+    - 메트릭: openai.context.prompt_tokens / tokens_saved / dropped_turns / truncated_functions
+    """
+    budget = settings.chat_context_token_budget if budget is None else budget
+    function_max_tokens = settings.chat_function_result_max_tokens if function_max_tokens is None else function_max_tokens
+
+    head = filter_for_openai(context.head())
+    head_tokens = context.fixed_tokens + MESSAGE_OVERHEAD_TOKENS * len(head)
+    original_tokens = head_tokens + sum(message_tokens(m) + MESSAGE_OVERHEAD_TOKENS for m in context.messages)
+
+    turns = _split_turns(context.messages)
+    compacted = []
+    truncated = 0
+    for i, turn in enumerate(turns):
+        is_current = i == len(turns) - 1
+        turn_msgs, turn_tokens = filter_for_openai(turn), 0
+        for original, msg in zip(turn, turn_msgs):
+            tokens = message_tokens(original)
+            if msg["role"] == "function" and tokens > function_max_tokens:
+                truncated += 1
+                if is_current:
+                    msg["content"], _ = truncate_by_token(msg["content"], max_tokens=function_max_tokens)
+                else:
+                    msg["content"] = ELIDED_FUNCTION_RESULT
+                tokens = count_tokens(msg["content"])
+            turn_tokens += tokens + MESSAGE_OVERHEAD_TOKENS
+        compacted.append((turn_msgs, turn_tokens))
+
+    # 최신 턴부터 예산 안에서 채움 (중간이 비지 않도록 한 턴이라도 넘치면 그 이전은 모두 제외)
+    remaining = budget - head_tokens
+    kept = []
+    for turn_msgs, turn_tokens in reversed(compacted):
+        if kept and turn_tokens > remaining:
+            break
+        kept.append((turn_msgs, turn_tokens))
+        remaining -= turn_tokens
+
+    prompt_tokens = head_tokens + sum(tokens for _, tokens in kept)
+    saved = original_tokens - prompt_tokens
+    dropped = len(compacted) - len(kept)
+    metrics.observe("openai.context.prompt_tokens", prompt_tokens)
+    if saved > 0:
+        metrics.incr("openai.context.tokens_saved", saved)
+        metrics.incr("openai.context.dropped_turns", dropped)
+        metrics.incr("openai.context.truncated_functions", truncated)
+        logger.info(f"[build_openai_messages] {original_tokens} → {prompt_tokens} 토큰 "
+                    f"(dropped_turns={dropped}, truncated_functions={truncated})")
+    return head + [msg for turn_msgs, _ in reversed(kept) for msg in turn_msgs]
@@ -1,3 +1,4 @@
+import asyncio
 import faiss
 import numpy as np
 import json
@@ -6,43 +7,59 @@ from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from utils.log_utils import get_logger
 from services.openai_client import get_openai_embedding
-from core.redis_v2.redis import redis_client, redis_bin_client
+from core.redis_v2.redis import async_redis_bin_client
+from core.redis_v2.batch import hash_tag, get_many, set_many, delete_many
+from core.redis_v2 import codec
+from utils import serialization
+from core.redis_v2.namespace import faiss_namespace
+from core.redis_v2.single_flight import SingleFlight
 from db.db import get_session
 from db.db_tables import ChunkMetadata, AIMessage
 
 logger = get_logger(__name__)
 
+# 캐시 미스 시 재구성(DB 전체 chunk 조회 + 인덱스 생성)은 유저당 한 번만
+# chunk가 없는 유저는 재구성 후에도 캐시가 비어 있으므로 대기 측은 그대로 종료
+_rebuild_flight = SingleFlight("faiss_rebuild", wait_timeout=30.0, on_empty=lambda: None)
+
 class OptimizedFAISSCache:
-    """FAISS 인덱스와 chunk 텍스트를 Redis에 캐싱하는 클래스"""
+    """
+    FAISS 인덱스와 chunk 텍스트를 Redis에 캐싱하는 클래스
+    유저별 index/chunk_text/meta 키는 hash tag로 같은 slot에 두고 MULTI 한 번으로 저장·조회
+    (읽는 쪽에서 절반만 쓰인 인덱스를 보지 않도록)
+    키는 faiss_namespace generation을 포함: {prefix}:g{generation}:{user_id}
+    """
     
     INDEX_PREFIX = "chatbot:faiss:index"
     CHUNK_TEXT_PREFIX = "chatbot:faiss:chunk_text"
     META_PREFIX = "chatbot:faiss:meta"
     
     @classmethod
-    def _index_key(cls, user_id: str) -> str:
-        return f"{cls.INDEX_PREFIX}:{user_id}"
-    
-    @classmethod
-    def _chunk_text_key(cls, user_id: str) -> str:
-        return f"{cls.CHUNK_TEXT_PREFIX}:{user_id}"
+    async def _keys(cls, user_id: str) -> List[str]:
+        """현재 generation의 index/chunk_text/meta 키 (generation 조회는 L1 캐시)"""
+        generation = await faiss_namespace.generation()
+        tag = hash_tag(user_id)
+        return [
+            await faiss_namespace.key(prefix, tag, generation)
+            for prefix in (cls.INDEX_PREFIX, cls.CHUNK_TEXT_PREFIX, cls.META_PREFIX)
+        ]
     
     @classmethod
-    def _meta_key(cls, user_id: str) -> str:
-        return f"{cls.META_PREFIX}:{user_id}"
-    
-    @classmethod
-    def save_faiss_index(cls, user_id: str, index: faiss.Index, chunks: List[Dict], 
+    async def save_faiss_index(cls, user_id: str, index: faiss.Index, chunks: List[Dict], 
                         chunk_texts: List[str], metadata: Dict):
         """FAISS 인덱스와 관련 데이터를 Redis에 저장 (안전한 버전)"""
         try:
             # 1. FAISS 인덱스를 pickle로 직렬화 (가장 안전한 방법)
             index_bytes = pickle.dumps(index)
             
-            # 2. Redis에 저장
-            redis_bin_client.set(cls._index_key(user_id), index_bytes)
-            redis_client.set(cls._chunk_text_key(user_id), json.dumps(chunk_texts))
-            redis_client.set(cls._meta_key(user_id), json.dumps(metadata))
+            # 2. Redis에 한 트랜잭션으로 저장 (JSON도 바이너리 클라이언트로 utf-8 bytes 저장)
+            index_key, chunk_text_key, meta_key = await cls._keys(user_id)
+            # 인덱스/chunk 텍스트는 크기가 커서 codec으로 압축 (임계값 이상일 때만)
+            await set_many(async_redis_bin_client, {
+                index_key: codec.encode(cls.INDEX_PREFIX, index_bytes),
+                chunk_text_key: codec.encode(cls.CHUNK_TEXT_PREFIX, serialization.dumps_bytes(chunk_texts)),
+                meta_key: serialization.dumps_bytes(metadata),
+            })
             
             logger.info(f"✅ FAISS 인덱스 캐시 저장 완료: user_id={user_id}, chunks={len(chunks)}")
             
@@ -51,30 +68,27 @@ class OptimizedFAISSCache:
             logger.error(f"index_bytes 타입: {type(index_bytes) if 'index_bytes' in locals() else 'undefined'}")
 
     @classmethod
-    def load_faiss_index(cls, user_id: str) -> Tuple[Optional[faiss.Index], Optional[List[str]], Optional[Dict]]:
+    async def load_faiss_index(cls, user_id: str) -> Tuple[Optional[faiss.Index], Optional[List[str]], Optional[Dict]]:
         """Redis에서 FAISS 인덱스와 관련 데이터 로드 (안전한 버전)"""
         try:
-            # 1. 인덱스 로드
-            index_bytes = redis_bin_client.get(cls._index_key(user_id))
+            # 1. 인덱스와 나머지 데이터를 한 번에 로드
+            index_bytes, chunk_texts_raw, meta_raw = await get_many(async_redis_bin_client, await cls._keys(user_id))
             if not index_bytes:
                 logger.debug(f"캐시된 인덱스가 없습니다: user_id={user_id}")
                 return None, None, None
             
             # 2. pickle로 역직렬화 (가장 안전한 방법)
             try:
-                index = pickle.loads(index_bytes)
+                index = pickle.loads(codec.decode(cls.INDEX_PREFIX, index_bytes))
                 logger.debug(f"인덱스 로드 성공: user_id={user_id}, 타입={type(index)}")
             except Exception as pickle_error:
                 logger.error(f"pickle 역직렬화 실패: {pickle_error}")
                 return None, None, None
             
-            # 3. 나머지 데이터 로드
+            # 3. 나머지 데이터 파싱
             try:
-                chunk_texts_raw = redis_client.get(cls._chunk_text_key(user_id))
-                chunk_texts = json.loads(chunk_texts_raw) if chunk_texts_raw else []
-                
-                meta_raw = redis_client.get(cls._meta_key(user_id))
-                metadata = json.loads(meta_raw) if meta_raw else {}
+                chunk_texts = serialization.loads(codec.decode(cls.CHUNK_TEXT_PREFIX, chunk_texts_raw)) if chunk_texts_raw else []
+                metadata = serialization.loads(meta_raw) if meta_raw else {}
                 
                 logger.info(f"✅ FAISS 인덱스 캐시 로드 완료: user_id={user_id}")
                 return index, chunk_texts, metadata
@@ -88,13 +102,16 @@ class OptimizedFAISSCache:
             return None, None, None
     
     @classmethod
-    def clear_cache(cls, user_id: str):
+    async def exists(cls, user_id: str) -> bool:
+        index_key = (await cls._keys(user_id))[0]
+        return bool(await async_redis_bin_client.exists(index_key))
+
+    @classmethod
+    async def clear_cache(cls, user_id: str):
         """사용자의 캐시 삭제 (안전한 버전)"""
         try:
             # 기존 캐시 삭제
-            redis_bin_client.delete(cls._index_key(user_id))
-            redis_client.delete(cls._chunk_text_key(user_id))
-            redis_client.delete(cls._meta_key(user_id))
+            await delete_many(async_redis_bin_client, await cls._keys(user_id))
             
             logger.info(f"✅ FAISS 캐시 삭제 완료: user_id={user_id}")
             
@@ -102,26 +119,11 @@ class OptimizedFAISSCache:
             logger.error(f"❌ FAISS 캐시 삭제 실패: {e}")
 
     @classmethod
-    def clear_all_cache(cls):
-        """모든 FAISS 캐시 삭제 (개발/테스트용)"""
+    async def clear_all_cache(cls):
+        """모든 FAISS 캐시 무효화 (generation 증가, 이전 키는 reaper가 정리)"""
         try:
-            # 패턴으로 모든 관련 키 삭제
-            pattern = f"{cls.INDEX_PREFIX}:*"
-            keys = redis_bin_client.keys(pattern)
-            if keys:
-                redis_bin_client.delete(*keys)
-            
-            pattern = f"{cls.CHUNK_TEXT_PREFIX}:*"
-            keys = redis_client.keys(pattern)
-            if keys:
-                redis_client.delete(*keys)
-            
-            pattern = f"{cls.META_PREFIX}:*"
-            keys = redis_client.keys(pattern)
-            if keys:
-                redis_client.delete(*keys)
-            
-            logger.info("✅ 모든 FAISS 캐시 삭제 완료")
+            generation = await faiss_namespace.bump()
+            logger.info(f"✅ 모든 FAISS 캐시 무효화 완료: generation={generation}")
             
         except Exception as e:
             logger.error(f"❌ 전체 캐시 삭제 실패: {e}")
@@ -137,13 +139,13 @@ class OptimizedFAISSSearchService:
         """최적화된 유사 chunk 검색 (캐시 우선)"""
         try:
             # 1. Redis 캐시에서 인덱스 로드
-            index, chunk_texts, metadata = OptimizedFAISSCache.load_faiss_index(user_id)
+            index, chunk_texts, metadata = await OptimizedFAISSCache.load_faiss_index(user_id)
             
             if index is None:
                 # 캐시가 없으면 DB에서 재구성
                 logger.info(f"캐시가 없어서 DB에서 재구성: user_id={user_id}")
                 await self._rebuild_cache_from_db(user_id)
-                index, chunk_texts, metadata = OptimizedFAISSCache.load_faiss_index(user_id)
+                index, chunk_texts, metadata = await OptimizedFAISSCache.load_faiss_index(user_id)
                 
                 if index is None:
                     return []
@@ -178,9 +180,15 @@ class OptimizedFAISSSearchService:
             return []
     
     async def _rebuild_cache_from_db(self, user_id: str):
-        """DB에서 캐시 재구성 (안전한 버전)"""
+        """DB에서 캐시 재구성. 동시에 들어온 재구성 요청(다른 워커 포함)은 첫 요청의 완료를 기다림"""
+        async def _cached():
+            return True if await OptimizedFAISSCache.exists(user_id) else None
+
+        await _rebuild_flight.do(user_id, lambda: self._build_cache_from_db(user_id), check=_cached)
+
+    def _load_chunks_from_db(self, user_id: str) -> Tuple[List[ChunkMetadata], List, List[str], Dict]:
+        """chunk metadata / embedding / 텍스트 조회 (동기 DB 작업이라 스레드에서 실행)"""
         session = get_session()
-        
         try:
             # DB에서 chunk metadata 가져오기
             chunks = (
@@ -190,10 +198,6 @@ class OptimizedFAISSSearchService:
                 .all()
             )
             
-            if not chunks:
-                logger.info(f"사용자 {user_id}의 chunk가 없습니다.")
-                return
-            
             # embedding과 텍스트 준비
             embeddings = []
             chunk_texts = []
@@ -206,7 +210,7 @@ class OptimizedFAISSSearchService:
             for chunk in chunks:
                 try:
                     # embedding 로드
-                    embedding = json.loads(chunk.embedding)
+                    embedding = serialization.loads(chunk.embedding)
                     embeddings.append(embedding)
                     
                     # chunk 텍스트 재구성
@@ -219,6 +223,19 @@ class OptimizedFAISSSearchService:
                     logger.error(f"chunk {chunk.chunk_id} 처리 실패: {chunk_error}")
                     continue
             
+            return chunks, embeddings, chunk_texts, metadata
+        finally:
+            session.close()
+
+    async def _build_cache_from_db(self, user_id: str):
+        """DB에서 캐시 재구성 (안전한 버전)"""
+        try:
+            chunks, embeddings, chunk_texts, metadata = await asyncio.to_thread(self._load_chunks_from_db, user_id)
+            
+            if not chunks:
+                logger.info(f"사용자 {user_id}의 chunk가 없습니다.")
+                return
+            
             if not embeddings:
                 logger.warning(f"처리할 수 있는 embedding이 없습니다: user_id={user_id}")
                 return
@@ -230,7 +247,7 @@ class OptimizedFAISSSearchService:
                 index.add(embeddings_np)
                 
                 # 캐시에 저장
-                OptimizedFAISSCache.save_faiss_index(user_id, index, chunks, chunk_texts, metadata)
+                await OptimizedFAISSCache.save_faiss_index(user_id, index, chunks, chunk_texts, metadata)
                 
                 logger.info(f"✅ 캐시 재구성 완료: user_id={user_id}, chunks={len(chunks)}")
                 
@@ -239,8 +256,6 @@ class OptimizedFAISSSearchService:
                 
         except Exception as e:
             logger.error(f"❌ 캐시 재구성 실패: {e}")
-        finally:
-            session.close()
     
     def _reconstruct_chunk_text(self, session, chunk: ChunkMetadata) -> str:
         """chunk metadata에서 실제 텍스트 재구성"""
@@ -272,7 +287,7 @@ class OptimizedFAISSSearchService:
         """새로운 chunk가 추가될 때 캐시 증분 업데이트"""
         try:
             # 기존 캐시 로드
-            index, chunk_texts, metadata = OptimizedFAISSCache.load_faiss_index(user_id)
+            index, chunk_texts, metadata = await OptimizedFAISSCache.load_faiss_index(user_id)
             
             if index is None:
                 # 캐시가 없으면 전체 재구성
@@ -298,7 +313,7 @@ class OptimizedFAISSSearchService:
             metadata["last_updated"] = datetime.now().isoformat()
             
             # 캐시 업데이트
-            OptimizedFAISSCache.save_faiss_index(user_id, index, [], updated_chunk_texts, metadata)
+            await OptimizedFAISSCache.save_faiss_index(user_id, index, [], updated_chunk_texts, metadata)
             
             logger.info(f"✅ 캐시 증분 업데이트 완료: user_id={user_id}, new_chunks={len(new_chunks)}")
             
@@ -310,30 +325,21 @@ class OptimizedFAISSSearchService:
                                               end_date: Optional[datetime] = None,
                                               top_k: int = 3) -> List[Dict]:
         """시간 필터를 적용한 최적화된 검색"""
-        # 시간 필터는 DB 쿼리가 필요하므로 기존 방식 사용
+        # 시간 필터는 DB 쿼리가 필요하므로 기존 방식 사용 (스레드에서 실행)
         # 하지만 결과는 캐시된 텍스트 사용
-        session = get_session()
-        
         try:
             # 시간 필터로 chunk ID 찾기
-            query_filter = session.query(ChunkMetadata).filter_by(user_id=user_id)
-            
-            if start_date:
-                query_filter = query_filter.filter(ChunkMetadata.start_time >= start_date)
-            if end_date:
-                query_filter = query_filter.filter(ChunkMetadata.end_time <= end_date)
-            
-            filtered_chunks = query_filter.order_by(ChunkMetadata.chunk_id).all()
+            filtered_chunks = await asyncio.to_thread(self._query_chunks_in_range, user_id, start_date, end_date)
             
             if not filtered_chunks:
                 return []
             
             # 캐시에서 전체 인덱스 로드
-            index, chunk_texts, metadata = OptimizedFAISSCache.load_faiss_index(user_id)
+            index, chunk_texts, metadata = await OptimizedFAISSCache.load_faiss_index(user_id)
             
             if index is None:
                 await self._rebuild_cache_from_db(user_id)
-                index, chunk_texts, metadata = OptimizedFAISSCache.load_faiss_index(user_id)
+                index, chunk_texts, metadata = await OptimizedFAISSCache.load_faiss_index(user_id)
                 
                 if index is None:
                     return []
@@ -344,7 +350,7 @@ class OptimizedFAISSSearchService:
             chunk_id_to_idx = {chunk.chunk_id: idx for idx, chunk in enumerate(filtered_chunks)}
             
             for chunk in filtered_chunks:
-                embedding = json.loads(chunk.embedding)
+                embedding = serialization.loads(chunk.embedding)
                 filtered_embeddings.append(embedding)
                 filtered_texts.append(chunk_texts[chunk_id_to_idx[chunk.chunk_id]])
             
@@ -378,5 +384,18 @@ class OptimizedFAISSSearchService:
         except Exception as e:
             logger.error(f"시간 필터 검색 실패: {e}")
             return []
+
+    def _query_chunks_in_range(self, user_id: str, start_date: Optional[datetime],
+                               end_date: Optional[datetime]) -> List[ChunkMetadata]:
+        session = get_session()
+        try:
+            query_filter = session.query(ChunkMetadata).filter_by(user_id=user_id)
+            
+            if start_date:
+                query_filter = query_filter.filter(ChunkMetadata.start_time >= start_date)
+            if end_date:
+                query_filter = query_filter.filter(ChunkMetadata.end_time <= end_date)
+            
+            return query_filter.order_by(ChunkMetadata.chunk_id).all()
         finally:
             session.close() 
\ No newline at end of file
@@ -115,7 +115,7 @@ async def clear_user_cache(user_id: str):
     """사용자의 FAISS 캐시 삭제"""
     try:
         from services.optimized_faiss_search_service import OptimizedFAISSCache
-        OptimizedFAISSCache.clear_cache(user_id)
+        await OptimizedFAISSCache.clear_cache(user_id)
         logger.info(f"✅ 사용자 {user_id}의 캐시 삭제 완료")
     except Exception as e:
         logger.error(f"❌ 캐시 삭제 실패: {e}")
@@ -10,7 +10,6 @@ from services.openai_client import call_openai_completion
 from services.ai.user_personality_summary import summarize_personality_from_tags
 from db.crud import get_user_traits, save_user_trait_summary
 from core.redis_v2.persona_config_service import PersonaConfigService
-from core.redis_v2.redis import redis_client
 from langchain_core.output_parsers import JsonOutputParser
 
 logger = get_logger(__name__)
@@ -372,18 +371,14 @@ class SurveyManager:
             
             couple_id = user.couple_id
             
-            # 1. PersonaConfigService 캐시 무효화
+            # 1. PersonaConfigService 캐시 무효화 (Redis + 모든 워커의 L1)
             config_service = PersonaConfigService(user_id, couple_id)
-            config_service.invalidate_cache()
+            await config_service.invalidate_cache()
             
-            # 2. 기존 Redis 클라이언트 사용하여 캐시 삭제
-            cache_key = f"chat_config:{user_id}"
-            redis_client.delete(cache_key)
-            
-            # 3. 대화 히스토리 캐시도 무효화하여 다음 요청 시 새로운 system prompt 로드
+            # 2. 대화 히스토리 캐시도 무효화하여 다음 요청 시 새로운 system prompt 로드
             from core.redis_v2.redis import RedisAIHistory
             history_redis = RedisAIHistory()
-            history_redis.clear(user_id)
+            await history_redis.clear(user_id)
             
             logger.info(f"[SurveyManager] Redis 캐시 및 system prompt 업데이트 완료: user_id={user_id}")
                 
@@ -1,7 +1,7 @@
 from core.celery_worker import celery_app
 from core.bot import PersonaChatBot
 from services.rag_search import process_incremental_faiss_embedding
-import asyncio
+from core.redis_v2.redis import run_sync
 
 @celery_app.task
 def run_check_and_summarize(user_id: str):
@@ -11,8 +11,12 @@ def run_check_and_summarize(user_id: str):
 def run_embedding(user_id: str):
     run_embedding_async(user_id)
 
+async def _check_and_summarize(user_id: str):
+    bot = await PersonaChatBot.create(user_id)
+    await bot.check_and_summarize_if_needed()
+
 def run_check_summary_async(user_id: str):
-    asyncio.run(PersonaChatBot(user_id).check_and_summarize_if_needed())
+    run_sync(_check_and_summarize, user_id)
 
 def run_embedding_async(user_id: str):
-    asyncio.run(process_incremental_faiss_embedding(user_id))
+    run_sync(process_incremental_faiss_embedding, user_id)
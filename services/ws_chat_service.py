@@ -1,23 +1,59 @@
-import json
+import asyncio
+import uuid
 from datetime import datetime
+from db.db import SessionLocal
 from db.db_tables import Message
 from pydantic import BaseModel, ValidationError
 from models.schema import WSMessage
 from core.redis_v2.redis import RedisCoupleHistory
+from core.dependencies import get_message_writer
+from core.metrics import metrics
+from core.settings import settings
+from core.ws_codec import negotiate
+from utils.log_utils import get_logger
+
+logger = get_logger(__name__)
 
 async def process_ws_connect(db, manager, user_id, websocket):
-    await manager.connect(user_id, websocket)
-    manager.auto_register_from_redis(user_id)
+    """연결 등록 후 송신 큐를 가진 ClientConnection 반환 (redirect 한 경우 None). 이후 송수신은 모두 이 객체를 통해서"""
+    # handshake 시 요청한 서브프로토콜로 JSON / msgpack codec 협상
+    codec = negotiate(websocket.scope.get("subprotocols", []))
+    await manager.auto_register_from_redis(user_id)
+
+    # 커플 담당 노드가 아니면 담당 노드로 redirect (이미 redirect 받은 연결은 그대로 수용, pub/sub 경유)
+    if not websocket.query_params.get("redirected"):
+        url = manager.affinity.redirect_url(await manager.get_couple_id(user_id), user_id)
+        if url:
+            await websocket.accept(subprotocol=codec.subprotocol)
+            payload = codec.encode({"type": "redirect", "url": url, "reason": "affinity"})
+            if codec.binary:
+                await websocket.send_bytes(payload)
+            else:
+                await websocket.send_text(payload)
+            metrics.incr("ws.affinity.connect_redirects")
+            await websocket.close(code=4001)
+            return None
+
+    conn = await manager.connect(user_id, websocket, codec)
     await manager.broadcast_status(user_id, "online")
-    await send_undelivered_messages(db, manager, user_id, websocket)
+    await manager.send_presence_snapshot(user_id, conn)
+    await send_undelivered_messages(db, manager, user_id, conn)
+    return conn
 
-async def process_ws_disconnect(manager, user_id):
-    manager.disconnect(user_id)
-    await manager.broadcast_status(user_id, "offline")
+async def process_ws_disconnect(manager, user_id, conn):
+    couple_id = await manager.get_couple_id(user_id)
+    # 다른 디바이스가 남아 있으면 offline을 알리지 않음
+    if await manager.disconnect(user_id, conn):
+        await manager.broadcast_status(user_id, "offline", couple_id=couple_id)
 
 async def process_ws_message(db, manager, user_id, websocket, data):
+    # 바이너리 프로토콜은 여러 메시지를 batch 프레임 하나로 보낼 수 있음
+    if isinstance(data, dict) and data.get("type") == "batch":
+        for frame in data.get("frames") or []:
+            await process_ws_message(db, manager, user_id, websocket, frame)
+        return
     try:
-        message_data = WSMessage.parse_raw(data)
+        message_data = WSMessage.parse_obj(data) if isinstance(data, dict) else WSMessage.parse_raw(data)
     except ValidationError as e:
         await websocket.send_json({"type": "error", "message": f"잘못된 메시지 형식: {e}"})
         return
@@ -25,6 +61,8 @@ async def process_ws_message(db, manager, user_id, websocket, data):
     handler_map = {
         "register_couple": handle_register_couple,
         "message": handle_send_message,
+        "ack": handle_ack,
+        "pong": handle_pong,
     }
     handler = handler_map.get(message_data.type)
     if handler:
@@ -33,25 +71,76 @@ async def process_ws_message(db, manager, user_id, websocket, data):
         await websocket.send_json({"type": "error", "message": "알 수 없는 타입"})
 
 async def send_undelivered_messages(db, manager, user_id, websocket):
-    couple_id = manager.get_couple_id(user_id)
-    partner_id = manager.get_partner(user_id)
+    """
+    미전달 메시지 재전송 시작 (첫 페이지 전송)
+    이후 페이지는 클라이언트가 {"type": "ack", "chat_id": cursor}를 보내면 이어서 전송
+    """
+    couple_id = await manager.get_couple_id(user_id)
+    partner_id = await manager.get_partner(user_id)
     if not partner_id or not couple_id:
         return
-    undelivered = db.query(Message).filter_by(
-        couple_id=couple_id,
-        user_id=partner_id,
-        is_delivered=False
-    ).order_by(Message.created_at).all()
-    for msg in undelivered:
-        await websocket.send_json({
-            "type": "message",
-            "from": msg.user_id,
-            "couple_id": msg.couple_id,
-            "message": msg.content,
-            "image_url": msg.image_url
-        })
-        msg.is_delivered = True
-    db.commit()
+    # 아직 큐에 있는 메시지도 재전송 대상에 포함되도록 먼저 flush
+    await get_message_writer().flush()
+    websocket.state.replay = {"couple_id": couple_id, "partner_id": partner_id, "cursor": 0, "sent": 0}
+    await send_undelivered_page(websocket)
+
+async def send_undelivered_page(websocket):
+    """cursor 이후 미전달 메시지를 한 페이지(한 프레임)로 전송"""
+    replay = getattr(websocket.state, "replay", None)
+    if not replay:
+        return
+    # 동기 DB 조회가 이벤트 루프를 막지 않도록 스레드에서 (자체 세션 사용)
+    page = await asyncio.to_thread(
+        _load_undelivered_page, replay["couple_id"], replay["partner_id"], replay["cursor"])
+    if not page:
+        websocket.state.replay = None
+        return
+
+    replay["sent"] = page[-1]["chat_id"]
+    await websocket.send_json({
+        "type": "messages",
+        "messages": page,
+        "cursor": replay["sent"],
+        "has_more": len(page) == settings.ws_replay_page_size
+    })
+
+async def handle_ack(db, manager, user_id, websocket, data):
+    replay = getattr(websocket.state, "replay", None)
+    if not replay or data.chat_id is None:
+        return
+    # 아직 보내지 않은 메시지까지 ack 할 수 없도록 보낸 cursor로 제한
+    acked = min(data.chat_id, replay["sent"])
+    if acked <= replay["cursor"]:
+        return
+    replay["cursor"] = acked
+    get_message_writer().mark_delivered_upto(replay["couple_id"], replay["partner_id"], acked)
+    if acked == replay["sent"]:
+        await send_undelivered_page(websocket)
+
+def _load_undelivered_page(couple_id: str, partner_id: str, cursor: int) -> list[dict]:
+    with SessionLocal() as db:
+        page = db.query(Message).filter(
+            Message.couple_id == couple_id,
+            Message.user_id == partner_id,
+            Message.is_delivered == False,  # noqa: E712
+            Message.chat_id > cursor
+        ).order_by(Message.chat_id).limit(settings.ws_replay_page_size).all()
+        return [
+            {
+                "chat_id": msg.chat_id,
+                "msg_uid": msg.msg_uid,
+                "from": msg.user_id,
+                "couple_id": msg.couple_id,
+                "message": msg.content,
+                "image_url": msg.image_url,
+                "created_at": msg.created_at.isoformat() if msg.created_at else None
+            }
+            for msg in page
+        ]
+
+async def handle_pong(db, manager, user_id, websocket, data):
+    # heartbeat 응답. 수신 자체로 receive 루프의 idle 타이머가 갱신됨
+    return
 
 async def handle_register_couple(db, manager, user_id, websocket, data):
     partner_id = data.partner_id
@@ -59,8 +148,8 @@ async def handle_register_couple(db, manager, user_id, websocket, data):
     if not partner_id or not couple_id:
         await websocket.send_json({"type": "error", "message": "partner_id, couple_id 필요"})
         return
-    manager.register_couple(user_id, partner_id, couple_id)
-    if manager.is_user_connected(partner_id):
+    await manager.register_couple(user_id, partner_id, couple_id)
+    if await manager.is_user_online(partner_id):
         await websocket.send_json({"type": "system", "message": f"{partner_id}와 연결되었습니다."})
         await manager.send_personal_json({"type": "system", "message": f"{user_id}와 연결되었습니다."}, partner_id)
 
@@ -69,23 +158,38 @@ async def handle_send_message(db, manager, user_id, websocket, data):
     couple_id = data.couple_id
     message = data.message
     image_url = data.image_url
-    partner_id = manager.get_partner(user_id)
+    partner_id = await manager.get_partner(user_id)
     created_at = datetime.utcnow()
-    db_msg = Message(
-        couple_id=couple_id,
-        user_id=user_id,
-        content=message,
-        image_url=image_url,
-        has_image=bool(image_url),
-        created_at=created_at,
-        is_delivered=manager.is_user_connected(partner_id)
-    )
+    msg_uid = uuid.uuid4().hex
+
+    # 1. DB 저장은 write-behind 큐로 (배치 flush). 항상 미전달로 저장하고,
+    #    상대 소켓에 실제로 써진 뒤(on_delivered) 또는 재전송 ack 시에만 전달 완료로 바꿈
+    await get_message_writer().enqueue({
+        "couple_id": couple_id,
+        "user_id": user_id,
+        "content": message,
+        "image_url": image_url,
+        "has_image": bool(image_url),
+        "created_at": created_at,
+        "is_delivered": False,
+        "msg_uid": msg_uid
+    })
+
+    # 2. 상대에게 전달 (다른 노드면 pub/sub 경유, 받는 노드가 소켓 쓰기 후 전달 완료 처리)
+    if await manager.is_user_online(partner_id):
+        await manager.send_personal_json({
+            "type": "message",
+            "from": user_id,
+            "couple_id": couple_id,
+            "message": message,
+            "image_url": image_url,
+            "created_at": created_at.isoformat(),
+            "msg_uid": msg_uid
+        }, partner_id)
+
+    # 3. Redis 최근 히스토리 반영
     try:
-        db.add(db_msg)
-        db.commit()
-        # Redis에 append (DB 성공 이후에만)
-        
-        redis_couple_history.append(
+        await redis_couple_history.append(
             couple_id,
             {
                 "user_id": user_id,
@@ -94,18 +198,5 @@ async def handle_send_message(db, manager, user_id, websocket, data):
                 "created_at": created_at.isoformat()
             }
         )
-        # 상대 연결되어 있으면 바로 전달
-        if manager.is_user_connected(partner_id):
-            await manager.send_personal_message(json.dumps({
-                "type": "message",
-                "from": user_id,
-                "couple_id": couple_id,
-                "message": message,
-                "image_url": image_url,
-                "created_at": created_at.isoformat()
-            }), partner_id)
     except Exception as e:
-        db.rollback()
-        await websocket.send_json({"type": "error", "message": f"메시지 저장 오류: {e}"})
-    finally:
-        db.close()
\ No newline at end of file
+        logger.error(f"[handle_send_message] Redis 히스토리 저장 실패: couple_id={couple_id}, error={e}")
@@ -0,0 +1,105 @@
+"""
+couple affinity 라우팅 시뮬레이터
+
+노드 추가/제거 이벤트를 순서대로 적용하면서 consistent hash ring과 단순 modulo 해시를 비교한다.
+    - moved     : 이벤트마다 담당 노드가 바뀐 커플 비율 (재연결/redirect 대상)
+    - hit_ratio : 메시지 중 로컬 전달(커플 두 사람이 같은 노드)로 끝난 비율
+                  담당이 바뀐 커플은 재연결(handoff)이 끝날 때까지 pub/sub 경유로 계산
+
+    python -m tests.bench.affinity_sim --couples 20000 --nodes 4 --handoff 0.1
+"""
+import argparse
+import hashlib
+import random
+
+from core.affinity import HashRing
+
+
+def modulo_owner(nodes: list[str], key: str) -> str:
+    h = int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+    return nodes[h % len(nodes)]
+
+
+def build_events(initial: int, steps: int, seed: int) -> list[tuple[str, str]]:
+    """("add"|"remove", node) 이벤트 시퀀스. 노드 수는 최소 2개 유지"""
+    rng = random.Random(seed)
+    alive = [f"node-{i}" for i in range(initial)]
+    next_id = initial
+    events = []
+    for _ in range(steps):
+        if len(alive) > 2 and rng.random() < 0.5:
+            node = rng.choice(alive)
+            alive.remove(node)
+            events.append(("remove", node))
+        else:
+            node = f"node-{next_id}"
+            next_id += 1
+            alive.append(node)
+            events.append(("add", node))
+    return events
+
+
+def simulate(strategy: str, couples: list[str], initial: int, events: list, handoff: float, vnodes: int) -> list[dict]:
+    nodes = [f"node-{i}" for i in range(initial)]
+    ring = HashRing(nodes, vnodes=vnodes)
+
+    def assign() -> dict:
+        if strategy == "ring":
+            return {c: ring.get(c) for c in couples}
+        ordered = sorted(nodes)
+        return {c: modulo_owner(ordered, c) for c in couples}
+
+    owners = assign()
+    rows = []
+    for kind, node in events:
+        if kind == "add":
+            nodes.append(node)
+            ring.add(node)
+        else:
+            nodes.remove(node)
+            ring.remove(node)
+        new_owners = assign()
+        moved = sum(1 for c in couples if owners[c] != new_owners[c]) / len(couples)
+        # handoff 구간: 이동한 커플의 메시지는 재연결 전까지 pub/sub 경유 (1 - moved * handoff 비율만 로컬)
+        rows.append({
+            "event": f"{kind} {node}",
+            "nodes": len(nodes),
+            "moved": moved,
+            "hit_ratio": 1 - moved * handoff,
+        })
+        owners = new_owners
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="couple affinity 라우팅 시뮬레이터")
+    parser.add_argument("--couples", type=int, default=20000)
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--vnodes", type=int, default=160)
+    parser.add_argument("--handoff", type=float, default=0.1,
+                        help="이벤트 간 메시지 중 재연결 완료 전에 오가는 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    couples = [f"couple-{i}" for i in range(args.couples)]
+    events = build_events(args.nodes, args.steps, args.seed)
+    results = {
+        "ring": simulate("ring", couples, args.nodes, events, args.handoff, args.vnodes),
+        "modulo": simulate("modulo", couples, args.nodes, events, args.handoff, args.vnodes),
+    }
+
+    print(f"커플 {args.couples}개, 초기 노드 {args.nodes}개, vnodes={args.vnodes}, handoff={args.handoff}")
+    print(f"{'event':18}{'nodes':>6}{'ring moved':>12}{'ring hit':>10}{'mod moved':>12}{'mod hit':>10}")
+    for ring_row, mod_row in zip(results["ring"], results["modulo"]):
+        print(f"{ring_row['event']:18}{ring_row['nodes']:>6}"
+              f"{ring_row['moved']:>12.3f}{ring_row['hit_ratio']:>10.3f}"
+              f"{mod_row['moved']:>12.3f}{mod_row['hit_ratio']:>10.3f}")
+    for name, rows in results.items():
+        avg_moved = sum(r["moved"] for r in rows) / len(rows)
+        avg_hit = sum(r["hit_ratio"] for r in rows) / len(rows)
+        print(f"[{name}] 평균 이동 비율={avg_moved:.3f}, 평균 로컬 전달 비율={avg_hit:.4f}")
+
+
+if __name__ == "__main__":
+    main()
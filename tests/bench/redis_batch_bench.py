@@ -0,0 +1,77 @@
+"""
+Redis 다중 키 round trip 벤치마크
+
+FAISS 캐시와 같은 구성(인덱스 bytes + JSON 2개)을 유저 N명에 대해
+개별 SET/GET(키당 1 round trip)과 core.redis_v2.batch(MULTI 1 round trip)로 저장·조회해 비교한다.
+원격 Redis(ElastiCache 등)일수록 RTT 비중이 커서 차이가 벌어진다.
+
+    REDIS_HOST=... REDIS_SSL=false python -m tests.bench.redis_batch_bench --users 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from core.redis_v2.batch import hash_tag, get_many, set_many, delete_many
+from core.redis_v2.redis import async_redis_bin_client
+
+PREFIXES = ("bench:faiss:index", "bench:faiss:chunk_text", "bench:faiss:meta")
+
+
+def keys_for(user_id: str) -> list[str]:
+    return [f"{prefix}:{hash_tag(user_id)}" for prefix in PREFIXES]
+
+
+def values_for(index_bytes: bytes) -> list[bytes]:
+    return [index_bytes, json.dumps(["chunk"] * 50).encode("utf-8"), json.dumps({"total_chunks": 50}).encode("utf-8")]
+
+
+async def sequential(users: list[str], index_bytes: bytes) -> tuple[float, float]:
+    start = time.perf_counter()
+    for user_id in users:
+        for key, value in zip(keys_for(user_id), values_for(index_bytes)):
+            await async_redis_bin_client.set(key, value)
+    write = time.perf_counter() - start
+    start = time.perf_counter()
+    for user_id in users:
+        for key in keys_for(user_id):
+            await async_redis_bin_client.get(key)
+    return write, time.perf_counter() - start
+
+
+async def batched(users: list[str], index_bytes: bytes) -> tuple[float, float]:
+    start = time.perf_counter()
+    for user_id in users:
+        await set_many(async_redis_bin_client, dict(zip(keys_for(user_id), values_for(index_bytes))))
+    write = time.perf_counter() - start
+    start = time.perf_counter()
+    for user_id in users:
+        await get_many(async_redis_bin_client, keys_for(user_id))
+    return write, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Redis 다중 키 round trip 벤치마크")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--index-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    users = [f"bench-{i}" for i in range(args.users)]
+    index_bytes = os.urandom(args.index_kb * 1024)
+    try:
+        seq_w, seq_r = await sequential(users, index_bytes)
+        bat_w, bat_r = await batched(users, index_bytes)
+    finally:
+        for user_id in users:
+            await delete_many(async_redis_bin_client, keys_for(user_id), atomic=False)
+
+    per = lambda seconds: seconds / len(users) * 1000
+    print(f"유저 {args.users}명, 인덱스 {args.index_kb}KB, 유저당 키 {len(PREFIXES)}개")
+    print(f"{'':12}{'write ms/user':>16}{'read ms/user':>16}{'round trips':>14}")
+    print(f"{'sequential':12}{per(seq_w):>16.3f}{per(seq_r):>16.3f}{len(PREFIXES):>14}")
+    print(f"{'batched':12}{per(bat_w):>16.3f}{per(bat_r):>16.3f}{1:>14}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
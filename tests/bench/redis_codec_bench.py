@@ -0,0 +1,66 @@
+"""
+Redis 값 압축 codec 벤치마크
+
+test_data 커플 채팅 샘플로 실제 저장 형태의 값을 만들어
+알고리즘별 압축률과 인코딩/디코딩 CPU 시간을 비교한다.
+  - history: 최근 N턴 히스토리 JSON (chatroom:history blob / 요약 입력 크기)
+  - faiss_chunks: FAISS chunk 텍스트 목록 JSON
+  - embeddings: float32 임베딩 행렬 (압축 효과가 거의 없는 대조군)
+
+    python -m tests.bench.redis_codec_bench --turns 100 --repeat 500
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from core.redis_v2 import codec
+
+SAMPLE_PATH = Path(__file__).resolve().parents[2] / "test_data" / "couple_messages_sample.json"
+
+
+def load_payloads(turns: int) -> dict[str, bytes]:
+    rows = json.loads(SAMPLE_PATH.read_text(encoding="utf-8"))
+    history = [{"user_id": row["user_id"], "content": row["content"]} for row in rows]
+    history = (history * (turns // len(history) + 1))[:turns]
+    chunks = ["\n".join(f"{m['user_id']}: {m['content']}" for m in history[i:i + 10]) for i in range(0, turns, 10)]
+    embeddings = np.random.default_rng(0).standard_normal((len(chunks), 1536)).astype(np.float32)
+    return {
+        "history": json.dumps(history).encode("utf-8"),
+        "faiss_chunks": json.dumps(chunks).encode("utf-8"),
+        "embeddings": embeddings.tobytes(),
+    }
+
+
+def bench(algo: bytes, data: bytes, repeat: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = codec.encode("bench", data, threshold=0, algo=algo)
+    encode_us = (time.perf_counter() - start) / repeat * 1e6
+    start = time.perf_counter()
+    for _ in range(repeat):
+        codec.decode("bench", encoded)
+    decode_us = (time.perf_counter() - start) / repeat * 1e6
+    return {"bytes": len(encoded), "ratio": len(data) / len(encoded), "encode_us": encode_us, "decode_us": decode_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis 값 압축 codec 벤치마크")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    algos = codec.available_algos()
+    print(f"알고리즘: {', '.join(algos)} (기본값: {codec.DEFAULT_ALGO!r}), turns={args.turns}, repeat={args.repeat}")
+    for name, data in load_payloads(args.turns).items():
+        print(f"\n[{name}] 원본 {len(data)} bytes")
+        print(f"{'':8}{'bytes':>10}{'ratio':>8}{'enc_us':>10}{'dec_us':>10}")
+        for algo_name, algo in algos.items():
+            r = bench(algo, data, args.repeat)
+            print(f"{algo_name:8}{r['bytes']:>10}{r['ratio']:>8.2f}{r['encode_us']:>10.1f}{r['decode_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+JSON 직렬화 벤치마크: stdlib json(ensure_ascii=False) vs utils.serialization(orjson)
+
+results/*.json 분석 결과(DB result 컬럼/API 응답 크기)와 test_data 커플 채팅 샘플로 만든
+히스토리 리스트(Redis 값)를 dumps/loads 하며 호출당 시간과 출력 bytes를 비교한다.
+
+    python -m tests.bench.serialization_bench --repeat 200
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from utils import serialization
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def load_payloads() -> dict:
+    payloads = {path.name: json.loads(path.read_text(encoding="utf-8")) for path in sorted((ROOT / "results").glob("*.json"))}
+    rows = json.loads((ROOT / "test_data" / "couple_messages_sample.json").read_text(encoding="utf-8"))
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": row["content"]} for i, row in enumerate(rows)]
+    payloads["history_100"] = (history * 4)[:100]
+    return payloads
+
+
+def _time(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench(payload, repeat: int) -> dict:
+    std_text = json.dumps(payload, ensure_ascii=False)
+    fast_bytes = serialization.dumps_bytes(payload)
+    assert serialization.loads(fast_bytes) == json.loads(std_text)
+    return {
+        "std_dumps_us": _time(lambda: json.dumps(payload, ensure_ascii=False).encode("utf-8"), repeat),
+        "fast_dumps_us": _time(lambda: serialization.dumps_bytes(payload), repeat),
+        "std_loads_us": _time(lambda: json.loads(std_text), repeat),
+        "fast_loads_us": _time(lambda: serialization.loads(fast_bytes), repeat),
+        "std_bytes": len(std_text.encode("utf-8")),
+        "fast_bytes": len(fast_bytes),
+        "ascii_bytes": len(json.dumps(payload).encode("utf-8")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 직렬화 벤치마크")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    backend = "orjson" if serialization.orjson is not None else "stdlib json (orjson 미설치)"
+    print(f"backend={backend}, repeat={args.repeat}")
+    print(f"{'payload':36}{'std_dumps':>11}{'fast_dumps':>11}{'std_loads':>11}{'fast_loads':>11}"
+          f"{'std_B':>9}{'fast_B':>9}{'ascii_B':>9}")
+    for name, payload in load_payloads().items():
+        r = bench(payload, args.repeat)
+        print(f"{name:36}{r['std_dumps_us']:>11.1f}{r['fast_dumps_us']:>11.1f}{r['std_loads_us']:>11.1f}"
+              f"{r['fast_loads_us']:>11.1f}{r['std_bytes']:>9}{r['fast_bytes']:>9}{r['ascii_bytes']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+WebSocket 프레임 JSON vs msgpack 벤치마크
+
+test_data 커플 채팅 샘플로 실제 "message" 프레임을 만들어
+프레임당 인코딩/디코딩 CPU 시간과 바이트 수를 비교한다 (단일 프레임 / batch 프레임).
+
+    python -m tests.bench.ws_codec_bench --repeat 2000 --batch 16
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from core.ws_codec import JSON_CODEC, MSGPACK_CODEC
+
+SAMPLE_PATH = Path(__file__).resolve().parents[2] / "test_data" / "couple_messages_sample.json"
+
+
+def load_frames() -> list[dict]:
+    rows = json.loads(SAMPLE_PATH.read_text(encoding="utf-8"))
+    return [
+        {
+            "type": "message",
+            "from": str(row["user_id"]),
+            "couple_id": str(row["couple_id"]),
+            "message": row["content"],
+            "image_url": row.get("image_url"),
+            "created_at": row["created_at"],
+        }
+        for row in rows
+    ]
+
+
+def bench(codec, frames: list[dict], repeat: int, batch: int) -> dict:
+    # 단일 프레임
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = [codec.encode(f) for f in frames]
+    encode_us = (time.perf_counter() - start) / (repeat * len(frames)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for payload in encoded:
+            codec.decode(payload)
+    decode_us = (time.perf_counter() - start) / (repeat * len(frames)) * 1e6
+    single_bytes = sum(len(p.encode("utf-8") if isinstance(p, str) else p) for p in encoded) / len(frames)
+
+    # batch 프레임
+    chunks = [frames[i:i + batch] for i in range(0, len(frames), batch)]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        batched = [codec.encode_batch(c) for c in chunks]
+    batch_encode_us = (time.perf_counter() - start) / (repeat * len(frames)) * 1e6
+    batch_bytes = sum(len(p.encode("utf-8") if isinstance(p, str) else p) for p in batched) / len(frames)
+
+    return {
+        "encode_us/frame": encode_us,
+        "decode_us/frame": decode_us,
+        "bytes/frame": single_bytes,
+        "batch_encode_us/frame": batch_encode_us,
+        "batch_bytes/frame": batch_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 프레임 codec 벤치마크")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    frames = load_frames()
+    codecs = {"json": JSON_CODEC}
+    if MSGPACK_CODEC is None:
+        print("msgpack 미설치: JSON 결과만 출력합니다 (pip install msgpack)")
+    else:
+        codecs["msgpack"] = MSGPACK_CODEC
+
+    print(f"샘플 프레임 {len(frames)}개, repeat={args.repeat}, batch={args.batch}")
+    results = {name: bench(codec, frames, args.repeat, args.batch) for name, codec in codecs.items()}
+    metrics = list(next(iter(results.values())).keys())
+    print(f"{'':24}" + "".join(f"{name:>12}" for name in results))
+    for metric in metrics:
+        print(f"{metric:24}" + "".join(f"{results[name][metric]:>12.2f}" for name in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+로컬 멀티 프로세스 WebSocket fan-out 하네스
+
+.env의 DB + 로컬 Redis를 대상으로 uvicorn 프로세스를 여러 개 띄우고,
+커플의 두 유저를 서로 다른 프로세스에 붙여 메시지가 실시간 전달되는지 확인한다.
+
+    docker-compose up -d redis
+    REDIS_SSL=false python -m tests.bench.ws_fanout_harness --workers 2 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+from db.db import SessionLocal
+from db.db_tables import User, Couple
+from core.redis_v2.redis import save_couple_mapping
+
+USER_A = "harness_user_a"
+USER_B = "harness_user_b"
+COUPLE_ID = "harness_couple"
+
+
+def seed_couple():
+    """하네스용 유저/커플을 DB와 Redis에 준비"""
+    with SessionLocal() as db:
+        for user_id in (USER_A, USER_B):
+            if not db.query(User).filter_by(user_id=user_id).first():
+                db.add(User(user_id=user_id, name=user_id))
+        db.commit()
+        if not db.query(Couple).filter_by(couple_id=COUPLE_ID).first():
+            db.add(Couple(couple_id=COUPLE_ID, user_1=USER_A, user_2=USER_B))
+            db.commit()
+    save_couple_mapping(USER_A, USER_B, COUPLE_ID)
+
+
+def start_workers(count: int, base_port: int) -> list[subprocess.Popen]:
+    env = {**os.environ, "REDIS_SSL": os.environ.get("REDIS_SSL", "false")}
+    procs = []
+    for i in range(count):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(base_port + i), "--log-level", "warning"],
+            env=env,
+        ))
+    for i in range(count):
+        url = f"http://127.0.0.1:{base_port + i}/"
+        for _ in range(60):
+            try:
+                urllib.request.urlopen(url, timeout=1)
+                break
+            except OSError:
+                time.sleep(0.5)
+        else:
+            raise RuntimeError(f"워커 기동 실패: {url}")
+    return procs
+
+
+async def receive_messages(ws, expected: int, sent_at: dict, latencies: list, timeout: float):
+    received = 0
+    while received < expected:
+        raw = await asyncio.wait_for(ws.recv(), timeout=timeout)
+        frame = json.loads(raw)
+        if frame.get("type") != "message":
+            continue
+        seq = int(frame["message"].split(":")[1])
+        latencies.append((time.perf_counter() - sent_at[seq]) * 1000)
+        received += 1
+    return received
+
+
+async def run(ports: list[int], messages: int, timeout: float):
+    port_a, port_b = ports[0], ports[-1]
+    async with websockets.connect(f"ws://127.0.0.1:{port_a}/ws/{USER_A}") as ws_a, \
+               websockets.connect(f"ws://127.0.0.1:{port_b}/ws/{USER_B}") as ws_b:
+        # 구독이 반영될 시간을 잠깐 준다
+        await asyncio.sleep(0.5)
+        sent_at, latencies = {}, []
+        receiver = asyncio.create_task(receive_messages(ws_b, messages, sent_at, latencies, timeout))
+        for seq in range(messages):
+            sent_at[seq] = time.perf_counter()
+            await ws_a.send(json.dumps({"type": "message", "couple_id": COUPLE_ID, "message": f"harness:{seq}"}))
+        try:
+            received = await receiver
+        except asyncio.TimeoutError:
+            received = len(latencies)
+
+    print(f"워커 {port_a} → {port_b}: 전달 {received}/{messages}")
+    if latencies:
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"  p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms")
+    return received == messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="멀티 워커 WebSocket fan-out 하네스")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--base-port", type=int, default=8101)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    seed_couple()
+    procs = start_workers(max(args.workers, 2), args.base_port)
+    try:
+        ports = [args.base_port + i for i in range(max(args.workers, 2))]
+        ok = asyncio.run(run(ports, args.messages, args.timeout))
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from models.db_models import Base
+from db.db_tables import Base
 from main import app
 from core.dependencies import get_db_session
 
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import create_engine, text
+from db.db_tables import Base
+from db.db_utils import verify_schema
+
+
+def test_schema_from_models_passes():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    verify_schema(engine)
+
+
+def test_missing_migration_fails_loudly():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        # 마이그레이션 적용 전 운영 테이블 (msg_uid 없음)
+        conn.execute(text("CREATE TABLE messages (chat_id INTEGER PRIMARY KEY, content TEXT)"))
+    with pytest.raises(RuntimeError, match="messages.msg_uid"):
+        verify_schema(engine)
+
+
+def test_msg_uid_without_unique_index_fails():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE messages (chat_id INTEGER PRIMARY KEY, msg_uid VARCHAR(32))"))
+    with pytest.raises(RuntimeError, match=r"messages.msg_uid \(UNIQUE\)"):
+        verify_schema(engine)
+
+
+def test_missing_token_count_fails():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE ai_messages DROP COLUMN token_count"))
+    with pytest.raises(RuntimeError, match="ai_messages.token_count"):
+        verify_schema(engine)
@@ -0,0 +1,132 @@
+import asyncio
+from sqlalchemy.orm import sessionmaker
+import core.message_writer as message_writer
+from core.message_writer import MessageWriteBehind
+from db.db_tables import Message
+
+
+class RecordingWriter(MessageWriteBehind):
+    """DB 대신 배치를 기록 (fail_times 만큼 먼저 실패)"""
+
+    def __init__(self, fail_times: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_times = fail_times
+        self.batches = []
+
+    def _write_batch(self, rows, delivered_upto, delivered_uids):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("db down")
+        self.batches.append((list(rows), dict(delivered_upto)))
+        return set(delivered_uids)
+
+    @property
+    def written(self):
+        return [row for rows, _ in self.batches for row in rows]
+
+
+def _row(i: int) -> dict:
+    return {"couple_id": "c1", "user_id": "u1", "content": f"m{i}", "is_delivered": False}
+
+
+def test_flush_on_batch_size():
+    async def scenario():
+        writer = RecordingWriter(batch_size=3, flush_interval=30)
+        await writer.start()
+        for i in range(3):
+            await writer.enqueue(_row(i))
+        await asyncio.sleep(0.1)
+        assert [row["content"] for row in writer.written] == ["m0", "m1", "m2"]
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_flush_on_interval():
+    async def scenario():
+        writer = RecordingWriter(batch_size=100, flush_interval=0.05)
+        await writer.start()
+        await writer.enqueue(_row(0))
+        assert writer.written == []
+        await asyncio.sleep(0.3)
+        assert [row["content"] for row in writer.written] == ["m0"]
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_is_requeued_in_order_with_backoff():
+    async def scenario():
+        writer = RecordingWriter(fail_times=2, batch_size=10, flush_interval=0.01, max_retry_delay=0.03)
+        for i in range(3):
+            await writer.enqueue(_row(i))
+        writer.mark_delivered_upto("c1", "u2", 7)
+
+        assert await writer.flush() is False
+        assert writer._retry_delay() == 0.02
+        assert await writer.flush() is False
+        assert writer._retry_delay() == 0.03  # max_retry_delay로 상한
+        assert [row["content"] for row in writer._pending] == ["m0", "m1", "m2"]
+
+        assert await writer.flush() is True
+        assert writer._failures == 0
+        rows, delivered = writer.batches[0]
+        assert [row["content"] for row in rows] == ["m0", "m1", "m2"]
+        assert delivered == {("c1", "u2"): 7}
+        # 재시도해도 msg_uid는 그대로 (멱등 insert 키)
+        assert len({row["msg_uid"] for row in rows}) == 3
+
+    asyncio.run(scenario())
+
+
+def test_stop_drains_pending_queue():
+    async def scenario():
+        writer = RecordingWriter(fail_times=1, batch_size=100, flush_interval=30, max_retry_delay=0.01)
+        await writer.start()
+        for i in range(5):
+            await writer.enqueue(_row(i))
+        await writer.stop()
+        assert writer.pending_count == 0
+        assert [row["content"] for row in writer.written] == [f"m{i}" for i in range(5)]
+
+    asyncio.run(scenario())
+
+
+def test_write_batch_is_idempotent_on_retry(db, monkeypatch):
+    monkeypatch.setattr(message_writer, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    writer = MessageWriteBehind()
+    rows = [dict(_row(i), msg_uid=f"uid-{i}") for i in range(2)]
+
+    writer._write_batch(rows, {}, [])
+    # COMMIT 후 연결이 끊겨 같은 배치를 다시 저장하는 경우
+    writer._write_batch(rows, {}, [])
+
+    assert db.query(Message).filter(Message.msg_uid.in_(["uid-0", "uid-1"])).count() == 2
+
+
+async def _inline(fn, *args):
+    return fn(*args)
+
+
+def test_mark_delivered_only_confirmed_uids(db, monkeypatch):
+    monkeypatch.setattr(message_writer, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    # 인메모리 SQLite는 스레드마다 연결이 달라 같은 스레드에서 실행
+    monkeypatch.setattr(message_writer.asyncio, "to_thread", _inline)
+
+    async def scenario():
+        writer = MessageWriteBehind(delivered_attempts=2)
+        await writer.enqueue(dict(_row(0), msg_uid="sent"))
+        await writer.enqueue(dict(_row(1), msg_uid="queued"))
+        # 소켓 쓰기가 확인된 메시지 + 아직 다른 노드 큐에 있는(행 없는) 메시지
+        writer.mark_delivered("sent")
+        writer.mark_delivered("elsewhere")
+
+        assert await writer.flush() is True
+        assert writer._delivered_uids == {"elsewhere": 1}
+        assert await writer.flush() is True
+        # 시도 횟수를 넘기면 포기 → 미전달로 남아 재전송 대상
+        assert writer._delivered_uids == {}
+
+    asyncio.run(scenario())
+    delivered = {m.msg_uid: m.is_delivered for m in db.query(Message).filter(Message.msg_uid.in_(["sent", "queued"]))}
+    assert delivered == {"sent": True, "queued": False}
@@ -0,0 +1,117 @@
+import pytest
+import utils.token_truncate as token_truncate
+from core.redis_v2.ai_chat_manager import ChatContext
+from services.openai_client import (
+    ELIDED_FUNCTION_RESULT, MESSAGE_OVERHEAD_TOKENS, _split_turns, build_openai_messages,
+)
+from utils.token_truncate import count_tokens
+
+SYSTEM = {"role": "system", "content": "너는 커플 상담 챗봇이야"}
+SUMMARY = "지난 대화 요약 내용"
+
+
+class WordEncoding:
+    """공백 단위 토큰 (tiktoken BPE 파일을 내려받지 않도록)"""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(token_truncate, "get_encoding", lambda model="gpt-4o": WordEncoding())
+
+
+def _words(n: int, word: str = "w") -> str:
+    return " ".join([word] * n)
+
+
+def _turn(i: int, user_words: int = 10, function_words: int = 0, assistant_words: int = 10) -> list:
+    turn = [{"role": "user", "content": _words(user_words, f"u{i}"), "id": i * 10}]
+    if function_words:
+        turn.append({"role": "function", "name": "search_past_chats",
+                     "content": _words(function_words, f"f{i}"), "id": i * 10 + 1})
+    turn.append({"role": "assistant", "content": _words(assistant_words, f"a{i}"), "id": i * 10 + 2})
+    return turn
+
+
+def _context(turns: list, summary: str = SUMMARY) -> ChatContext:
+    return ChatContext(None, dict(SYSTEM), summary, [msg for turn in turns for msg in turn])
+
+
+def _prompt_tokens(messages: list) -> int:
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def _body(messages: list) -> list:
+    """system / 요약(function chat_summarizer) 다음의 대화 메시지"""
+    return messages[2:]
+
+
+def test_split_turns_starts_each_turn_with_user():
+    turns = _split_turns([{"role": "assistant", "content": "인사"}] + _turn(1, function_words=3) + _turn(2))
+    assert [[m["role"] for m in turn] for turn in turns] == [
+        ["assistant"], ["user", "function", "assistant"], ["user", "assistant"]]
+
+
+def test_output_stays_under_budget_and_drops_oldest_turns():
+    turns = [_turn(i) for i in range(10)]
+    context = _context(turns)
+    budget = 120
+
+    messages = build_openai_messages(context, budget=budget, function_max_tokens=1000)
+
+    assert _prompt_tokens(messages) <= budget
+    assert _prompt_tokens(messages) < _prompt_tokens(build_openai_messages(context, budget=10 ** 6))
+    # 최신 턴부터 유지
+    assert _body(messages)[-1]["content"] == _words(10, "a9")
+    assert _body(messages)[0]["content"].startswith("u")
+
+
+@pytest.mark.parametrize("budget", [40, 80, 150, 300])
+def test_turns_are_never_split(budget):
+    turns = [_turn(i, function_words=5 + i) for i in range(8)]
+    context = _context(turns)
+
+    body = _body(build_openai_messages(context, budget=budget, function_max_tokens=1000))
+
+    # 남은 메시지는 항상 완전한 턴들의 연속 (앞에 user 없는 function / assistant가 남지 않음)
+    assert body[0]["role"] == "user"
+    kept = _split_turns(body)
+    assert [len(turn) for turn in kept] == [3] * len(kept)
+    assert [turn[0]["content"] for turn in kept] == [turn[0]["content"] for turn in turns[-len(kept):]]
+
+
+def test_system_summary_and_current_turn_always_kept():
+    turns = [_turn(i, user_words=50, assistant_words=50) for i in range(3)]
+    context = _context(turns)
+
+    messages = build_openai_messages(context, budget=1, function_max_tokens=1000)
+
+    assert messages[0] == SYSTEM
+    assert messages[1] == {"role": "function", "name": "chat_summarizer", "content": SUMMARY}
+    assert [m["content"] for m in _body(messages)] == [m["content"] for m in turns[-1]]
+
+
+def test_without_summary_only_system_is_prepended():
+    messages = build_openai_messages(_context([_turn(0)], summary=None), budget=1000)
+    assert messages[0] == SYSTEM
+    assert [m["role"] for m in messages[1:]] == ["user", "assistant"]
+
+
+def test_large_function_results_are_elided_or_truncated():
+    turns = [_turn(0, function_words=100), _turn(1, function_words=100)]
+    context = _context(turns)
+
+    messages = build_openai_messages(context, budget=10 ** 6, function_max_tokens=20)
+    functions = [m for m in messages if m["role"] == "function" and m["name"] == "search_past_chats"]
+
+    # 이전 턴은 생략 문구, 현재 턴은 토큰 한도로 자름
+    assert functions[0]["content"] == ELIDED_FUNCTION_RESULT
+    assert functions[1]["content"].startswith(_words(20, "f1"))
+    assert count_tokens(functions[1]["content"]) < 100
+    # 원본 히스토리는 바뀌지 않음
+    assert context.messages[1]["content"] == _words(100, "f0")
@@ -0,0 +1,145 @@
+import asyncio
+import math
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+import core.dependencies as dependencies
+import core.redis_v2.rate_limiter as rate_limiter
+from core.redis_v2.rate_limiter import RateLimit, TokenBucketLimiter
+from models.schema import ChatRequest
+
+LIMIT = RateLimit("test", per_minute=60, burst=3)  # 초당 1토큰
+
+
+class FakeClock:
+    """워커 monotonic 시계와 Redis 서버 TIME을 함께 진행"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeBucketScript:
+    """_TOKEN_BUCKET Lua와 같은 계산을 메모리에서 수행 (evalsha 대신)"""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.buckets = {}
+        self.calls = 0
+
+    async def __call__(self, keys, args, client):
+        client.queue(lambda: self._run(keys[0], *args))
+
+    def _run(self, key, rate, capacity, requested):
+        self.calls += 1
+        now = int(self.clock.now * 1000)
+        tokens, ts = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0, now - ts) * rate / 1000)
+        granted = min(requested, math.floor(tokens))
+        tokens -= granted
+        retry_after = math.ceil((1 - tokens) * 1000 / rate) if granted == 0 else 0
+        self.buckets[key] = (tokens, now)
+        return [granted, retry_after]
+
+
+class FakePipeline:
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self._ops = []
+
+    def queue(self, op):
+        self._ops.append(op)
+
+    async def execute(self):
+        if self.fail:
+            raise RedisConnectionError("redis down")
+        return [op() for op in self._ops]
+
+
+class FakeRedis:
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.fail = False
+
+    def register_script(self, script):
+        return FakeBucketScript(self.clock)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.fail)
+
+
+@pytest.fixture
+def env(monkeypatch):
+    clock = FakeClock()
+    redis = FakeRedis(clock)
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(rate_limiter, "async_redis_client", redis)
+    return TokenBucketLimiter(lease_size=1), clock, redis
+
+
+def _check(limiter, buckets=None):
+    return asyncio.run(limiter.check(buckets or [(LIMIT, "u1")]))
+
+
+def test_burst_exhaustion(env):
+    limiter, clock, _ = env
+    assert [_check(limiter) for _ in range(3)] == [None, None, None]
+    assert _check(limiter) == pytest.approx(1.0)
+
+
+def test_denied_bucket_is_rejected_locally_until_retry_after(env):
+    limiter, clock, _ = env
+    for _ in range(4):
+        _check(limiter)
+    calls = limiter._script.calls
+    clock.now += 0.5
+    assert _check(limiter) == pytest.approx(0.5)
+    assert limiter._script.calls == calls  # Redis round trip 없음
+
+
+def test_refill_after_retry_after(env):
+    limiter, clock, _ = env
+    for _ in range(4):
+        _check(limiter)
+    clock.now += 1.0
+    assert _check(limiter) is None
+    assert _check(limiter) is not None
+    # 충분히 지나면 capacity까지만 다시 채워짐
+    clock.now += 60
+    assert [_check(limiter) for _ in range(3)] == [None, None, None]
+    assert _check(limiter) is not None
+
+
+def test_lease_serves_requests_without_redis(env):
+    limiter, clock, _ = env
+    limiter.lease_size = 3
+    assert [_check(limiter) for _ in range(3)] == [None, None, None]
+    assert limiter._script.calls == 1
+
+
+def test_any_bucket_denied_rejects_request(env):
+    limiter, clock, _ = env
+    couple = RateLimit("couple", per_minute=60, burst=1)
+    assert _check(limiter, [(LIMIT, "u1"), (couple, "c1")]) is None
+    assert _check(limiter, [(LIMIT, "u2"), (couple, "c1")]) == pytest.approx(1.0)
+
+
+def test_fail_open_when_redis_is_down(env):
+    limiter, clock, redis = env
+    redis.fail = True
+    assert [_check(limiter) for _ in range(10)] == [None] * 10
+
+
+def test_chat_rate_limit_returns_429_with_retry_after(env, monkeypatch):
+    limiter, clock, _ = env
+    monkeypatch.setattr(dependencies, "USER_CHAT_LIMIT", RateLimit("chat:user", per_minute=30, burst=1))
+    monkeypatch.setattr(dependencies, "chat_rate_limiter", limiter)
+    req = ChatRequest(user_id="u1", message="hi")
+
+    asyncio.run(dependencies.chat_rate_limit(req))
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(dependencies.chat_rate_limit(req))
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "2"}  # 초당 0.5토큰 → 2초
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+import core.redis_v2.utils as redis_utils
+from core.redis_v2.utils import LockNotAcquired, RedisLock
+
+
+class FakeRedis:
+    """SET NX만 흉내 (해제는 compare-and-delete 스크립트 대신 직접 삭제)"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+
+    async def compare_and_delete(keys, args):
+        if fake.store.get(keys[0]) == args[0]:
+            del fake.store[keys[0]]
+            return 1
+        return 0
+
+    monkeypatch.setattr(redis_utils, "async_redis_client", fake)
+    monkeypatch.setattr(redis_utils, "_compare_and_delete", compare_and_delete)
+    return fake
+
+
+def test_context_manager_acquires_and_releases(redis):
+    async def scenario():
+        async with RedisLock("lock:t", auto_extend=False) as lock:
+            assert lock.acquired
+            assert "lock:t" in redis.store
+        assert "lock:t" not in redis.store
+
+    asyncio.run(scenario())
+
+
+def test_context_manager_raises_when_lock_is_held(redis):
+    async def scenario():
+        holder = RedisLock("lock:t", auto_extend=False)
+        assert await holder.acquire()
+        entered = False
+        with pytest.raises(LockNotAcquired):
+            async with RedisLock("lock:t", auto_extend=False):
+                entered = True
+        assert not entered
+        # 남의 락을 지우지 않음
+        assert redis.store["lock:t"] == holder.token
+
+    asyncio.run(scenario())
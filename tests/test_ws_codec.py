@@ -0,0 +1,45 @@
+import pytest
+from core.ws_codec import JSON_CODEC, MSGPACK_CODEC, SUBPROTOCOL_MSGPACK, negotiate
+
+FRAME = {"type": "message", "from": "u1", "message": "안녕 👋", "image_url": None, "chat_id": 2 ** 40}
+
+requires_msgpack = pytest.mark.skipif(MSGPACK_CODEC is None, reason="msgpack 미설치")
+
+
+def test_json_round_trip():
+    encoded = JSON_CODEC.encode(FRAME)
+    assert isinstance(encoded, str)
+    assert "안녕" in encoded  # 한글을 \uXXXX로 이스케이프하지 않음
+    assert JSON_CODEC.decode(encoded) == FRAME
+    assert JSON_CODEC.decode(encoded.encode("utf-8")) == FRAME
+    # 이미 인코딩된 문자열 프레임은 그대로 전송
+    assert JSON_CODEC.encode(encoded) == encoded
+
+
+def test_json_batch_round_trip():
+    frames = [FRAME, JSON_CODEC.encode({"type": "status", "user_id": "u2"})]
+    decoded = JSON_CODEC.decode(JSON_CODEC.encode_batch(frames))
+    assert decoded == {"type": "batch", "frames": [FRAME, {"type": "status", "user_id": "u2"}]}
+
+
+@requires_msgpack
+def test_msgpack_round_trip():
+    encoded = MSGPACK_CODEC.encode(FRAME)
+    assert isinstance(encoded, bytes)
+    assert MSGPACK_CODEC.decode(encoded) == FRAME
+    # 텍스트 프레임은 JSON으로 받음
+    assert MSGPACK_CODEC.decode(JSON_CODEC.encode(FRAME)) == FRAME
+    batch = MSGPACK_CODEC.decode(MSGPACK_CODEC.encode_batch([FRAME, JSON_CODEC.encode(FRAME)]))
+    assert batch == {"type": "batch", "frames": [FRAME, FRAME]}
+
+
+@requires_msgpack
+def test_negotiate_msgpack():
+    assert negotiate(["other.v1", SUBPROTOCOL_MSGPACK]) is MSGPACK_CODEC
+
+
+@pytest.mark.parametrize("requested", [[], None, ["other.v1"]])
+def test_negotiate_falls_back_to_json(requested):
+    codec = negotiate(requested)
+    assert codec is JSON_CODEC
+    assert codec.subprotocol is None and not codec.binary
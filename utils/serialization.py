@@ -0,0 +1,59 @@
+"""
+JSON 직렬화 공통 모듈 (Redis 값, DB 결과 컬럼, API 응답)
+
+- orjson이 있으면 orjson, 없으면 stdlib json
+- 항상 ensure_ascii=False와 같은 출력 (한글을 \\uXXXX로 이스케이프하지 않음, utf-8 기준 약 절반 크기)
+- orjson은 datetime/numpy를 바로 직렬화하고, 처리 못 하는 값(64bit 초과 정수 등)은 stdlib으로 재시도
+- 출력은 공백 없는 compact 형식 (stdlib 기본값 ", " / ": "과 달라도 loads 결과는 같음)
+"""
+import json
+from typing import Any
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson 미설치 시 stdlib json 사용
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """utf-8 bytes (Redis 바이너리 클라이언트, HTTP 응답 본문용)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """str (DB Text 컬럼 등)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj)
+
+
+def loads(data: str | bytes | bytearray | memoryview) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# orjson.JSONDecodeError는 json.JSONDecodeError 하위 클래스라 기존 except 절 그대로 사용 가능
+JSONDecodeError = json.JSONDecodeError
+
+
+class FastJSONResponse(JSONResponse):
+    """FastAPI 기본 응답 클래스 (main.py default_response_class)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
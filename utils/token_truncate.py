@@ -1,11 +1,21 @@
 import tiktoken
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=None)
+def get_encoding(model: str = "gpt-4o") -> tiktoken.Encoding:
+    """모델별 encoder는 프로세스당 한 번만 생성 (encoding_for_model 호출 비용 제거)"""
+    return tiktoken.encoding_for_model(model)
+
 def count_tokens(text: str, model: str = "gpt-4o") -> int:
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
+    return len(get_encoding(model).encode(text or ""))
+
+def message_tokens(message: dict) -> int:
+    """히스토리 항목의 토큰 수 (저장 시 계산한 "tokens"가 있으면 재계산하지 않음)"""
+    tokens = message.get("tokens")
+    return tokens if tokens is not None else count_tokens(message.get("content"))
 
 def truncate_by_token(
     text: str,
@@ -14,7 +24,7 @@ def truncate_by_token(
     postfix: str = "\n...(이하 생략)",
     log_prefix: str = None
 ):
-    encoding = tiktoken.encoding_for_model(model)
+    encoding = get_encoding(model)
     tokens = encoding.encode(text)
     token_count = len(tokens)
     if token_count <= max_tokens: